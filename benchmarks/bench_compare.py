@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+   Benchmark: comparing results across many datasets with `compare_results`.
+
+   Builds an in-memory project with results for every experiment on an
+   increasing number of datasets (e.g. validation folds) and times
+   `compare_results`. Use --legacy to also time the original implementation
+   of `projit compare`, which built one results table per dataset and
+   chained inner joins on the experiment.
+
+   Usage:
+     python benchmarks/bench_compare.py
+     python benchmarks/bench_compare.py --legacy --experiments 500
+"""
+import argparse
+import random
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pandas as pd
+import projit.projit as proj
+
+##########################################################################################
+def legacy_compare(project, datasets, metric):
+    results = None
+    for dataset in datasets:
+        rez = project.get_results(dataset)
+        rez = rez.loc[:,['experiment',metric]]
+        rez.columns = ['experiment', dataset]
+        if results is None:
+            results = rez
+        else:
+            results = pd.merge(results,rez,on="experiment")
+    return results
+
+##########################################################################################
+def build_project(experiments, datasets, metrics):
+    rng = random.Random(42)
+    names = ["exp_%i" % i for i in range(experiments)]
+    dataresults = {"fold_%i" % d:{n:{"metric_%i" % m:rng.random() for m in range(metrics)} for n in names}
+                   for d in range(datasets)}
+    return proj.Projit("", "bench", experiments=[(n, n + ".py") for n in names], dataresults=dataresults)
+
+##########################################################################################
+def timed(fn, *args):
+    start = time.perf_counter()
+    df = fn(*args)
+    return time.perf_counter() - start, df
+
+##########################################################################################
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--experiments', type=int, default=200)
+    parser.add_argument('--metrics', type=int, default=5)
+    parser.add_argument('--legacy', action='store_true')
+    args = parser.parse_args()
+    for datasets in [2, 10, 50, 200]:
+        project = build_project(args.experiments, datasets, args.metrics)
+        names = list(project.dataresults)
+        elapsed, df = timed(project.compare_results, names, ["metric_0"])
+        line = "experiments=%i datasets=%i compare=%.4fs" % (args.experiments, datasets, elapsed)
+        if args.legacy:
+            legacy_elapsed, legacy_df = timed(legacy_compare, project, names, "metric_0")
+            assert legacy_df.equals(df)
+            line += " legacy=%.4fs speedup=%.0fx" % (legacy_elapsed, legacy_elapsed / elapsed)
+        print(line)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+   Benchmark: top-k queries with `leaderboard`.
+
+   Builds an in-memory project with an increasing number of experiments,
+   each with a few metrics, and times `leaderboard` against materializing
+   the full results table with `get_results` and sorting it.
+
+   Usage:
+     python benchmarks/bench_leaderboard.py
+     python benchmarks/bench_leaderboard.py -k 100
+"""
+import argparse
+import random
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import projit.projit as proj
+
+##########################################################################################
+def build_project(experiments, metrics):
+    rng = random.Random(42)
+    names = ["exp_%i" % i for i in range(experiments)]
+    results = {n:{"metric_%i" % m:rng.random() for m in range(metrics)} for n in names}
+    return proj.Projit("", "bench", experiments=[(n, n + ".py") for n in names], results=results)
+
+##########################################################################################
+def sorted_results(project, k):
+    return project.get_results().nlargest(k, "metric_0", keep="first")
+
+##########################################################################################
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+##########################################################################################
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--metrics', type=int, default=5)
+    parser.add_argument('-k', type=int, default=10)
+    args = parser.parse_args()
+    for experiments in [1000, 10000, 100000, 1000000]:
+        project = build_project(experiments, args.metrics)
+        project._store.rows()
+        elapsed = timed(lambda: project.leaderboard("metric_0", k=args.k))
+        table = timed(sorted_results, project, args.k)
+        print("experiments=%i k=%i leaderboard=%.4fs get_results+sort=%.4fs" % (experiments, args.k, elapsed, table))
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+   Benchmark: locating the project config in a wide directory tree.
+
+   Creates a project whose working folders each hold a large number of
+   files, then times `locate_projit_config` from the deepest folder against
+   the original search, which lists every ancestor directory with `walk_up`.
+
+   Usage:
+     python benchmarks/bench_locate.py
+     python benchmarks/bench_locate.py --files 100000 --depth 5
+"""
+import argparse
+import tempfile
+import shutil
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from projit.config import config_folder
+from projit.utils import locate_projit_config
+from projit.utils import forget_projit_config
+from projit.utils import walk_up
+
+##########################################################################################
+def build_tree(root, depth, files):
+    os.mkdir(os.path.join(root, config_folder))
+    folder = root
+    for d in range(depth):
+        folder = os.path.join(folder, "level_%i" % d)
+        os.mkdir(folder)
+        for f in range(files):
+            open(os.path.join(folder, "file_%i.csv" % f), 'w').close()
+    return folder
+
+##########################################################################################
+def legacy_locate():
+    for pa, dirs, files in walk_up(os.getcwd()):
+        if config_folder in dirs:
+            return pa + "/" + config_folder
+    return ""
+
+##########################################################################################
+def uncached_locate():
+    forget_projit_config()
+    return locate_projit_config()
+
+##########################################################################################
+def timed(fn, repeats):
+    start = time.perf_counter()
+    for r in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+##########################################################################################
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=20000)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--repeats', type=int, default=10)
+    args = parser.parse_args()
+    root = tempfile.mkdtemp()
+    try:
+        os.chdir(build_tree(root, args.depth, args.files))
+        assert legacy_locate() == locate_projit_config()
+        legacy = timed(legacy_locate, args.repeats)
+        uncached = timed(uncached_locate, args.repeats)
+        cached = timed(locate_projit_config, args.repeats)
+        print("files=%i depth=%i walk_up=%.6fs direct=%.6fs cached=%.6fs" % (
+              args.files, args.depth, legacy, uncached, cached))
+    finally:
+        os.chdir("/")
+        shutil.rmtree(root)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+   Benchmark: writer throughput on the project lock.
+
+   Starts N processes that each record a number of results in the same
+   project with `add_result`, then reports the total writes per second.
+   Use --legacy to run with the original lock (poll for the LOCK file and
+   sleep 5 seconds while it exists) for comparison, or --daemon to send the
+   writes to a `projit serve` daemon.
+
+   Usage:
+     python benchmarks/bench_lock.py --procs 8 --writes 20
+     python benchmarks/bench_lock.py --procs 8 --writes 20 --legacy
+     python benchmarks/bench_lock.py --procs 8 --writes 20 --daemon
+"""
+import multiprocessing
+import subprocess
+import argparse
+import tempfile
+import shutil
+import time
+import json
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import projit.projit as proj
+from projit.config import config_folder
+from projit.config import lock_file
+from projit.storage import JSONStorage
+from projit.daemon import socket_path
+
+##########################################################################################
+def legacy_lock(self, timeout=None):
+    path_to_lock = self.path + "/" + lock_file
+    lock_exists = True
+    while lock_exists:
+        if os.path.isfile(path_to_lock):
+            time.sleep(5)
+        else:
+            lock_exists = False
+    with open(path_to_lock, 'w') as outfile:
+        json.dump({}, outfile, indent=0)
+
+def legacy_unlock(self):
+    path_to_lock = self.path + "/" + lock_file
+    if os.path.isfile(path_to_lock):
+        os.remove(path_to_lock)
+
+##########################################################################################
+def writer(worker, writes, legacy):
+    if legacy:
+        JSONStorage.lock = legacy_lock
+        JSONStorage.unlock = legacy_unlock
+    project = proj.load(config_folder)
+    for i in range(writes):
+        project.add_result("bench", f"metric_{worker}_{i}", float(i))
+
+##########################################################################################
+def start_daemon():
+    env = dict(os.environ, PYTHONPATH=sys.path[0])
+    daemon = subprocess.Popen([sys.executable, "-m", "projit.cli", "serve"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env)
+    while not os.path.exists(socket_path(config_folder)):
+        time.sleep(0.01)
+    return daemon
+
+##########################################################################################
+def run(procs, writes, legacy, daemon=False):
+    workdir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        project = proj.init("", "bench", "lock benchmark")
+        project.add_experiment("bench", "bench.py")
+        if daemon:
+            daemon = start_daemon()
+        ctx = multiprocessing.get_context("fork")
+        workers = [ctx.Process(target=writer, args=(w, writes, legacy)) for w in range(procs)]
+        start = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = time.perf_counter() - start
+        if daemon:
+            daemon.terminate()
+            daemon.wait()
+        recorded = len(proj.load(config_folder).results.get("bench", {}))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir)
+    return elapsed, recorded
+
+##########################################################################################
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--procs', type=int, default=8)
+    parser.add_argument('--writes', type=int, default=20)
+    parser.add_argument('--legacy', action='store_true')
+    parser.add_argument('--daemon', action='store_true')
+    args = parser.parse_args()
+    elapsed, recorded = run(args.procs, args.writes, args.legacy, args.daemon)
+    total = args.procs * args.writes
+    print("lock=%s procs=%i writes=%i elapsed=%.2fs throughput=%.1f writes/s recorded=%i/%i" % (
+        "legacy" if args.legacy else "daemon" if args.daemon else "flock", args.procs, args.writes, elapsed, total / elapsed, recorded, total))
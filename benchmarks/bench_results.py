@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+   Benchmark: building the results table with `get_results`.
+
+   Builds an in-memory project with an increasing number of experiments,
+   each with a few metrics, and times `get_results`. Use --legacy to also
+   time the original implementation, which concatenated one row per
+   experiment and is quadratic in the number of experiments. It is only
+   run up to --legacy-max experiments.
+
+   Usage:
+     python benchmarks/bench_results.py
+     python benchmarks/bench_results.py --legacy --legacy-max 3000
+"""
+import argparse
+import random
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pandas as pd
+import projit.projit as proj
+
+##########################################################################################
+def legacy_get_results(self, dataset=None):
+    df = pd.DataFrame()
+    myresults = self.results if dataset is None else self.dataresults[dataset]
+    for exp in self.experiments:
+        key = exp[0]
+        rez = dict(myresults.get(key, {}))
+        rez['experiment'] = key
+        df = pd.concat([df, pd.DataFrame(rez, index=[0])], ignore_index=True)
+    cols = ["experiment"]
+    rest = df.columns.to_list()
+    rest.remove('experiment')
+    cols.extend(rest)
+    return df.loc[:,cols]
+
+##########################################################################################
+def build_project(experiments, metrics):
+    rng = random.Random(42)
+    names = ["exp_%i" % i for i in range(experiments)]
+    results = {n:{"metric_%i" % m:rng.random() for m in range(metrics)} for n in names}
+    return proj.Projit("", "bench", experiments=[(n, n + ".py") for n in names], results=results)
+
+##########################################################################################
+def timed(fn, project):
+    start = time.perf_counter()
+    df = fn(project)
+    return time.perf_counter() - start, df
+
+##########################################################################################
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--metrics', type=int, default=5)
+    parser.add_argument('--legacy', action='store_true')
+    parser.add_argument('--legacy-max', type=int, default=3000)
+    args = parser.parse_args()
+    for experiments in [10, 100, 1000, 3000, 10000, 100000]:
+        project = build_project(experiments, args.metrics)
+        elapsed, df = timed(proj.Projit.get_results, project)
+        line = "experiments=%i metrics=%i get_results=%.4fs" % (experiments, args.metrics, elapsed)
+        if args.legacy and experiments <= args.legacy_max:
+            legacy_elapsed, legacy_df = timed(legacy_get_results, project)
+            assert legacy_df.equals(df)
+            line += " legacy=%.4fs speedup=%.0fx" % (legacy_elapsed, legacy_elapsed / elapsed)
+        print(line)
@@ -1,6 +1,23 @@
 __version__ = "0.1.13"
 
-from .utils import locate_projit_config
-from .projit import projit_load
-from .projit import init as projit_init
+# The package functions and submodules are imported on first use, so that importing
+# a submodule (for example the stdlib-only projit.lite) does not load the rest.
+_exports = {
+    "locate_projit_config": ("utils", "locate_projit_config"),
+    "projit_load": ("projit", "projit_load"),
+    "projit_init": ("projit", "init"),
+}
+_submodules = ["ascii_plot", "cli", "config", "daemon", "latex_table", "lite", "lock",
+               "pdf", "projit", "results", "series", "stats", "storage", "template", "utils"]
 
+def __getattr__(name):
+    from importlib import import_module
+    if name in _exports:
+        module, attribute = _exports[name]
+        return getattr(import_module("." + module, __name__), attribute)
+    if name in _submodules:
+        return import_module("." + name, __name__)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+def __dir__():
+    return sorted(list(globals()) + list(_exports) + _submodules)
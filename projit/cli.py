@@ -1,6 +1,4 @@
 import argparse
-import pandas as pd
-import numpy as np
 import sys
 import os
 
@@ -20,11 +18,15 @@ from .projit import load as projit_load
 from .projit import init as projit_init
 from .ascii_plot import ascii_plot
 from .latex_table import print_latex
+from .lock import describe_owner
 
 from projit import __version__
 
 project = None
 
+# The commands that can be run in a batch
+batch_commands = ["add", "tag", "rm", "list", "compare", "top", "status", "plot"]
+
 ##################################################################################
 def task_init(name, template=''):
     """
@@ -91,7 +93,14 @@ def task_status(project):
     print("  Description: %s" % project.desc)
     print("  Datasets: %i" % len(project.datasets))
     print("  Experiments: %i" % len(project.experiments))
-    print("  Executions: %i" % project.get_total_executions())
+    stats = project.get_experiment_stats()
+    executions = sum(s['count'] for s in stats.values())
+    completed = sum(s['completed'] for s in stats.values())
+    print("  Executions: %i (%i completed)" % (executions, completed))
+    if completed > 0:
+        total_time = sum(s['mean'] * s['completed'] for s in stats.values())
+        longest = max(s['max'] for s in stats.values() if s['completed'] > 0)
+        print("  Run Time: %.1fs total, %.1fs mean, %.1fs longest" % (total_time, total_time / completed, longest))
     print("")
 
 ##################################################################################
@@ -123,8 +132,9 @@ def task_compare(project, datasets, metric, format, precision):
     """
     CLI Internal Task Function: Compare results across muliple datasets.
 
-    This command loads the results for each dataset and extracts just the records
-    for the specified metric to compile the comparison dataset to display.
+    This command builds the comparison from a single long-format table of the
+    results on the datasets, pivoted once. Every experiment is kept, with
+    missing results shown as NaN.
 
     :param project: The projit project object
     :type project: Projit, required
@@ -132,7 +142,7 @@ def task_compare(project, datasets, metric, format, precision):
     :param datasets: The list of datasets to compare
     :type datasets: list(String), required
 
-    :param metric: The metric to use for comparison
+    :param metric: The metric, or comma separated metrics, to use for comparison
     :type metric: String, required
 
     :param format: The output format (markdown|latex|default)
@@ -146,19 +156,14 @@ def task_compare(project, datasets, metric, format, precision):
     """
     title = "Compare Results" 
     warning = ""
-    results = None
-    for dataset in datasets: 
-       rez = project.get_results(dataset)
-       if metric not in rez.columns:
-           rez[metric] = np.nan
-           warning += f"Metric '{metric}' not present for dataset '{dataset}'\n"
-       rez = rez.loc[:,['experiment',metric]]
-       rez.columns = ['experiment', dataset]
-       if results is None:
-           results = rez
-       else:
-           results = pd.merge(results,rez,on="experiment")
-           
+    metrics = metric.split(",")
+    results = project.compare_results(datasets, metrics)
+    for m in metrics:
+       for dataset in datasets:
+           column = dataset if len(metrics) == 1 else "%s:%s" % (m, dataset)
+           if results[column].isna().all():
+               warning += f"Metric '{m}' not present for dataset '{dataset}'\n"
+
     if len(warning) > 0:
        print("*** WARNINGS ***")
        print(warning)
@@ -171,12 +176,13 @@ def task_compare(project, datasets, metric, format, precision):
         print_results_latex(title, results)
     else:
         print(" ___" + title + "__________________________________[ %s ]___" % metric)
+        import pandas as pd
         pd.set_option('expand_frame_repr', False)
         pd.set_option('display.max_columns', 999)
         print(results)
 
 
-def extract_max_tags_lengths(project, asset, tags):
+def extract_max_tags_lengths(project, asset, tags, names=None):
     """
     CLI Internal Function: determine the maximum length of the content
     inside a specific set of tags on an asset in the project.
@@ -189,15 +195,20 @@ def extract_max_tags_lengths(project, asset, tags):
 
     :param tags: The tags to search for
     :type tags: list(String), required
+
+    :param names: Optional names of the assets to consider, all assets by default
+    :type names: list(String), optional
  
     :return: List of tag lengths
     :rtype: list(Int)
     """
     if asset in project.tags:
         tagset = project.tags[asset]
+        if names is not None:
+            tagset = {a:tagset[a] for a in names if a in tagset}
         max_tag_lengths = []
         for t in tags:
-            temp = []
+            temp = [0]
             for a in tagset:
                 if t in tagset[a]:
                     temp.append(len(tagset[a][t]))
@@ -213,58 +224,89 @@ def extract_max_tags_lengths(project, asset, tags):
 
 
 ################################################################################
-def task_list(subcmd, project, dataset, format, precision, tags):
+def parse_where(where):
+    """
+    CLI Internal Function: parse tag conditions given as tag=value
+
+    :param where: The conditions
+    :type where: list(String), required
+
+    :return: Dictionary of tag to value
+    :rtype: Dictionary
+    """
+    conditions = {}
+    for condition in where:
+        if "=" not in condition:
+            print(f"ERROR: Invalid condition '{condition}' -- Use the form tag=value")
+            exit(1)
+        tag, value = condition.split("=", 1)
+        conditions[tag] = value
+    return conditions
+
+################################################################################
+def task_list(subcmd, project, dataset, format, precision, tags, where=None):
     """
     CLI Internal Task Function: List content of a project from the command line
+    Experiments and datasets can be filtered by tag values with the where conditions.
     """
     if len(tags) > 0:
         tags_max_len = max([len(x) for x in tags])
     else:
         tags = []
         tags_max_len = 0
+    conditions = parse_where(where or [])
 
     print()
     if subcmd == "datasets":
         print_header("__Datasets")
-        if len(project.datasets.keys()) > 0:
+        datasets = project.datasets
+        if len(conditions) > 0:
+            datasets = {ds:datasets[ds] for ds in project.find("dataset", **conditions) if ds in datasets}
+        if len(datasets.keys()) > 0:
             tag_header = ""
             if len(tags)>0:
-               tag_max_lengths = extract_max_tags_lengths(project, "dataset", tags)
+               tag_max_lengths = extract_max_tags_lengths(project, "dataset", tags, list(datasets))
                for tag,tag_len in zip(tags,tag_max_lengths):
                    tag_header = tag_header + tag + filler(len(tag), tag_len+3, "_")
                 
-            long_key = max([len(k) for k in project.datasets.keys()])
+            long_key = max([len(k) for k in datasets.keys()])
             myhead = "__Name" + filler(len("Name"), long_key+3, "_") + tag_header + "Path_________"
             print_header(myhead)
-            for ds in project.datasets:
+            for ds in datasets:
                 tag_output = ""
                 if len(tags)>0:
                     tag_vals = project.get_tags("dataset", ds, tags)                
                     for tag,tag_len in zip(tag_vals,tag_max_lengths):
                         tag_output = tag_output + tag + filler(len(tag), tag_len+3, " ")
-                print("  ", ds, filler(len(ds), long_key+3 ), tag_output, project.datasets[ds], sep="" )
+                print("  ", ds, filler(len(ds), long_key+3 ), tag_output, datasets[ds], sep="" )
         else:
             print(" NONE")
         print("")
     elif subcmd == "experiments":
         print_header("__Experiments")
-        if len(project.experiments) > 0:
+        if len(conditions) > 0:
+            experiments = [(n, project.get_experiment_path(n)) for n in project.find("experiment", **conditions)
+                           if project.experiment_exists(n)]
+        else:
+            experiments = project.experiments
+        if len(experiments) > 0:
             tag_header = ""
             if len(tags)>0:
-               tag_max_lengths = extract_max_tags_lengths(project, "experiment", tags)
+               tag_max_lengths = extract_max_tags_lengths(project, "experiment", tags, [e[0] for e in experiments])
                for tag,tag_len in zip(tags,tag_max_lengths):
                    tag_header = tag_header + tag + filler(len(tag), tag_len+3, "_")
 
-            long_key = max([len(k[0]) for k in project.experiments])
+            stats = project.get_execution_stats()
+            long_key = max([len(k[0]) for k in experiments])
             myhead = "__Name__" + filler(len("Name__"), long_key+3, "_") + tag_header + "Runs__" + "MeanRunTime___" + "Path______"
             print_header(myhead)
-            for exp in project.experiments:
+            for exp in experiments:
                 tag_output = ""
                 if len(tags)>0:
                     tag_vals = project.get_tags("experiment", exp[0], tags)
                     for tag,tag_len in zip(tag_vals,tag_max_lengths):
                         tag_output = tag_output + tag + filler(len(tag), tag_len+3, " ")
-                execs, mean_time = project.get_experiment_execution_stats(exp[0])
+                execs, mean_time = stats.get(exp[0], (0, 0))
                 mins, secs = divmod(mean_time, 60)
                 if mins>60:
                     hours, mins = divmod(mins, 60)
@@ -320,6 +362,7 @@ def task_list(subcmd, project, dataset, format, precision, tags):
             print_results_latex(title, rez)
         else:
             print_header(f"__Results__[{dataset}]")
+            import pandas as pd
             pd.set_option('expand_frame_repr', False)
             pd.set_option('display.max_columns', 999)
             print(rez)
@@ -330,6 +373,63 @@ def task_list(subcmd, project, dataset, format, precision, tags):
 
 
 
+###############################################################################
+def task_top(project, metric, dataset, k, ascending, ties, where, tags, format, precision):
+    """
+    CLI Internal Task Function: List the best experiments by a metric
+
+    :param project: The projit project object
+    :type project: Projit, required
+
+    :param metric: The metric to rank by
+    :type metric: String, required
+
+    :param dataset: The dataset of the results, overall results when empty
+    :type dataset: String, required
+
+    :param k: The number of experiments to list
+    :type k: Int, required
+
+    :param ascending: Rank the lowest values first
+    :type ascending: Boolean, required
+
+    :param ties: Also list the experiments tied with the last one
+    :type ties: Boolean, required
+
+    :param where: Conditions tag=value on the experiments to rank
+    :type where: list(String), required
+
+    :param tags: Tags of the experiments to show
+    :type tags: list(String), required
+
+    :param format: The output format (markdown|latex|default)
+    :type format: String, required
+
+    :param precision: The precision for results in the table
+    :type precision: Int, required
+
+    :return: None
+    :rtype: None
+    """
+    dataset = dataset if dataset != "" else None
+    rez = project.leaderboard(metric, dataset, k=k, ascending=ascending, where=parse_where(where),
+                              ties=ties, tags=list(tags))
+    rez = rez.round(precision)
+    title = f"Top {k} experiments by {metric}"
+    if dataset is not None:
+        title += f" on {dataset}"
+    if format == 'markdown':
+        print_results_markdown(title, rez)
+    elif format == 'latex':
+        print_results_latex(title, rez)
+    else:
+        print_header(f"__Top__[{metric}]" + ("" if dataset is None else f"__[{dataset}]"))
+        import pandas as pd
+        pd.set_option('expand_frame_repr', False)
+        pd.set_option('display.max_columns', 999)
+        print(rez)
+        print()
+
 ###############################################################################
 def task_render(project, path):
     """
@@ -384,9 +484,14 @@ def print_results_markdown(title, df):
     other_col_widths = list(map(colwidth, other_cols))
 
 
+    def cell(x):
+        if isinstance(x, (int, float)):
+            return str(round(x,2))
+        return str(x)
+
     def widthGenerator(col_names, col_widths):
         for colname, colwidth in zip(col_names, col_widths):
-            longest =  max( df[colname].apply(lambda x: len(str(round(x,2)))))
+            longest =  max( df[colname].apply(lambda x: len(cell(x))))
             if longest > (colwidth-2):
                 yield longest+2
             else:
@@ -414,7 +519,7 @@ def print_results_markdown(title, df):
         name = df.loc[i,"experiment"]
         rowcontent = "| %s%s "%(name, " "*(name_spacer-len(name)-2) )
         for colname, colwidth in zip(other_cols, other_col_widths):
-            content = str(round(df.loc[i,colname],2))
+            content = cell(df.loc[i,colname])
             rowcontent += "| %s%s "%( " "*(colwidth-len(content)-2), content )
         rowcontent += "|"
         print(rowcontent)
@@ -452,7 +557,7 @@ def task_tag(project, asset, name, values):
 
 
 ###############################################################################
-def task_rm(project, asset, name):
+def task_rm(project, asset, name, confirm=True):
     """
     Remove elements to a project from the command line
     """
@@ -460,7 +565,9 @@ def task_rm(project, asset, name):
         print("ERROR: Request to remove unrecognised asset type: %s" % asset)
         exit(1)
 
-    if name == ".":
+    if not confirm:
+        response = 'y'
+    elif name == ".":
         print(f"Remove all {asset}s. Please confirm (y/n)")
         response = input(">")
     else: 
@@ -476,25 +583,168 @@ def task_rm(project, asset, name):
         print(f"** Remove command for {asset} named {name} cancelled ** ")
 
 ###############################################################################
-def task_plot(project, experiment, property, metric):
+def task_batch(project, parser, file, strict):
+    """
+    Run the commands in a file, one per line, against the project in a single update.
+    The project is locked and loaded once and saved once, after the last command.
+    Failed commands are reported and skipped, unless strict is set, in which case
+    the first failure stops the batch and nothing is saved.
+    Exits with status 1 when any command failed.
+    """
+    import shlex
+    if file == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(file) as f:
+            lines = f.read().splitlines()
+    failures = 0
+    with project.batch():
+        for number, line in enumerate(lines, 1):
+            if line.strip() == "" or line.strip()[0] == "#":
+                continue
+            try:
+                tokens = shlex.split(line)
+                if tokens[0] == "projit":
+                    tokens = tokens[1:]
+                args = parser.parse_args(tokens)
+                if args.cmd not in batch_commands:
+                    raise Exception("Command not available in a batch: %s -- Valid Options [%s]" % (args.cmd, ",".join(batch_commands)))
+                run_task(project, args, confirm=False)
+            except (Exception, SystemExit) as e:
+                failures += 1
+                message = "ERROR: line %i: %s" % (number, line)
+                if isinstance(e, Exception):
+                    message += " -- %s" % e
+                print(message)
+                if strict:
+                    raise Exception("Batch stopped at line %i, no changes saved" % number)
+    print("Batch complete: %i commands failed" % failures)
+    if failures > 0:
+        exit(1)
+
+###############################################################################
+def task_migrate(project, backend):
+    """
+    Convert the project meta-data to another storage backend from the command line
+    """
+    project.migrate_storage(backend)
+    print(f"Project meta-data now stored with the '{backend}' backend")
+
+###############################################################################
+def task_lock(project, action):
+    """
+    Inspect or break the project lock from the command line
+    """
+    owner = project.lock_status()
+    if action == "status":
+        print()
+        if owner is None:
+            print("  Project is not locked")
+        else:
+            print("  Project is locked: %s" % describe_owner(owner))
+            if owner['stale'] is not None:
+                print("  Lock is stale: %s" % owner['stale'])
+        print()
+    elif action == "break":
+        if owner is None:
+            print("Project is not locked")
+            return
+        print(f"Break the lock held by {describe_owner(owner)}. Please confirm (y/n)")
+        response = input(">")
+        if response=='y':
+            project.break_lock()
+        else:
+            print("** Break lock command cancelled ** ")
+    else:
+        print(f"ERROR: Unrecognised lock action: {action} -- Valid Options [status,break]")
+        exit(1)
+
+###############################################################################
+def task_serve(config_path):
+    """
+    Run the project daemon from the command line, until interrupted
+    """
+    import logging
+    from .daemon import serve
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    print("Serving project updates. Press Ctrl-C to stop.")
+    try:
+        serve(config_path)
+    except KeyboardInterrupt:
+        print("Projit daemon stopped")
+
+###############################################################################
+def print_plot(values, ylabel, xdata=None):
+    """
+    CLI Internal Function: print an ascii plot of values over iterations.
+    Values that cannot be scaled into a plot (a single point, or only zeros) are listed instead.
+
+    :param values: The values to plot
+    :type values: list(float), required
+
+    :param ylabel: The label of the values
+    :type ylabel: String, required
+
+    :param xdata: The iterations of the values, 1 to N by default
+    :type xdata: list(Int), optional
+    """
+    try:
+        print(ascii_plot(values, xdata=xdata, xlabel='Iteration', ylabel=ylabel, width=70, height=12))
+    except ZeroDivisionError:
+        xdata = xdata if xdata else range(1, len(values)+1)
+        for x, y in zip(xdata, values):
+            print("  Iteration %i: %s" % (x, y))
+
+################################################################################
+def task_plot(project, experiment, property, metric, dataset=None):
+    """
+    CLI Internal Task Function: Plot the execution times, a hyperparameter or
+    the result history of an experiment over its executions.
+
+    :param project: The projit project object
+    :type project: Projit, required
+
+    :param experiment: The experiment name
+    :type experiment: String, required
+
+    :param property: What to plot (execution|hyperparam|result)
+    :type property: String, required
+
+    :param metric: The hyperparameter or metric name
+    :type metric: String, required
+
+    :param dataset: The dataset of the result, overall results by default
+    :type dataset: String, optional
+
+    :return: None
+    :rtype: None
+    """
     if property == "execution":
         print()
         print_header(f"__Experiment_[{experiment}]_execution_time_")
         values = project.get_execution_times(experiment)
-        print(ascii_plot(values, xlabel='Iteration', ylabel='Seconds',  width=70, height=12)) 
+        print_plot(values, 'Seconds')
         print()
     elif property == "hyperparam":
         print()
         print_header(f"__Experiment_[{experiment}]_hyperparameter_[{metric}]_")
-        print("  TODO")
+        values = project.get_hyperparam_history(experiment, metric)
+        iterations = [i+1 for i, v in enumerate(values) if isinstance(v, (int, float))]
+        values = [float(v) for v in values if isinstance(v, (int, float))]
+        if len(values) > 0:
+            print_plot(values, metric, iterations)
+        else:
+            print(f"  No numeric values of hyperparameter '{metric}' recorded")
         print()
-        #print(ascii_plot([50,90,130,70,60,0,80,120,100], xlabel='Iteration', ylabel=metric, width=70, height=12)) 
     elif property == "result":
         print()
         print_header(f"__Experiment_[{experiment}]_result_[{metric}]_")
-        print("  TODO")
+        values = project.get_result_history(experiment, metric, dataset)["value"].tolist()
+        if len(values) > 0:
+            print_plot(values, metric)
+        else:
+            print(f"  No history of result '{metric}' recorded -- Add results with the execution ID")
         print()
-        #print(ascii_plot([50,90,130,70,60,0,80,120,100], xlabel='Iteration', ylabel=metric, width=70, height=12)) 
     else:
         print()
         print(f"\nUnrecognized Experiment Property [{property}] -- Valid Options [execution,hyperparam,result]")
@@ -506,7 +756,7 @@ def print_usage(prog):
     """ Command line application usage instrutions. """
     print(" USAGE ")
     print(" ", prog, "[OPTIONS] <COMMAND> [<ASSET>] [<PARAMS>*]")
-    print("   <COMMAND>     - CORE TASK TO PERFORM: [init | upate | rm | status | add | list | compare | render]")
+    print("   <COMMAND>     - CORE TASK TO PERFORM: [init | upate | rm | status | add | list | compare | top | render | migrate | lock | serve | batch]")
     print("   <ASSET>       - (OPTIONAL) Dependant on COMMAND: [dataset | experiment | results]")
     print("   <PARAMS>      - (OPTIONAL) Dependant on COMMAND: Usually names and paths")
     print("   [OPTIONS]")
@@ -524,17 +774,28 @@ def print_usage(prog):
     print("   ", prog, "add experiment explore explore.ipynb    # Register an experiment script")
     print("   ", prog, "list datasets                           # List the available datasets")
     print("   ", prog, "list experiments                        # List the registered experiments")
+    print("   ", prog, "list experiments --where model=xgboost  # List the experiments tagged with model=xgboost")
     print("   ", prog, "list results                            # List the registered results ")
     print("   ", prog, "list results test                       # List the registered results on dataset 'test' ")
     print("   ", prog, "plot initial execution                  # Plot the execution times for the experiment named 'initial'")
     print("   ", prog, "plot initial hyperparam alpha           # Plot the change in hyperparam 'alpha' for the experiment named 'initial'")
     print("   ", prog, "plot initial result MSE                 # Plot the change in result 'MSE' for the experiment named 'initial'")
+    print("   ", prog, "plot initial result MSE --dataset test  # Plot the change in result 'MSE' on dataset 'test'")
     print("   ", prog, "render path_to_output.pdf               # Render a PDF document summarising the project")
     print("   ", prog, "-m list results test                    # List results on 'test' data in Markdown format")
     print("   ", prog, "rm experiment explore                   # Remove the experiment explore (requires confirmation)")
     print("   ", prog, "rm experiment .                         # Remove all experiments (requires confirmation)")
     print("   ", prog, "-m list results test                    # List results on test data in Markdown format")
     print("   ", prog, "compare dataone,datatwo MAE             # Compare results over datasets using metric MAE")
+    print("   ", prog, "top AUC test -k 5                       # List the 5 experiments with the highest AUC on dataset 'test'")
+    print("   ", prog, "top RMSE --ascending --where model=xgb  # List the xgb experiments with the lowest RMSE")
+    print("   ", prog, "compare dataone,datatwo MAE,RMSE        # Compare results over datasets using metrics MAE and RMSE")
+    print("   ", prog, "migrate --backend sqlite                # Store the project meta-data in SQLite")
+    print("   ", prog, "lock status                             # Show which process holds the project lock")
+    print("   ", prog, "lock break                              # Remove a stuck project lock (requires confirmation)")
+    print("   ", prog, "serve                                   # Run a daemon that applies the updates of experiment scripts")
+    print("   ", prog, "batch commands.txt                      # Run the commands in a file, one per line, in one update")
+    print("   ", prog, "batch - --strict < commands.txt         # Read the commands from stdin, stopping at the first failure")
     print("")
 
 
@@ -545,14 +806,16 @@ def main():
     except Exception as e:
         print("*** Projit CLI Error ***")
         print(e)
+        exit(1)
     finally:
         if project is not None:
             project.release_lock()
 
 
 ###############################################################################
-def cli_main():
-   parser = argparse.ArgumentParser()
+def build_parser():
+   """ Build the command line argument parser. """
+   parser = argparse.ArgumentParser(prog="projit")
    parser.add_argument('-v', '--version', help='Print Version', action='store_true')
    parser.add_argument('-m', '--markdown', help='Use markdown for output', action='store_true')
    parser.add_argument('-l', '--latex', help='Use LaTeX for output - overrides markdown', action='store_true')
@@ -581,11 +844,13 @@ def cli_main():
    list_parser.add_argument('subcmd')
    list_parser.add_argument('dataset', nargs='?', default="")
    list_parser.add_argument('--tags', nargs='+', default="")
+   list_parser.add_argument('--where', nargs='+', default=[])
 
    plot_parser = subparsers.add_parser('plot')
    plot_parser.add_argument('experiment')
    plot_parser.add_argument('property')
    plot_parser.add_argument('metric', nargs='?', default="")
+   plot_parser.add_argument('--dataset', default=None)
 
    rm_parser = subparsers.add_parser('rm')
    rm_parser.add_argument('asset')
@@ -595,11 +860,37 @@ def cli_main():
    comp_parser.add_argument('datasets')
    comp_parser.add_argument('metric')
 
+   top_parser = subparsers.add_parser('top')
+   top_parser.add_argument('metric')
+   top_parser.add_argument('dataset', nargs='?', default="")
+   top_parser.add_argument('-k', type=int, default=10)
+   top_parser.add_argument('--ascending', action='store_true')
+   top_parser.add_argument('--ties', action='store_true')
+   top_parser.add_argument('--where', nargs='+', default=[])
+   top_parser.add_argument('--tags', nargs='+', default=[])
+
    ren_parser = subparsers.add_parser('render')
    ren_parser.add_argument('path')
 
    sta_parser = subparsers.add_parser('status')
- 
+
+   lock_parser = subparsers.add_parser('lock')
+   lock_parser.add_argument('action')
+
+   mig_parser = subparsers.add_parser('migrate')
+   mig_parser.add_argument('--backend', required=True, choices=['json', 'sqlite'])
+
+   serve_parser = subparsers.add_parser('serve')
+
+   batch_parser = subparsers.add_parser('batch')
+   batch_parser.add_argument('file', nargs='?', default="-")
+   batch_parser.add_argument('--strict', action='store_true')
+   return parser
+
+
+###############################################################################
+def cli_main():
+   parser = build_parser()
    args = parser.parse_args() 
 
    if args.version:
@@ -628,8 +919,21 @@ def cli_main():
        print(" > projit init <PROJECT NAME>")
        exit(1)
 
+   if args.cmd == "serve":
+      task_serve(config_path)
+      exit(0)
+
    project = projit_load(config_path)
 
+   if args.cmd == 'batch':
+      task_batch(project, parser, args.file, args.strict)
+   else:
+      run_task(project, args)
+
+
+###############################################################################
+def run_task(project, args, confirm=True):
+   """ Run a command against a loaded project. """
    format = 'simple'
    if args.markdown:
        format = 'markdown'
@@ -637,12 +941,16 @@ def cli_main():
        format = 'latex'
 
    if args.cmd == 'list':
-      task_list(args.subcmd, project, args.dataset, format, args.precision, args.tags)
+      task_list(args.subcmd, project, args.dataset, format, args.precision, args.tags, args.where)
 
    if args.cmd == 'compare':
       datasets = args.datasets.split(",")
       task_compare(project, datasets, args.metric, format, args.precision)
 
+   if args.cmd == 'top':
+      task_top(project, args.metric, args.dataset, args.k, args.ascending, args.ties,
+               args.where, args.tags, format, args.precision)
+
    if args.cmd == 'add':
       task_add(project, args.asset, args.name, args.path)
 
@@ -650,10 +958,10 @@ def cli_main():
       task_tag(project, args.asset, args.name, args.values)
 
    if args.cmd == 'rm':
-      task_rm(project, args.asset, args.name)
+      task_rm(project, args.asset, args.name, confirm)
 
    if args.cmd == 'plot':
-      task_plot(project, args.experiment, args.property, args.metric)
+      task_plot(project, args.experiment, args.property, args.metric, args.dataset)
 
    if args.cmd == 'update':
       task_update(project)
@@ -664,6 +972,12 @@ def cli_main():
    if args.cmd == 'render':
       task_render(project, args.path)
 
+   if args.cmd == 'migrate':
+      task_migrate(project, args.backend)
+
+   if args.cmd == 'lock':
+      task_lock(project, args.action)
+
 
 #################################################################################
 if __name__ == '__main__':
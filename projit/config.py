@@ -5,5 +5,12 @@ properties_file = "properties.yaml"
 data_file = "data.json"
 experiments_file = "experiments.json"
 execution_file = "executions.json"
+journal_file = "executions.journal"
+execution_folder = "executions"
+series_folder = "series"
+journal_compact_threshold = 1000
 tag_file = "tags.json"
 lock_file = "LOCK"
+database_file = "project.db"
+lock_lease = 300
+daemon_socket = "projit.sock"
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+import selectors
+import logging
+import socket
+import signal
+import json
+import os
+
+from .config import daemon_socket
+
+"""
+   projit.daemon: Local daemon that serializes project updates over a Unix socket.
+
+   `projit serve` keeps the project loaded in one process and accepts the
+   updates made by experiment scripts: start_experiment, end_experiment,
+   results and tags. Requests and replies are single lines of JSON:
+    - request : {"method":NAME, "args":[...]}
+    - reply   : {"result":VALUE} or {"error":MESSAGE}
+   The requests waiting on all connections are applied in order inside one
+   batch of the project, which takes the lock and saves once, and then every
+   request is answered. So a reply means the update is on disk, and under load
+   many updates share a single save.
+
+   The Projit and LiteProjit clients send their updates to the daemon when its
+   socket exists in the config folder, and write to the files directly otherwise.
+"""
+
+logger = logging.getLogger(__name__)
+
+# The project methods that can be requested, by request name
+daemon_methods = {
+    "start_experiment": "start_experiment",
+    "end_experiment": "end_experiment",
+    "add_results": "_add_result_rows",
+    "add_tags": "add_tags",
+}
+
+##########################################################################################
+class DaemonClient:
+    """
+    Connection from a client process to the project daemon.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: The path to the daemon socket
+        :type path: string, required
+        """
+        self.path = path
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.sock.connect(path)
+        except OSError:
+            self.sock.close()
+            raise
+        self.file = self.sock.makefile('rwb')
+
+
+    def request(self, method, *args):
+        """
+        Send a request to the daemon and wait for it to be applied.
+
+        :param method: The request name (see daemon_methods)
+        :type method: string, required
+
+        :return: (sent, result) : Whether the daemon received the request, and its result.
+                 When it was not sent the caller should apply the update itself.
+        :rtype: tuple(Boolean, object)
+        """
+        try:
+            self.file.write(json.dumps({"method":method, "args":args}).encode() + b"\n")
+            self.file.flush()
+        except OSError:
+            self.close()
+            return False, None
+        line = self.file.readline()
+        if not line:
+            self.close()
+            raise Exception("Projit Daemon Exception: The daemon closed the connection during '%s'" % method)
+        reply = json.loads(line)
+        if "error" in reply:
+            raise Exception(reply["error"])
+        return True, reply.get("result")
+
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+        self.file = None
+
+
+##########################################################################################
+def socket_path(config_path):
+    """
+    :return: The path to the daemon socket of a project
+    :rtype: string
+    """
+    return config_path + "/" + daemon_socket
+
+
+##########################################################################################
+def connect_daemon(config_path, client=None):
+    """
+    Connect to the daemon of a project, if it is running.
+    Only a single stat is needed when it is not.
+
+    :param config_path: The path to the projit config folder
+    :type config_path: string, required
+
+    :param client: An existing connection, returned if it is still open
+    :type client: DaemonClient, optional
+
+    :return: The connection, or None when no daemon is running
+    :rtype: DaemonClient
+    """
+    path = socket_path(config_path)
+    if not os.path.exists(path):
+        if client is not None and client.file is not None:
+            client.close()
+        return None
+    if client is not None and client.file is not None and client.path == path:
+        return client
+    try:
+        return DaemonClient(path)
+    except OSError:
+        return None
+
+
+##########################################################################################
+def apply_requests(project, requests):
+    """
+    Apply requests to the project in one batch.
+
+    :param project: The project held by the daemon
+    :type project: projit.projit.Projit, required
+
+    :param requests: The decoded requests
+    :type requests: list(Dictionary), required
+
+    :return: The replies, in the order of the requests
+    :rtype: list(Dictionary)
+    """
+    replies = []
+    try:
+        with project.batch():
+            for request in requests:
+                if not isinstance(request, dict) or request.get("method") not in daemon_methods:
+                    replies.append({"error":"Projit Daemon Exception: Unknown request '%s'" % request})
+                    continue
+                method = getattr(project, daemon_methods[request["method"]])
+                try:
+                    replies.append({"result":method(*request.get("args", []))})
+                except Exception as e:
+                    replies.append({"error":str(e)})
+    except Exception as e:
+        replies = [{"error":"Projit Daemon Exception: Update not saved -- %s" % e} for r in requests]
+    return replies
+
+
+##########################################################################################
+def reply(conn, answer):
+    """
+    Send a reply to a client. A client that has gone away is only logged.
+    """
+    try:
+        conn.sendall(json.dumps(answer).encode() + b"\n")
+    except OSError:
+        logger.warning("Projit daemon could not reply to a client")
+
+
+##########################################################################################
+def serve(config_path):
+    """
+    Run the project daemon until it is interrupted or terminated.
+
+    :param config_path: The path to the projit config folder
+    :type config_path: string, required
+
+    :return: None
+    :rtype: None
+    """
+    from .projit import load
+    path = socket_path(config_path)
+    if os.path.exists(path):
+        client = connect_daemon(config_path)
+        if client is not None:
+            client.close()
+            raise Exception("Projit Daemon Exception: A daemon is already serving this project")
+        os.remove(path)
+    project = load(config_path)
+    project._daemon = False
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(128)
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ)
+    buffers = {}
+
+    def terminate(signum, frame):
+        raise SystemExit(0)
+    signal.signal(signal.SIGTERM, terminate)
+    logger.info("Serving project %s on %s", project.name, path)
+    try:
+        while True:
+            requests = []
+            for key, events in selector.select():
+                if key.fileobj is server:
+                    conn, _ = server.accept()
+                    conn.settimeout(5)
+                    selector.register(conn, selectors.EVENT_READ)
+                    buffers[conn] = b""
+                    continue
+                conn = key.fileobj
+                try:
+                    data = conn.recv(65536)
+                except OSError:
+                    data = b""
+                if not data:
+                    selector.unregister(conn)
+                    conn.close()
+                    del buffers[conn]
+                    continue
+                *lines, buffers[conn] = (buffers[conn] + data).split(b"\n")
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    try:
+                        requests.append((conn, json.loads(line)))
+                    except ValueError as e:
+                        reply(conn, {"error":"Projit Daemon Exception: Invalid request -- %s" % e})
+            if not requests:
+                continue
+            replies = apply_requests(project, [r for _, r in requests])
+            for (conn, _), answer in zip(requests, replies):
+                reply(conn, answer)
+    finally:
+        os.remove(path)
+        for conn in buffers:
+            conn.close()
+        server.close()
+        selector.close()
@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+import time
+import os
+
+from .config import config_folder
+from .utils import locate_projit_config
+from .utils import result_value
+
+"""
+   projit.lite: A lightweight client for experiment scripts.
+
+   It only uses the standard library, so it starts in a fraction of the time
+   of the full projit package, which imports pandas, numpy and gitpython when
+   they are needed. It reads and writes the same project meta-data, through
+   the same storage backends, and exposes the functions experiment scripts use:
+
+       import projit.lite as pit
+       project = pit.projit_load()
+       train = project.get_path_to_dataset("train")
+       exec_id = project.start_experiment("Initial Exp", "experiments/exp_one.py")
+       project.add_result("Initial Exp", "rmse", 10.4, execution=exec_id)
+       project.end_experiment("Initial Exp", exec_id)
+"""
+
+##########################################################################################
+class LiteProjit:
+    """
+    The write-path subset of :class:`projit.projit.Projit`.
+    Every call writes through to the storage backend: there is no in-memory
+    copy of the experiments, results or executions to save.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: The path to the projit config folder
+        :type path: string, required
+        """
+        self.path = path
+        from .storage import open_storage
+        self.storage = open_storage(path)
+        self.daemon = None
+        self.props = self.storage.read(sections=["project"])['project']
+
+
+    def _daemon_request(self, method, *args):
+        """
+        Internal function: send an update to the project daemon, when one is running.
+
+        :return: (sent, result) : Whether the daemon applied the update, and its result
+        :rtype: tuple(Boolean, object)
+        """
+        from .daemon import connect_daemon
+        self.daemon = connect_daemon(self.path, self.daemon)
+        if self.daemon is None:
+            return False, None
+        return self.daemon.request(method, *args)
+
+
+    def _update(self, section, change):
+        """
+        Internal function: apply a change to a section of the project meta-data
+        under the project lock, after reading the latest version from disk.
+
+        :param section: The section (project|tags)
+        :type section: string, required
+
+        :param change: Function that modifies the section data in place
+        :type change: function, required
+        """
+        self.storage.lock()
+        try:
+            data = self.storage.read(sections=[section]).get(section, {})
+            change(data)
+            if section == "project":
+                self.storage.write(data, None, None, sections=["project"])
+                self.props = data
+            else:
+                self.storage.write(self.props, None, data, sections=[section])
+        finally:
+            self.storage.unlock()
+
+
+    def get_root_path(self):
+        """
+        Get the path to where the project folder is located
+
+        :return: path : The Path to the Project folder
+        :rtype: String
+        """
+        return self.path[0:len(self.path) - len(config_folder)]
+
+
+    def get_dataset(self, name):
+        """
+        Retrieve the dataset by name.
+
+        :param name: The dataset to retrieve
+        :type name: string, required
+
+        :return: Path to dataset
+        :rtype: String
+        """
+        datasets = self.props.get('datasets', {})
+        if name in datasets:
+            return datasets[name]
+        else:
+            raise Exception("Projit Dataset Exception: Named dataset '%s' not available. Register your dataset" % name)
+
+
+    def get_path_to_dataset(self, name):
+        """
+        Retrieve the path to a dataset by name, relative paths are resolved
+        against the project root.
+
+        :param name: The dataset to retrieve
+        :type name: string, required
+
+        :return: Path to dataset
+        :rtype: String
+        """
+        ds = self.get_dataset(name)
+        if ds[0:1] == "/" or ds[0:3] == "s3:" or ds[0:4] == "http":
+            return ds
+        return self.get_root_path() + ds
+
+
+    def experiment_exists(self, name):
+        """
+        :return: Whether the experiment is registered
+        :rtype: Boolean
+        """
+        return any(exp[0] == name for exp in self.props.get('experiments', []))
+
+
+    def start_experiment(self, name, path, params={}, tags={}):
+        """
+        Start an experiment execution, registering the experiment if this is its first execution.
+        See :meth:`projit.projit.Projit.start_experiment`.
+
+        :param name: The experiment name (Unique Identifer)
+        :type name: string, required
+
+        :param path: The path to the experiment script being executed
+        :type path: string, required
+
+        :param params: Optional dictionary of parameters used in the experiment execution
+        :type params: Dictionary, optional
+
+        :param tags: Optional dictionary of tags to describe the experiment
+        :type tags: Dictionary, optional
+
+        :return: id : The Execution ID
+        :rtype: String
+        """
+        sent, id = self._daemon_request("start_experiment", name, path, params, tags)
+        if sent:
+            if not self.experiment_exists(name):
+                self.props.setdefault('experiments', []).append([name, path])
+            return id
+        if self.storage.row_level:
+            self.storage.put_experiment(name, path)
+        elif not self.experiment_exists(name):
+            def register(props):
+                experiments = props.setdefault('experiments', [])
+                if not any(exp[0] == name for exp in experiments):
+                    experiments.append([name, path])
+                    props['generation'] = props.get('generation', 0) + 1
+            self._update("project", register)
+
+        startdt = time.time()
+        s = name + repr(startdt)
+        import hashlib
+        id = hashlib.sha256(s.encode()).hexdigest()
+        payload = {'start':startdt, 'end':None, 'githash':git_head(), 'params':params}
+        self.storage.record_execution({'event':'start', 'experiment':name, 'id':id, 'payload':payload}, None)
+
+        if len(tags)>0:
+            self.add_tags("experiment", name, tags)
+
+        return id
+
+
+    def end_experiment(self, name, id, hyperparams={}):
+        """
+        End an experiment execution.
+
+        :param name: The experiment name (Unique Identifer)
+        :type name: string, required
+
+        :param id: The execution hash ID returned by the function: start_experiment
+        :type id: string, required
+
+        :param hyperparams: Optional dictionary of hyperparameters used in the experiment execution
+        :type hyperparams: Dictionary, optional
+
+        :return: None
+        :rtype: None
+        """
+        sent, _ = self._daemon_request("end_experiment", name, id, hyperparams)
+        if sent:
+            return
+        event = {'event':'end', 'experiment':name, 'id':id,
+                 'end':time.time(), 'hyperparams':hyperparams}
+        if not self.storage.row_level:
+            from .stats import epoch
+            records = self.storage.read_shard(name)
+            if id not in records:
+                raise Exception(f"Projit Experiment Exception: Cannot end experiment: '{name}' -- Executions not started")
+            if epoch(records[id].get('end')) is None:
+                event['duration'] = event['end'] - epoch(records[id]['start'])
+        self.storage.record_execution(event, None)
+
+
+    def add_result(self, experiment, metric, value, dataset=None, execution=None):
+        """
+        Add results from an experiment to the project.
+        See :meth:`projit.projit.Projit.add_result`.
+
+        :param experiment: The experiment name
+        :type experiment: string, required
+
+        :param metric: The name of the metric we are adding.
+        :type metric: string, required
+
+        :param value: The value of the metric to add.
+        :type value: float, required
+
+        :param dataset: The dataset against which the results are generated
+        :type dataset: string, optional
+
+        :param execution: The execution ID returned by :meth:`start_experiment`
+        :type execution: string, optional
+
+        :return: None
+        :rtype: None
+        """
+        self.add_results(experiment, {metric:value}, dataset, execution)
+
+
+    def add_results(self, experiment, results, dataset=None, execution=None):
+        """
+        Add a set of results from an experiment to the project in a single update.
+
+        :param experiment: The experiment name
+        :type experiment: string, required
+
+        :param results: The dictionary of results 'metric':value
+        :type results: Dictionary, required
+
+        :param dataset: The dataset against which the results are generated
+        :type dataset: string, optional
+
+        :param execution: The execution ID returned by :meth:`start_experiment`
+        :type execution: string, optional
+
+        :return: None
+        :rtype: None
+        """
+        rows = [(experiment, dataset, metric, result_value(value, metric)) for metric, value in results.items()]
+        sent, _ = self._daemon_request("add_results", rows, execution)
+        if sent:
+            return
+        if execution is not None:
+            if not self.storage.has_execution(experiment, execution):
+                raise Exception(f"Projit Experiment Exception: No execution '{execution}' of experiment '{experiment}'")
+            self.storage.append_series(rows, execution, time.time())
+        if self.storage.row_level:
+            self.storage.put_results(rows)
+            return
+
+        def record(props):
+            if dataset is None:
+                rez = props.setdefault('results', {}).setdefault(experiment, {})
+            else:
+                rez = props.setdefault('dataresults', {}).setdefault(dataset, {}).setdefault(experiment, {})
+            for _, _, metric, value in rows:
+                rez[metric] = value
+            props['generation'] = props.get('generation', 0) + 1
+        self._update("project", record)
+
+
+    def add_tags(self, asset, name, tags):
+        """
+        Add tags to a specific asset
+
+        :param asset: The asset type (experiment|dataset)
+        :type asset: string, required
+
+        :param name: The asset name
+        :type name: string, required
+
+        :param tags: The dictionary of tags
+        :type tags: Dictionary(string:string)
+
+        :return: None
+        :rtype: None
+        """
+        sent, _ = self._daemon_request("add_tags", asset, name, tags)
+        if sent:
+            return
+        if self.storage.row_level:
+            self.storage.put_tags(asset, name, tags)
+            return
+
+        def record(data):
+            data.setdefault(asset, {}).setdefault(name, {}).update(tags)
+        self._update("tags", record)
+
+
+##########################################################################################
+def git_head():
+    """
+    The commit hash of the git repository containing the working directory,
+    read directly from the .git folder. Empty when there is no repository.
+
+    :return: githash
+    :rtype: string
+    """
+    folder = os.getcwd()
+    while True:
+        git_path = os.path.join(folder, ".git")
+        if os.path.exists(git_path):
+            break
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            return ""
+        folder = parent
+    try:
+        if os.path.isfile(git_path):
+            # Worktrees and submodules point to the git folder
+            with open(git_path) as f:
+                git_path = os.path.join(folder, f.read().split("gitdir:", 1)[1].strip())
+        with open(os.path.join(git_path, "HEAD")) as f:
+            head = f.read().strip()
+        if not head.startswith("ref:"):
+            return head
+        ref = head[4:].strip()
+        common = git_path
+        if os.path.exists(os.path.join(git_path, "commondir")):
+            with open(os.path.join(git_path, "commondir")) as f:
+                common = os.path.join(git_path, f.read().strip())
+        for base in [git_path, common]:
+            if os.path.exists(os.path.join(base, ref)):
+                with open(os.path.join(base, ref)) as f:
+                    return f.read().strip()
+        with open(os.path.join(common, "packed-refs")) as f:
+            for line in f:
+                if line.rstrip().endswith(" " + ref):
+                    return line.split(" ", 1)[0]
+    except (OSError, IndexError):
+        pass
+    return ""
+
+
+##########################################################################################
+def load(config_path):
+    """
+    Open the project in the given config folder with the lightweight client.
+
+    :param config_path: The path to the projit configuration
+    :type config_path: string, required
+
+    :return: LiteProjit Object
+    :rtype: LiteProjit
+    """
+    return LiteProjit(config_path)
+
+
+##########################################################################################
+def projit_load():
+    """
+    Load the project by first locating the config folder.
+
+    :return: LiteProjit Object
+    :rtype: LiteProjit
+    """
+    return load( locate_projit_config() )
@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+import time
+import json
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .config import lock_lease
+
+"""
+   projit.lock: Inter-process lock on the projit LOCK file.
+
+   On POSIX systems the lock is an exclusive fcntl.flock on the LOCK file, so
+   waiting processes block in the kernel and wake as soon as the holder
+   releases it. Elsewhere the LOCK file is created atomically with O_EXCL.
+   In both cases the LOCK file only exists while the lock is held.
+
+   The holder records its pid, hostname and acquisition time in the LOCK file
+   and renews a heartbeat while it holds the lock. A waiter breaks the lock
+   when the holder is no longer running on this host, or when its lease has
+   expired without a heartbeat.
+"""
+
+poll_interval = 0.01
+
+##########################################################################################
+class FileLock:
+    """
+    Exclusive, re-entrant lock on a lock file shared between processes.
+    """
+
+    def __init__(self, path, lease=lock_lease):
+        """
+        :param path: The path to the lock file
+        :type path: string, required
+
+        :param lease: Seconds without a heartbeat after which the lock is considered stale
+        :type lease: float, optional
+        """
+        self.path = path
+        self.lease = lease
+        self.fd = None
+        self.depth = 0
+        self._owner = None
+        self._heartbeat = None
+        import threading
+        self._mutex = threading.Lock()
+
+
+    def acquire(self, timeout=None):
+        """
+        Acquire the lock, waiting for other holders to release it.
+        Stale locks left by crashed holders are broken automatically.
+
+        :param timeout: Optional number of seconds to wait before giving up
+        :type timeout: float, optional
+
+        :return: None
+        :rtype: None
+        """
+        if self.fd is not None:
+            self.depth += 1
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            fd = self._try_acquire(blocking=False)
+            if fd is None:
+                self.break_if_stale()
+                # With flock and no deadline we can wait in the kernel.
+                if deadline is None and fcntl is not None:
+                    fd = self._try_acquire(blocking=True)
+            if fd is not None:
+                self.fd = fd
+                self.depth = 1
+                self._write_owner()
+                self._start_heartbeat()
+                return
+            if deadline is not None and time.monotonic() > deadline:
+                raise Exception("Projit Lock Exception: Timed out after %s seconds waiting for lock: %s" % (timeout, self.path))
+            time.sleep(poll_interval)
+
+
+    def _try_acquire(self, blocking):
+        """
+        Internal function: make one attempt at taking the lock.
+
+        :return: The locked file descriptor or None
+        :rtype: int
+        """
+        if fcntl is None:
+            try:
+                return os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+            except FileExistsError:
+                return None
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if blocking:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        # The previous holder unlinks the file on release, so make sure we
+        # locked the file that is currently at the path, not an orphan.
+        if not self._is_current(fd):
+            os.close(fd)
+            return None
+        return fd
+
+
+    def _is_current(self, fd):
+        """
+        Internal function: check that the descriptor refers to the file at the lock path.
+        """
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return os.fstat(fd).st_ino == current.st_ino
+
+
+    def release(self):
+        """
+        Release the lock. Does nothing if the lock is not held.
+
+        :return: None
+        :rtype: None
+        """
+        if self.fd is None:
+            return
+        self.depth -= 1
+        if self.depth > 0:
+            return
+        with self._mutex:
+            self._heartbeat.set()
+            # If our lock was broken the path now belongs to another holder.
+            if self._is_current(self.fd):
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+            os.close(self.fd)
+            self.fd = None
+
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+    def held(self):
+        """
+        :return: True if this object currently holds the lock
+        :rtype: Boolean
+        """
+        return self.fd is not None
+
+
+    def _write_owner(self):
+        """
+        Internal function: record the lock owner in the lock file.
+        """
+        import socket
+        now = time.time()
+        self._owner = {'pid':os.getpid(), 'host':socket.gethostname(), 'acquired':now,
+                       'heartbeat':now, 'lease':self.lease}
+        self._rewrite_owner()
+
+
+    def _rewrite_owner(self):
+        """
+        Internal function: replace the content of the held lock file with the owner info.
+        """
+        os.lseek(self.fd, 0, os.SEEK_SET)
+        os.ftruncate(self.fd, 0)
+        os.write(self.fd, json.dumps(self._owner).encode())
+
+
+    def _start_heartbeat(self):
+        """
+        Internal function: renew the heartbeat in the lock file every third of
+        the lease while the lock is held.
+        """
+        import threading
+        stop = threading.Event()
+        self._heartbeat = stop
+
+        def beat():
+            while not stop.wait(self.lease / 3):
+                with self._mutex:
+                    if stop.is_set():
+                        return
+                    self._owner['heartbeat'] = time.time()
+                    self._rewrite_owner()
+
+        threading.Thread(target=beat, daemon=True).start()
+
+
+    def break_if_stale(self):
+        """
+        Break the lock if its holder is stale, logging a warning when it does.
+        With flock this is only called while a live process holds the lock, as the
+        kernel releases the lock of a process that dies. The pid recorded in the
+        file may then belong to an earlier holder, before the new one wrote its
+        owner record, so only an expired lease of a complete owner record counts.
+
+        :return: True if a stale lock was broken
+        :rtype: Boolean
+        """
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return False
+        owner = read_owner(self.path)
+        if fcntl is None:
+            reason = stale_reason(owner, self.lease)
+        elif owner is None or 'pid' not in owner:
+            reason = None
+        else:
+            reason = stale_reason(owner, self.lease, check_pid=False)
+        if reason is None:
+            return False
+        try:
+            # Only remove the lock file that was judged stale
+            if os.stat(self.path).st_ino != inode:
+                return False
+            get_logger().warning("Projit: breaking stale lock %s (%s): %s", self.path, reason, describe_owner(owner))
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        return True
+
+
+##########################################################################################
+def get_logger():
+    """
+    The logger of the lock module, imported on first use so that
+    importing the lock does not load the logging package.
+
+    :return: logger
+    :rtype: logging.Logger
+    """
+    import logging
+    return logging.getLogger(__name__)
+
+
+##########################################################################################
+def read_owner(path):
+    """
+    Read the owner information recorded in a lock file.
+    Lock files written by older versions of projit contain no owner, in that
+    case only the modification time is known.
+
+    :param path: The path to the lock file
+    :type path: string, required
+
+    :return: owner info, or None when the lock file does not exist
+    :rtype: Dictionary
+    """
+    try:
+        with open(path) as f:
+            content = f.read()
+        mtime = os.path.getmtime(path)
+    except FileNotFoundError:
+        return None
+    try:
+        owner = json.loads(content)
+    except ValueError:
+        owner = {}
+    if not isinstance(owner, dict):
+        owner = {}
+    owner.setdefault('heartbeat', mtime)
+    return owner
+
+
+##########################################################################################
+def stale_reason(owner, lease=lock_lease, check_pid=True):
+    """
+    Decide whether a lock owner is stale.
+
+    :param owner: The owner info from :func:`read_owner`
+    :type owner: Dictionary, required
+
+    :param lease: Seconds without a heartbeat after which the lock is stale
+    :type lease: float, optional
+
+    :param check_pid: Whether an owner process that is no longer running makes the lock stale
+    :type check_pid: Boolean, optional
+
+    :return: The reason the lock is stale, or None if it is not
+    :rtype: String
+    """
+    import socket
+    if owner is None:
+        return None
+    pid = owner.get('pid')
+    if check_pid and pid is not None and owner.get('host') == socket.gethostname() and not pid_alive(pid):
+        return "owner process %i is no longer running" % pid
+    lease = owner.get('lease', lease)
+    age = time.time() - owner['heartbeat']
+    if age > lease:
+        return "no heartbeat for %.0f seconds, lease is %.0f seconds" % (age, lease)
+    return None
+
+
+##########################################################################################
+def pid_alive(pid):
+    """
+    Check whether a process with the given pid is running on this host.
+
+    :return: alive
+    :rtype: Boolean
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+##########################################################################################
+def describe_owner(owner):
+    """
+    Human readable description of a lock owner.
+
+    :return: description
+    :rtype: String
+    """
+    if 'pid' not in owner:
+        return "unknown owner, last modified %s" % time.ctime(owner['heartbeat'])
+    return "pid %s on %s, acquired %s, last heartbeat %s" % (
+        owner['pid'], owner.get('host', '?'), time.ctime(owner.get('acquired', owner['heartbeat'])),
+        time.ctime(owner['heartbeat']))
+
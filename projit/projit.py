@@ -1,21 +1,24 @@
+from contextlib import contextmanager
 from datetime import datetime
-import pandas as pd
-import numpy as np
 import hashlib
 import time
 import json
-import git
 import re
 import os
 
-from .config import lock_file
-from .config import config_file
-from .config import execution_file
-from .config import tag_file
 from .config import config_folder
 from .template import load_template
+from .storage import open_storage
+from .storage import migrate
+from .storage import sections
+from .lock import stale_reason
+from .storage import apply_journal_event
+from .stats import summarize
+from .stats import epoch
 from .utils import locate_projit_config
-from .pdf import PDF
+from .utils import forget_projit_config
+from .utils import result_value
+from .daemon import connect_daemon
 
 ##########################################################################################
 
@@ -32,14 +35,15 @@ class Projit:
                  path, 
                  name, 
                  desc="", 
-                 experiments=[], 
-                 datasets={},
-                 results={}, 
-                 params={},
-                 hyperparams={},
-                 dataresults={},
-                 executions={},
-                 tags={}
+                 experiments=None, 
+                 datasets=None,
+                 results=None, 
+                 params=None,
+                 hyperparams=None,
+                 dataresults=None,
+                 executions=None,
+                 tags=None,
+                 generation=0
     ):
         """
         Initialise a projit project object.
@@ -55,7 +59,7 @@ class Projit:
         :param desc: The project description
         :type desc: string, optional
 
-        :param experiments: The array of experiments
+        :param experiments: The array of experiments as (name, path) pairs
         :type experiments: Array, optional
 
         :param datasets: The dictionary of datasets 'name':'path'
@@ -84,33 +88,227 @@ class Projit:
                             The ID is a HASH of experiment_name and 
                             Structure: {'experiment_name':{
                                              'ID':{ 
-                                                 'start':DATETIME, 
-                                                 'end':DATETIME,
+                                                 'start':EPOCH, 
+                                                 'end':EPOCH,
                                                  'githash':STRING, 
                                                  'params':DICT,
                                                  'hyperparams':DICT
                                               }
                                            }
                                        }
+                            Start and end times are seconds since the epoch, the end
+                            is None until the execution ends. Projects created with earlier
+                            versions of projit contain datetime strings instead.
         :type executions: Dictionary of Dictionary of Dictionary, optional
  
         :param tags: The dictionary of tags for project assets.
         :type tags: Dictionary of Dictionary of Dictionary, optional
 
+        :param generation: Counter incremented whenever the experiments or results change.
+                           Used to invalidate cached results tables.
+        :type generation: int, optional
+
         :return: None 
         :rtype: None 
         """
+        self._dirty = set()
+        self._batch_depth = 0
+        self._pending_events = []
+        self._pending_removals = []
+        self._executions = None
+        self._tags = None
+        self._results_cache = {}
+        self._experiments = {}
+        self._results = None
+        self._result_data = {"results":{}, "dataresults":{}}
+        self._tag_index = None
+        self._daemon = None
         self.path = path
         self.name = name
         self.desc = desc
-        self.experiments = experiments
-        self.datasets = datasets
-        self.results = results
-        self.params = params
-        self.hyperparams = hyperparams
-        self.dataresults = dataresults
-        self.executions = executions
-        self.tags = tags
+        self.experiments = experiments if experiments is not None else []
+        self.datasets = datasets if datasets is not None else {}
+        self.results = results if results is not None else {}
+        self.params = params if params is not None else {}
+        self.hyperparams = hyperparams if hyperparams is not None else {}
+        self.dataresults = dataresults if dataresults is not None else {}
+        self.executions = executions if executions is not None else {}
+        self.tags = tags if tags is not None else {}
+        self.generation = generation
+        self._storage = None
+
+
+    def __setattr__(self, key, value):
+        """
+        Assigning a project attribute marks its meta-data section as changed,
+        so that the next call to :meth:`projit.Projit.save` writes it.
+        """
+        if key[0] != "_":
+            self._dirty.add(key if key in sections else "project")
+            if key in ["experiments", "results", "dataresults"]:
+                self._results_cache.clear()
+        object.__setattr__(self, key, value)
+
+
+    @property
+    def experiments(self):
+        """
+        The registered experiments as a list of (name, path) pairs, in registration order.
+        They are held in a dictionary indexed by name, so the list is read-only:
+        use the experiment functions to modify them, or assign a new list.
+
+        :return: experiments
+        :rtype: ExperimentList
+        """
+        return ExperimentList(self._experiments.items())
+
+
+    @experiments.setter
+    def experiments(self, value):
+        self._experiments = {name:path for name, path in value}
+
+
+    @property
+    def results(self):
+        """
+        The overall results of the experiments as {'experiment':{'metric':value}}.
+        The results are held as columnar arrays (see :class:`projit.results.ResultStore`),
+        this dictionary is a copy: use the result functions to modify them.
+
+        :return: results
+        :rtype: Dictionary
+        """
+        if self._results is None:
+            return self._result_data["results"]
+        return self._results.nested(None)
+
+
+    @results.setter
+    def results(self, value):
+        if self._results is None:
+            self._result_data["results"] = value
+        else:
+            self._results.set_results(value)
+
+
+    @property
+    def dataresults(self):
+        """
+        The results of the experiments on specific datasets as
+        {'dataset':{'experiment':{'metric':value}}}.
+        This dictionary is a copy: use the result functions to modify them.
+
+        :return: dataresults
+        :rtype: Dictionary
+        """
+        if self._results is None:
+            return self._result_data["dataresults"]
+        return {dataset:self._results.nested(dataset) for dataset in self._results.dataset_names()}
+
+
+    @dataresults.setter
+    def dataresults(self, value):
+        if self._results is None:
+            self._result_data["dataresults"] = value
+        else:
+            self._results.set_dataresults(value)
+
+
+    @property
+    def _store(self):
+        """
+        Internal: the columnar results store. It is built from the results of the
+        project file on first use, so that commands which do not use the results
+        never load numpy.
+
+        :return: store
+        :rtype: projit.results.ResultStore
+        """
+        if self._results is None:
+            from .results import ResultStore
+            store = ResultStore()
+            store.set_results(self._result_data["results"])
+            store.set_dataresults(self._result_data["dataresults"])
+            self._results = store
+            self._result_data = None
+        return self._results
+
+
+    @property
+    def executions(self):
+        """
+        The execution records of all experiments.
+        Projects opened with :func:`projit.projit.load` read them from disk on first access.
+
+        :return: executions
+        :rtype: Dictionary
+        """
+        if self._executions is None:
+            data = self.storage.read(sections=["executions"])
+            self._executions = data.get('executions', {})
+            for event in self._pending_events:
+                apply_journal_event(self._executions, event)
+        return self._executions
+
+
+    @executions.setter
+    def executions(self, value):
+        self._executions = value
+
+
+    @property
+    def tags(self):
+        """
+        The tags of the project assets.
+        Projects opened with :func:`projit.projit.load` read them from disk on first access.
+
+        :return: tags
+        :rtype: Dictionary
+        """
+        if self._tags is None:
+            self._tags = self.storage.read(sections=["tags"]).get('tags', {})
+        return self._tags
+
+
+    @tags.setter
+    def tags(self, value):
+        self._tags = value
+        self._tag_index = None
+
+
+    def loaded_sections(self):
+        """
+        :return: The meta-data sections that are held in memory
+        :rtype: list(string)
+        """
+        return [s for s in sections if s == "project" or getattr(self, "_" + s) is not None]
+
+
+    @property
+    def storage(self):
+        """
+        The storage backend holding the project meta-data.
+        Opened on first use from the project path.
+
+        :return: storage
+        :rtype: projit.storage.Storage
+        """
+        if self._storage is None or self._storage.path != self.path:
+            self._storage = open_storage(self.path)
+        return self._storage
+
+
+    def migrate_storage(self, backend):
+        """
+        Convert the project meta-data to another storage backend.
+
+        :param backend: The name of the storage backend (json|sqlite)
+        :type backend: string, required
+
+        :return: None
+        :rtype: None
+        """
+        self._storage = migrate(self.path, backend)
 
 
     def get_root_path(self):
@@ -146,29 +344,41 @@ class Projit:
         :return: id : The Execution ID
         :rtype: String
         """
-        self.initiate_lock()
-        self.reload()
+        sent, id = self._daemon_request("start_experiment", name, path, params, tags)
+        if sent:
+            self._daemon_applied(experiment=(name, path), executions=True, tags=len(tags)>0)
+            return id
+        row_level = self.storage.row_level
+        # Execution records are written by the storage backend without the project
+        # lock, which is only needed to register a new experiment.
+        register = not row_level and not self.experiment_exists(name)
+        generation = None
+        if row_level:
+            generation = self.storage.put_experiment(name, path)
+        elif register:
+            self._begin_update()
 
         if not self.experiment_exists(name):
-            self.add_experiment(name, path)
+            self._experiments[name] = path
+            self._results_changed(generation)
+            if not row_level:
+                self._dirty.add("project")
 
-        startdt = str(datetime.now())
-        s = name + startdt
+        startdt = time.time()
+        s = name + repr(startdt)
         id = hashlib.sha256(s.encode()).hexdigest()
+        import git
         try:
             repo = git.Repo(search_parent_directories=True)
             ghash = repo.head.object.hexsha
         except git.exc.InvalidGitRepositoryError:
             ghash = ""
-        payload = {'start':startdt, 'end':"", 'githash':ghash, 'params':params}
-        exper_execs = {}
-
-        if name in self.executions:
-            exper_execs = self.executions[name]
-        exper_execs[id] = payload
-        self.executions[name] = exper_execs 
-        self.save()
-        self.release_lock()
+        payload = {'start':startdt, 'end':None, 'githash':ghash, 'params':params}
+        event = {'event':'start', 'experiment':name, 'id':id, 'payload':payload}
+        self._apply_execution(event)
+        self._record_execution(event)
+        if register:
+            self._end_update()
 
         if len(tags)>0:
             self.add_tags("experiment", name, tags)
@@ -193,28 +403,80 @@ class Projit:
         :return: None
         :rtype: None
         """
+        sent, _ = self._daemon_request("end_experiment", name, id, hyperparams)
+        if sent:
+            self._daemon_applied(executions=True)
+            return
 
         if not self.experiment_exists(name):
             raise Exception(f"Projit Experiment Exception: Cannot end experiment: '{name}' -- Experiment not registered")
         
-        self.initiate_lock()
-        self.reload()
-        if name in self.executions:
-            exper_execs = self.executions[name]
-        else:
+        event = {'event':'end', 'experiment':name, 'id':id, 
+                 'end':time.time(), 'hyperparams':hyperparams}
+        if self.storage.row_level:
+            self.storage.record_execution(event, self._executions)
+            self._apply_execution(event)
+            return
+
+        records = self._experiment_executions(name)
+        if id not in records:
             raise Exception(f"Projit Experiment Exception: Cannot end experiment: '{name}' -- Executions not started")
+        if epoch(records[id].get('end')) is None:
+            event['duration'] = event['end'] - epoch(records[id]['start'])
+        self._apply_execution(event)
+        self._record_execution(event)
 
-        if id in exper_execs:
-            payload = exper_execs[id]
-        else:
-            raise Exception(f"Projit Experiment Exception: Cannot end experiment: '{name}' -- Executions not started")
 
-        payload['end'] = str(datetime.now())
-        payload['hyperparams'] = hyperparams
-        exper_execs[id] = payload
-        self.executions[name] = exper_execs
-        self.save()
-        self.release_lock()    
+    def _apply_execution(self, event):
+        """
+        Internal function: apply an execution event to the in-memory executions,
+        if they are loaded. Otherwise they are read, including the event, on first access.
+        """
+        if self._executions is not None:
+            apply_journal_event(self._executions, event)
+
+
+    def _experiment_executions(self, name):
+        """
+        Internal function: the execution records of one experiment.
+        Only the records of this experiment are read, and only if they
+        changed on disk. Records that are not yet saved are kept.
+
+        :param name: The experiment name
+        :type name: string, required
+
+        :return: The execution records {'ID':{...}}
+        :rtype: Dictionary
+        """
+        if self._batch_depth > 0 or "executions" in self._dirty:
+            return self.executions.get(name, {})
+        if self._executions is None:
+            return self.storage.read_shard(name)
+        records = self.storage.read_shard(name, only_changed=True)
+        if records:
+            self._executions[name] = records
+        elif records is not None:
+            self._executions.pop(name, None)
+        return self._executions.get(name, {})
+
+    def _has_execution(self, name, id):
+        """
+        Internal function: check that an experiment has an execution. The loaded
+        executions are used if they are current, otherwise the storage checks it
+        without reading the whole execution history of the experiment.
+
+        :param name: The experiment name
+        :type name: string, required
+
+        :param id: The execution ID
+        :type id: string, required
+
+        :return: True if the execution exists
+        :rtype: Boolean
+        """
+        if self._executions is None and self._batch_depth == 0 and "executions" not in self._dirty:
+            return self.storage.has_execution(name, id)
+        return id in self._experiment_executions(name)
 
     def get_total_executions(self):
         """
@@ -223,10 +485,39 @@ class Projit:
         :return: executions
         :rtype: int
         """
-        executions = 0
-        for name in self.executions:
-            executions += len(self.executions[name])
-        return executions
+        return sum(stats['count'] for stats in self.storage.read_stats().values())
+
+    def get_experiment_stats(self, name=None):
+        """
+        Get the running execution statistics of an experiment, or of all experiments.
+        These are maintained as executions start and end, so they do not
+        require reading the execution history. Executions recorded inside a
+        batch are included once the batch is saved.
+
+        :param name: The experiment name, by default all experiments with executions
+        :type name: string, optional
+
+        :return: count, completed, mean, std, min, max, last, p50, p95 of the
+                 execution times in seconds. For all experiments, a dictionary
+                 of experiment name to statistics.
+        :rtype: Dictionary
+        """
+        if name is None:
+            return {n:summarize(stats) for n, stats in self.storage.read_stats().items()}
+        return summarize(self.storage.read_stats([name])[name])
+
+    def get_execution_stats(self):
+        """
+        Return the execution statistics of all experiments.
+
+        :return: Dictionary of experiment name to (executions, mean_execution_time)
+        :rtype: Dictionary
+        """
+        stats = {}
+        for name, summary in self.get_experiment_stats().items():
+            stats[name] = (summary['completed'], summary['mean'])
+        return stats
+
 
     def get_experiment_execution_stats(self, name):
         """
@@ -239,14 +530,8 @@ class Projit:
         :return: executions, mean_execution_time : A pair of statistics
         :rtype: int, float
         """
-        if name in self.executions:
-            exec_times = self.get_execution_times(name)
-            if len(exec_times) > 0:
-                return len(exec_times), np.mean(exec_times)
-            else:
-                return 0, 0
-        else:
-            return 0, 0
+        summary = self.get_experiment_stats(name)
+        return summary['completed'], summary['mean']
 
 
     def get_mean_execution_time(self, name):
@@ -260,11 +545,7 @@ class Projit:
         :return: mean_execution_time : The mean time of execution
         :rtype: float
         """
-        exec_times = self.get_execution_times(name)
-        if len(exec_times) > 0:
-            return np.mean(exec_times)
-        else:
-            return 0
+        return self.get_experiment_stats(name)['mean']
 
 
     def get_execution_times(self, name):
@@ -278,17 +559,68 @@ class Projit:
         :return: execution_times : Array of execution times
         :rtype: list(float)
         """
-        if name in self.executions:
-            exec_times = []
-            for execid, exec in self.executions[name].items():
-                if exec["end"] != "":
-                    a = datetime.strptime(exec["start"], '%Y-%m-%d %H:%M:%S.%f')
-                    b = datetime.strptime(exec["end"], '%Y-%m-%d %H:%M:%S.%f')
-                    diff = (b-a).seconds
-                    exec_times.append(diff)
-            return exec_times
-        else:
-            return []
+        return execution_durations(self._experiment_executions(name).values()).tolist()
+
+
+    def get_result_history(self, experiment, metric, dataset=None):
+        """
+        Retrieve the history of a result, as recorded by the executions of the experiment.
+        Only results added with an execution ID are part of the history.
+
+        :param experiment: The experiment name
+        :type experiment: string, required
+
+        :param metric: The metric name
+        :type metric: string, required
+
+        :param dataset: The dataset against which the results are generated
+        :type dataset: string, optional
+
+        :return: DataFrame with columns execution, time (epoch seconds) and value, in recording order
+        :rtype: pandas.DataFrame
+        """
+        import pandas as pd
+        from .series import execution_ids
+        records = self.storage.read_series(experiment, metric, dataset)
+        return pd.DataFrame({"execution":execution_ids(records),
+                             "time":records['time'], "value":records['value']})
+
+
+    def get_hyperparam_history(self, experiment, hyperparam):
+        """
+        Retrieve the values of a hyperparameter over the ended executions of an experiment,
+        in the order they were started.
+
+        :param experiment: The experiment name
+        :type experiment: string, required
+
+        :param hyperparam: The hyperparameter name
+        :type hyperparam: string, required
+
+        :return: The values of the hyperparameter (None where an execution did not record it)
+        :rtype: list
+        """
+        records = [r for r in self._experiment_executions(experiment).values() if 'hyperparams' in r]
+        records.sort(key=lambda r: epoch(r['start']))
+        return [r['hyperparams'].get(hyperparam) for r in records]
+
+
+    def get_all_execution_times(self):
+        """
+        Return the execution times of all experiments.
+        The durations are computed for all executions at once.
+
+        :return: Dictionary of experiment name to array of execution times in seconds
+        :rtype: Dictionary
+        """
+        import numpy as np
+        names = list(self.executions)
+        records = [r for name in names for r in self.executions[name].values()]
+        durations = to_epoch([r['end'] for r in records]) - to_epoch([r['start'] for r in records])
+        owner = np.repeat(np.arange(len(names)), [len(self.executions[name]) for name in names])
+        completed = ~np.isnan(durations)
+        bounds = np.searchsorted(owner[completed], np.arange(1, len(names)))
+        return dict(zip(names, np.split(durations[completed], bounds)))
 
 
     def add_experiment(self, name, path):
@@ -307,15 +639,14 @@ class Projit:
         :return: None
         :rtype: None
         """
-        self.initiate_lock()
-        self.reload()
-        for elem in self.experiments: 
-            if elem[0] == name:
-                self.experiments.remove(elem)
-                self.clean_experimental_results(name)
-        self.experiments.append( (name, path) )
-        self.save()
-        self.release_lock()
+        self._begin_update()
+        if name in self._experiments:
+            del self._experiments[name]
+            self.clean_experimental_results(name)
+        self._experiments[name] = path
+        self._results_changed()
+        self._dirty.add("project")
+        self._end_update()
 
 
     def update_name_description(self, name, descrip):
@@ -331,12 +662,10 @@ class Projit:
         :return: None
         :rtype: None
         """
-        self.initiate_lock()
-        self.reload()
+        self._begin_update()
         self.name = name
         self.desc = descrip
-        self.save()
-        self.release_lock()
+        self._end_update()
 
 
     def dataset_exists(self, name):
@@ -365,10 +694,7 @@ class Projit:
         :return: exists
         :rtype: Boolean
         """
-        for elem in self.experiments:
-            if elem[0] == name:
-                return True
-        return False
+        return name in self._experiments
  
 
     def validate_asset(self, asset, name):
@@ -408,8 +734,15 @@ class Projit:
         :return: None
         :rtype: None
         """
-        self.initiate_lock()
-        self.reload()
+        sent, _ = self._daemon_request("add_tags", asset, name, tags)
+        if sent:
+            self._daemon_applied(tags=True)
+            return
+        row_level = self.storage.row_level
+        if row_level:
+            self.storage.put_tags(asset, name, tags)
+        else:
+            self._begin_update()
         assets = {}
         assets[name] = {}
         if asset in self.tags:
@@ -417,11 +750,57 @@ class Projit:
             if name not in assets:
                 assets[name] = {}
         for tag in tags:
+            if self._tag_index is not None:
+                self._index_tag(asset, name, tag, tags[tag], assets[name].get(tag))
             assets[name][tag] = tags[tag]
 
         self.tags[asset] = assets
-        self.save()
-        self.release_lock()
+        if not row_level:
+            self._dirty.add("tags")
+            self._end_update()
+
+
+    def _index_tag(self, asset, name, tag, value, old=None):
+        """
+        Internal function: record a tag value of an asset in the inverted tag index,
+        removing its previous value.
+        """
+        values = self._tag_index.setdefault((asset, tag), {})
+        if old is not None and tag_key(old) in values:
+            values[tag_key(old)].pop(name, None)
+        values.setdefault(tag_key(value), {})[name] = None
+
+
+    def find(self, asset, **tags):
+        """
+        Find the assets that have all of the given tag values, using an inverted
+        index of the tags that is built on first use and maintained by :meth:`add_tags`.
+        Values are compared by their string form, so that tag values given on the
+        command line match numbers and booleans.
+
+        Example:
+            project.find("experiment", model="xgboost", stage="prod")
+
+        :param asset: The asset type (experiment|dataset)
+        :type asset: string, required
+
+        :param tags: The tag values to match
+        :type tags: keyword arguments, optional
+
+        :return: The names of the matching assets
+        :rtype: list(string)
+        """
+        if len(tags) == 0:
+            return list(self.tags.get(asset, {}))
+        if self._tag_index is None:
+            self._tag_index = {}
+            for kind, assets in self.tags.items():
+                for name, values in assets.items():
+                    for tag, value in values.items():
+                        self._index_tag(kind, name, tag, value)
+        matches = [self._tag_index.get((asset, tag), {}).get(tag_key(value), {}) for tag, value in tags.items()]
+        matches.sort(key=len)
+        return [name for name in matches[0] if all(name in m for m in matches[1:])]
 
 
     def get_tags(self, asset, name, tags):
@@ -460,7 +839,8 @@ class Projit:
 
     def clean_experimental_results(self, name):
         """
-        Remove all results for a given experiment
+        Remove all results for a given experiment, including their history.
+        Inside a batch the history is removed when the batch is saved.
 
         :param name: The experiment name
         :type name: string, required
@@ -468,11 +848,12 @@ class Projit:
         :return: None
         :rtype: None
         """
-        if name in self.results:
-            del self.results[name]
-        for dataset in self.dataresults:
-            if name in self.dataresults[dataset]:
-                del self.dataresults[dataset][name]
+        self._store.remove_experiment(name)
+        if self._batch_depth > 0:
+            self._pending_removals.append(name)
+        else:
+            self.storage.remove_series(name)
+        self._results_changed()
 
 
     def add_dataset(self, name, path):
@@ -488,11 +869,10 @@ class Projit:
         :return: None
         :rtype: None
         """
-        self.initiate_lock()
-        self.reload()
+        self._begin_update()
         self.datasets[name] = path
-        self.save()
-        self.release_lock()
+        self._dirty.add("project")
+        self._end_update()
 
 
     def rm_dataset(self, name):
@@ -505,16 +885,14 @@ class Projit:
         :return: None
         :rtype: None
         """
-        self.initiate_lock()
-        self.reload()
+        self._begin_update()
         if name in self.datasets:
             del self.datasets[name] 
-            self.save()
+            self._dirty.add("project")
         elif name==".":
             del self.datasets
             self.datasets = {}
-            self.save()
-        self.release_lock()
+        self._end_update()
 
 
     def rm_experiment(self, name):
@@ -527,20 +905,17 @@ class Projit:
         :return: None
         :rtype: None
         """
-        self.initiate_lock()
-        self.reload()
+        self._begin_update()
         if name==".":
-            for elem in self.experiments:
-                self.clean_experimental_results(elem[0])
+            for key in self._experiments:
+                self.clean_experimental_results(key)
             self.experiments = []
-            self.save()
-        else:
-            for elem in self.experiments:
-                if elem[0] == name:
-                    self.experiments.remove(elem)
-                    self.clean_experimental_results(name)
-            self.save()
-        self.release_lock()
+            self._results_changed()
+        elif name in self._experiments:
+            del self._experiments[name]
+            self.clean_experimental_results(name)
+            self._dirty.add("project")
+        self._end_update()
 
 
     def add_param(self, name, value):
@@ -556,11 +931,10 @@ class Projit:
         :return: None
         :rtype: None
         """
-        self.initiate_lock()
-        self.reload()
+        self._begin_update()
         self.params[name] = value 
-        self.save()
-        self.release_lock()
+        self._dirty.add("project")
+        self._end_update()
 
 
     def add_hyperparam(self, name, value):
@@ -577,20 +951,21 @@ class Projit:
         :rtype: None
         """
         if self.experiment_exists(name):
-            self.initiate_lock()
-            self.reload()
+            self._begin_update()
             self.hyperparams[name] = value
-            self.save()
-            self.release_lock()
+            self._dirty.add("project")
+            self._end_update()
         else:
             raise Exception("Projit Experiment Exception: No experiment called: '%s' -- Register your experiment first." % name)
 
 
-    def add_result(self, experiment, metric, value, dataset=None):
+    def add_result(self, experiment, metric, value, dataset=None, execution=None):
         """
         Add results from an experiment to the project.
 
-        They can be overall project results, or associated with a specific dataset
+        They can be overall project results, or associated with a specific dataset.
+        When the execution is given the result is also appended to the history
+        of the metric, see :meth:`get_result_history`.
 
         :param name: The experiment name
         :type name: string, required
@@ -604,40 +979,143 @@ class Projit:
         :param dataset: The dataset against which the results are generated
         :type dataset: string, optional 
 
+        :param execution: The execution ID returned by :meth:`start_experiment`
+        :type execution: string, optional
+
         :return: None
         :rtype: None
         """
+        self._add_result_rows([(experiment, dataset, metric, value)], execution)
 
-        self.initiate_lock()
-        self.reload()
-        if dataset==None:
-            if experiment in self.results:
-                rez = self.results[experiment]
-            else:
-                rez = {}
-            rez[metric] = value
-            self.results[experiment] = rez
-        else: 
-            if dataset in self.dataresults:
-                rez = self.dataresults[dataset]
-            else:
-                rez = {}
-            if experiment in rez:
-                rez2 = rez[experiment]
-            else:
-                rez2 = {}
-            rez2[metric] = value
-            rez[experiment] = rez2
-            self.dataresults[dataset] = rez
-        self.save()
-        self.release_lock()
+
+    def add_results(self, experiment, results, dataset=None, execution=None):
+        """
+        Add a set of results from an experiment to the project in a single update.
+
+        :param experiment: The experiment name
+        :type experiment: string, required
+
+        :param results: The dictionary of results 'metric':value
+        :type results: Dictionary, required
+
+        :param dataset: The dataset against which the results are generated
+        :type dataset: string, optional 
+
+        :param execution: The execution ID returned by :meth:`start_experiment`
+        :type execution: string, optional
+
+        :return: None
+        :rtype: None
+        """
+        self._add_result_rows([(experiment, dataset, metric, value) for metric, value in results.items()], execution)
+
+
+    def add_results_frame(self, df, experiment_col="experiment", dataset_col=None, metric_col=None, value_col=None):
+        """
+        Add a DataFrame of results to the project in a single update.
+
+        The frame can be in wide format, with one column per metric, or in long
+        format, with a metric name column and a value column. Missing values
+        are not recorded.
+
+        :param df: The results
+        :type df: pandas.DataFrame, required
+
+        :param experiment_col: The column containing the experiment names
+        :type experiment_col: string, optional
+
+        :param dataset_col: The column containing the dataset names.
+                            When omitted the results are overall project results.
+        :type dataset_col: string, optional
+
+        :param metric_col: The column containing the metric names (long format only)
+        :type metric_col: string, optional
+
+        :param value_col: The column containing the metric values (long format only),
+                          "value" by default
+        :type value_col: string, optional
+
+        :return: None
+        :rtype: None
+        """
+        id_cols = [experiment_col] if dataset_col is None else [experiment_col, dataset_col]
+        if metric_col is not None:
+            value_col = "value" if value_col is None else value_col
+            df = df.dropna(subset=[value_col])
+            experiments = df[experiment_col].tolist()
+            datasets = [None] * len(df) if dataset_col is None else df[dataset_col].tolist()
+            self._add_result_rows(list(zip(experiments, datasets, df[metric_col].tolist(), df[value_col].tolist())))
+            return
+        if value_col is not None:
+            raise Exception("Projit Results Exception: value_col is only used with metric_col -- "
+                            "in wide format every column other than the experiment and dataset is a metric")
+        # Every other column is a metric, whatever its name, so the columns are read one by one
+        rows = []
+        for metric in [c for c in df.columns if c not in id_cols]:
+            recorded = df[df[metric].notna()]
+            experiments = recorded[experiment_col].tolist()
+            datasets = [None] * len(recorded) if dataset_col is None else recorded[dataset_col].tolist()
+            rows.extend((experiment, dataset, metric, value) for experiment, dataset, value
+                        in zip(experiments, datasets, recorded[metric].tolist()))
+        self._add_result_rows(rows)
+
+
+    def _add_result_rows(self, rows, execution=None):
+        """
+        Internal function: record results in one update of the project.
+
+        :param rows: List of (experiment, dataset, metric, value). Dataset is None for overall results.
+        :type rows: list(tuple), required
+
+        :param execution: The execution that produced the results, to record them in the result history
+        :type execution: string, optional
+        """
+        rows = [(experiment, dataset, metric, result_value(value, metric)) for experiment, dataset, metric, value in rows]
+        sent, _ = self._daemon_request("add_results", rows, execution)
+        if sent:
+            self._daemon_applied(rows=rows)
+            return
+        if execution is not None:
+            for experiment in dict.fromkeys(row[0] for row in rows):
+                if not self._has_execution(experiment, execution):
+                    raise Exception(f"Projit Experiment Exception: No execution '{execution}' of experiment '{experiment}'")
+            self.storage.append_series(rows, execution, time.time())
+        row_level = self.storage.row_level
+        generation = None
+        if row_level:
+            generation = self.storage.put_results(rows)
+        else:
+            self._begin_update()
+        self._store.add_rows(rows)
+        self._results_changed(generation)
+        if not row_level:
+            self._dirty.add("project")
+            self._end_update()
+
+
+    def _results_changed(self, generation=None):
+        """
+        Internal function: record that the experiments or results changed by
+        incrementing the generation counter, which invalidates the cached results tables.
+
+        :param generation: The new generation, when the storage backend incremented it
+        :type generation: int, optional
+        """
+        if generation is not None:
+            object.__setattr__(self, "generation", generation)
+        elif self.storage.row_level:
+            self._results_cache.clear()
+        else:
+            self.generation += 1
 
 
     def get_results(self, dataset=None):
         """
         Retrieve the experimental results as a DataFrame.
 
-        They can be overall project results, or associated with a specific dataset
+        They can be overall project results, or associated with a specific dataset.
+        The table is cached until the results change, so repeated calls are cheap.
+        Each call returns a copy of the cached table, which the caller can modify.
 
         :param dataset: The dataset against which the results are generated
         :type dataset: string, optional
@@ -645,29 +1123,131 @@ class Projit:
         :return: DataFrame of results
         :rtype: pandas.DataFrame
         """
+        cached = self._results_cache.get(dataset)
+        if cached is not None and cached[0] == self.generation:
+            return cached[1].copy(deep=True)
 
-        df = pd.DataFrame()
-        if dataset==None:
-            myresults = self.results
-        else:
-            if dataset in self.dataresults:
-                myresults = self.dataresults[dataset]
-            else:
+        if dataset is not None and not self._store.has_dataset(dataset):
+            raise Exception("Projit Dataset Exception: No results for dataset: %s " % dataset)
+        # One row per registered experiment, scattered from the results arrays.
+        # The first column in the results is always "experiment"
+        df = self._store.table(dataset, list(self._experiments))
+        self._results_cache[dataset] = (self.generation, df)
+        return df.copy(deep=True)
+
+
+    def get_results_long(self, datasets=None, metrics=None):
+        """
+        Retrieve the dataset results of the registered experiments as a long-format
+        table, with one row per (experiment, dataset, metric) value.
+
+        :param datasets: The datasets to include, all datasets with results by default
+        :type datasets: list(string), optional
+
+        :param metrics: The metrics to include, all metrics by default
+        :type metrics: list(string), optional
+
+        :return: DataFrame with columns experiment, dataset, metric, value
+        :rtype: pandas.DataFrame
+        """
+        if datasets is None:
+            datasets = self._store.dataset_names()
+        for dataset in datasets:
+            if dataset is None or not self._store.has_dataset(dataset):
                 raise Exception("Projit Dataset Exception: No results for dataset: %s " % dataset)
-        for exp in self.experiments:
-            key = exp[0]
-            if key in myresults:
-                rez = myresults[key]
-            else:
-                rez = {}
-            rez['experiment'] = key
-            df = pd.concat([df, pd.DataFrame(rez, index=[0])], ignore_index=True)
-        # Ensure that the first column in the results is "experiments"
-        cols = ["experiment"]
-        rest = df.columns.to_list()
-        rest.remove('experiment')
-        cols.extend(rest)
-        return df.loc[:,cols]
+        return self._store.long(datasets, metrics, list(self._experiments))
+
+
+    def compare_results(self, datasets, metrics):
+        """
+        Compare the results of the registered experiments across datasets.
+        The table is pivoted once from :meth:`get_results_long`. Every registered
+        experiment has a row and every (metric, dataset) pair has a column, with
+        NaN where an experiment has no result.
+
+        :param datasets: The datasets to compare
+        :type datasets: list(string), required
+
+        :param metrics: The metrics to compare
+        :type metrics: list(string), required
+
+        :return: DataFrame with an experiment column, then one column per dataset for
+                 a single metric, or per 'metric:dataset' for several metrics
+        :rtype: pandas.DataFrame
+        """
+        import pandas as pd
+        long = self.get_results_long(datasets, metrics)
+        table = long.pivot(index="experiment", columns=["metric", "dataset"], values="value")
+        wanted = pd.MultiIndex.from_product([metrics, datasets], names=["metric", "dataset"])
+        table = table.reindex(index=list(self._experiments), columns=wanted)
+        if len(metrics) == 1:
+            table.columns = list(datasets)
+        else:
+            table.columns = ["%s:%s" % (metric, dataset) for metric, dataset in wanted]
+        table.index.name = "experiment"
+        return table.reset_index()
+
+
+    def leaderboard(self, metric, dataset=None, k=10, ascending=False, where=None, ties=False, tags=None):
+        """
+        Retrieve the best experiments by a metric, without building the full results table.
+        The k best results are found by partial selection over the results store.
+
+        Example:
+            project.leaderboard("auc", "test", k=10, where={"model":"xgboost"})
+
+        :param metric: The metric to rank by
+        :type metric: string, required
+
+        :param dataset: The dataset against which the results are generated
+        :type dataset: string, optional
+
+        :param k: The number of experiments to return
+        :type k: int, optional
+
+        :param ascending: Rank the lowest values first (for error metrics like RMSE)
+        :type ascending: Boolean, optional
+
+        :param where: Only rank experiments with these tag values (see :meth:`find`)
+        :type where: Dictionary, optional
+
+        :param ties: Also return the experiments tied with the k-th experiment
+        :type ties: Boolean, optional
+
+        :param tags: Tags of the experiments to add as columns
+        :type tags: list(string), optional
+
+        :return: DataFrame with the experiment, metric and tag columns, best first
+        :rtype: pandas.DataFrame
+        """
+        if dataset is not None and not self._store.has_dataset(dataset):
+            raise Exception("Projit Dataset Exception: No results for dataset: %s " % dataset)
+        if where:
+            experiments = [e for e in self.find("experiment", **where) if e in self._experiments]
+        else:
+            experiments = list(self._experiments)
+        import pandas as pd
+        names, values = self._store.top(dataset, metric, experiments, k, ascending, ties)
+        df = pd.DataFrame({"experiment":names, metric:values})
+        for tag in (tags or []):
+            df[tag] = [self.tags.get("experiment", {}).get(name, {}).get(tag, "") for name in names]
+        return df
+
+
+    def get_experiment_path(self, name):
+        """
+        Retrieve the path of an experiment by name.
+
+        :param name: The experiment name
+        :type name: string, required
+
+        :return: Path to the experiment
+        :rtype: String
+        """
+        if name in self._experiments:
+            return self._experiments[name]
+        else:
+            raise Exception(f"Projit Experiment Exception: Experiment '{name}' not registered")
 
 
     def get_dataset(self, name):
@@ -728,94 +1308,267 @@ class Projit:
         return self.get_root_path() + ds
 
 
-    def initiate_lock(self):
+    @contextmanager
+    def batch(self):
+        """
+        Context manager that groups many modifications into one update of the project.
+        The lock is taken and the project reloaded once on entry, all modifications
+        made inside the block are applied in memory, and the project is saved
+        once on exit. If the block raises an exception nothing is saved and the
+        in-memory project is reloaded from disk.
+
+        Example:
+            with project.batch():
+                for metric, value in scores.items():
+                    project.add_result("Initial Exp", metric, value)
+
+        :return: The project
+        :rtype: Projit
+        """
+        if self._batch_depth > 0:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+            return
+
+        self.initiate_lock()
+        try:
+            self.reload()
+            self._batch_depth = 1
+            try:
+                yield self
+            except BaseException:
+                self._pending_events = []
+                self._pending_removals = []
+                self.storage.discard()
+                self.reload(force=True)
+                raise
+            finally:
+                self._batch_depth = 0
+            for event in self._pending_events:
+                self.storage.record_execution(event, self._executions)
+            self._pending_events = []
+            self.save()
+            for name in self._pending_removals:
+                self.storage.remove_series(name)
+            self._pending_removals = []
+        finally:
+            self.release_lock()
+
+
+    def _begin_update(self):
+        """
+        Internal function: take the lock and reload the project before a
+        modification, unless the modification is part of a batch.
+        """
+        if self._batch_depth == 0:
+            self.initiate_lock()
+            self.reload()
+
+
+    def _end_update(self):
+        """
+        Internal function: save the project and release the lock after a
+        modification, unless the modification is part of a batch.
+        """
+        if self._batch_depth == 0:
+            try:
+                self.save()
+            finally:
+                self.release_lock()
+
+
+    def _daemon_request(self, method, *args):
+        """
+        Internal function: send an update to the project daemon, when one is running
+        (see :mod:`projit.daemon`). The daemon applies and saves the update, and
+        :meth:`_daemon_applied` reflects it in this object. Updates inside a batch
+        are applied directly, as the batch already holds the lock.
+
+        :param method: The daemon request name
+        :type method: string, required
+
+        :return: (sent, result) : Whether the daemon applied the update, and its result
+        :rtype: tuple(Boolean, object)
+        """
+        if self._daemon is False or self._batch_depth > 0:
+            return False, None
+        self._daemon = connect_daemon(self.path, self._daemon)
+        if self._daemon is None:
+            return False, None
+        return self._daemon.request(method, *args)
+
+
+    def _daemon_applied(self, experiment=None, rows=None, executions=False, tags=False):
+        """
+        Internal function: reflect an update saved by the daemon in this object.
+        New experiments and results are applied in memory, and the executions
+        and tags are read again from disk when they are next used.
+
+        :param experiment: The (name, path) of an experiment that was started
+        :type experiment: tuple, optional
+
+        :param rows: The results that were added (see :meth:`_add_result_rows`)
+        :type rows: list(tuple), optional
+
+        :param executions: Whether the executions changed
+        :type executions: Boolean, optional
+
+        :param tags: Whether the tags changed
+        :type tags: Boolean, optional
+        """
+        if experiment is not None and not self.experiment_exists(experiment[0]):
+            self._experiments[experiment[0]] = experiment[1]
+            self._results_cache.clear()
+        if rows is not None:
+            self._store.add_rows(rows)
+            self._results_cache.clear()
+        if executions:
+            self._executions = None
+        if tags:
+            self._tags = None
+            self._tag_index = None
+
+
+    def _record_execution(self, event):
+        """
+        Internal function: persist an execution event. Inside a batch the
+        journal writes are deferred until the batch is saved.
+        """
+        if self._batch_depth > 0 and not self.storage.row_level:
+            self._pending_events.append(event)
+        else:
+            self.storage.record_execution(event, self._executions)
+
+
+    def initiate_lock(self, timeout=None):
         """
         Lock files are used during processes that modify the project
         so that we get consistent state across parallel executions.
+        The locking mechanism is provided by the storage backend.
+        Waiting processes resume as soon as the lock is released.
+
+        :param timeout: Optional number of seconds to wait before raising an exception
+        :type timeout: float, optional
 
         :return: None
         :rtype: None
         """
-        path_to_lock = self.path + "/" + lock_file
-        lock_exists = True
-        while lock_exists:
-            if os.path.isfile(path_to_lock):
-                time.sleep(5)
-            else:
-                lock_exists = False
-
-        lock_content = {}
-        with open(path_to_lock, 'w') as outfile:
-            json.dump(lock_content, outfile, indent=0)
+        self.storage.lock(timeout)
 
 
     def release_lock(self):
         """
         Lock files are used during processes that modify the project
         so that we get consistent state across parallel executions.
-        Release the lock by deleting the lock file
+        Release the lock held through the storage backend.
 
         :return: None
         :rtype: None
         """
-        path_to_lock = self.path + "/" + lock_file
-        if os.path.isfile(path_to_lock):
-            os.remove(path_to_lock)
+        self.storage.unlock()
+
+
+    def lock_status(self):
+        """
+        Retrieve information about the process holding the project lock.
+        Includes the reason the lock is considered stale, if it is.
+
+        :return: owner info with keys pid, host, acquired, heartbeat, lease and stale,
+                 or None when the project is not locked
+        :rtype: Dictionary
+        """
+        owner = self.storage.lock_status()
+        if owner is not None:
+            owner['stale'] = stale_reason(owner)
+        return owner
+
+
+    def break_lock(self):
+        """
+        Forcibly remove the project lock, for example after the holder crashed.
+
+        :return: owner info of the broken lock, or None when the project was not locked
+        :rtype: Dictionary
+        """
+        return self.storage.break_lock()
 
 
-    def save(self):
+    def save(self, sections=None):
         """
-        Save your projit project into config files within the projit config dir
+        Save your projit project into the storage backend within the projit config dir.
+        Only the meta-data sections that changed since the last load or save are written.
+
+        :param sections: Optional list of sections to write regardless of changes
+                         (any of 'project', 'executions', 'tags')
+        :type sections: list(string), optional
 
         :return: None
         :rtype: None
         """
-        core_props = self.__dict__.copy()
-        del core_props['executions']
-        del core_props['tags']
-        path_to_json = self.path + "/" + config_file
-        with open(path_to_json, 'w') as outfile:
-            json.dump(core_props, outfile, indent=0)
-
-        path_to_json = self.path + "/" + execution_file
-        with open(path_to_json, 'w') as outfile:
-            json.dump(self.executions, outfile, indent=0)
+        if sections is not None:
+            self._dirty.update(sections)
+        if len(self._dirty) == 0:
+            return
+        core_props = {k:v for k,v in self.__dict__.items() if k[0] != "_"}
+        core_props['experiments'] = self.experiments
+        core_props['results'] = self.results
+        core_props['dataresults'] = self.dataresults
+        executions = self.executions if "executions" in self._dirty else self._executions
+        tags = self.tags if "tags" in self._dirty else self._tags
+        self.storage.write(core_props, executions, tags, self._dirty)
+        self._dirty.clear()
+
+
+    def compact_executions(self):
+        """
+        Fold the execution journals back into the executions snapshots.
+        Also converts the executions of projects created by earlier versions
+        of projit to one file per experiment.
 
-        path_to_json = self.path + "/" + tag_file
-        with open(path_to_json, 'w') as outfile:
-            json.dump(self.tags, outfile, indent=0)
+        :return: None
+        :rtype: None
+        """
+        self._begin_update()
+        self.storage.compact(self._executions)
+        self._end_update()
 
 
-    def reload(self):
+    def reload(self, force=False):
         """
         Reload the project meta-data from disk. 
         - Necessary when multiple processes are running experiments 
         in the same project and we want to avoid overwriting data.
+        - Only the sections that changed on disk since they were last loaded or
+        saved by this object are read, unless force is set.
 
-        :return: None
-        :rtype: None
+        :param force: Read every section, even if unchanged
+        :type force: Boolean, optional
+
+        :return: The sections that were refreshed from disk
+        :rtype: list(string)
         """
-        path_to_config = self.path + "/" + config_file
-        path_to_execs = self.path + "/" + execution_file
-        path_to_tags = self.path + "/" + tag_file
-        _dict = {}
-        if os.path.exists(path_to_config):
-            with open(path_to_config) as f:
-                _dict = json.load(f)
-        for key in _dict.keys():
-            setattr(self, key, _dict[key])
-
-        _execs = {}
-        if os.path.exists(path_to_execs):
-            with open(path_to_execs) as f:
-                _execs = json.load(f)
-                setattr(self, "executions", _execs)
-
-        _tags = {}
-        if os.path.exists(path_to_tags):
-            with open(path_to_tags) as f:
-                _tags = json.load(f)
-                setattr(self, "tags", _tags)
+        data = self.storage.read(only_changed=not force, sections=self.loaded_sections())
+        if 'project' in data:
+            for key, value in data['project'].items():
+                if key != "path":
+                    setattr(self, key, value)
+        if 'executions' in data:
+            if force or not self.storage.sharded:
+                self.executions = data['executions']
+            else:
+                # Sharded backends only return the experiments whose records changed
+                for name, records in data['executions'].items():
+                    if records is None:
+                        self._executions.pop(name, None)
+                    else:
+                        self._executions[name] = records
+        if 'tags' in data:
+            self.tags = data['tags']
+        self._dirty.difference_update(data)
+        return list(data)
 
 
     def render(self, path):
@@ -829,6 +1582,7 @@ class Projit:
         :rtype: None        
         """
         results = self.get_results()
+        from .pdf import PDF
         pdf = PDF()
         pdf.setup()
         pdf.add_title(self.name)
@@ -836,6 +1590,77 @@ class Projit:
         pdf.output(path, 'F')
 
 
+##########################################################################################
+class ExperimentList(list):
+    """
+    The read-only list of (name, path) pairs returned by :attr:`Projit.experiments`.
+    Modifying it raises an exception, as the changes would not reach the project.
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise Exception("Projit Experiment Exception: The experiments list is read-only -- "
+                        "use add_experiment and rm_experiment, or assign a new list")
+
+    append = extend = insert = remove = pop = clear = sort = reverse = _read_only
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+
+
+##########################################################################################
+def tag_key(value):
+    """
+    The key of a tag value in the inverted tag index: strings are used as they
+    are, other values by their JSON form.
+
+    :param value: The tag value
+    :type value: Any, required
+
+    :return: key
+    :rtype: string
+    """
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, sort_keys=True)
+
+
+##########################################################################################
+def to_epoch(values):
+    """
+    Convert execution timestamps to seconds since the epoch.
+    Timestamps are stored as epoch floats. Earlier versions of projit stored local
+    datetime strings, these are still accepted. Missing values become NaN.
+
+    :param values: The timestamps
+    :type values: list, required
+
+    :return: epochs
+    :rtype: numpy.ndarray
+    """
+    import pandas as pd
+    import numpy as np
+    epochs = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=float)
+    for i in np.flatnonzero(np.isnan(epochs)):
+        if isinstance(values[i], str) and values[i] != "":
+            epochs[i] = datetime.fromisoformat(values[i]).timestamp()
+    return epochs
+
+
+##########################################################################################
+def execution_durations(records):
+    """
+    The durations of the completed executions among the given execution records.
+
+    :param records: The execution records
+    :type records: Iterable of Dictionary, required
+
+    :return: durations in seconds
+    :rtype: numpy.ndarray
+    """
+    import numpy as np
+    records = list(records)
+    durations = to_epoch([r['end'] for r in records]) - to_epoch([r['start'] for r in records])
+    return durations[~np.isnan(durations)]
+
+
 ##########################################################################################
 def load(config_path):
     """
@@ -844,6 +1669,7 @@ def load(config_path):
 
     Note: This function will always overwrite the path variable in the object so the instance
     is aware of where it is relative to the config directory.
+    The executions and tags are only read from disk when they are first used.
 
     :param config_path: The path to the projit configuration
     :type config_path: string, required
@@ -851,26 +1677,14 @@ def load(config_path):
     :return: Projit Object
     :rtype: Projit
     """
-    _dict = {}
-    path_to_json = config_path + "/" + config_file
-    if os.path.exists(path_to_json):
-        with open(path_to_json) as f:
-            _dict = json.load(f)
-
-    _execs = {}
-    path_to_execs = config_path + "/" + execution_file
-    if os.path.exists(path_to_execs):
-        with open(path_to_execs) as f:
-            _execs['executions'] = json.load(f)
-
-    _tags = {}
-    path_to_tags = config_path + "/" + tag_file
-    if os.path.exists(path_to_tags):
-        with open(path_to_tags) as f:
-            _tags["tags"] = json.load(f)
-
-    _object = Projit(**_dict, **_execs, **_tags )
+    storage = open_storage(config_path)
+    _dict = storage.read(sections=["project"])['project']
+    _object = Projit(**_dict)
     _object.path = config_path
+    _object._storage = storage
+    _object._executions = None
+    _object._tags = None
+    _object._dirty.clear()
     return _object
 
 
@@ -902,6 +1716,7 @@ def init(template, name, desc=""):
     :rtype: Projit
     """
     os.mkdir(config_folder)
+    forget_projit_config()
     project = Projit(config_folder, name, desc)
     project.save()
     init_template(template)
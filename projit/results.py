@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+import numpy as np
+
+from .utils import numeric
+
+"""
+   projit.results: Columnar store of the experimental results.
+
+   Every result is one row of four parallel arrays:
+    - 'experiment' : the experiment code
+    - 'dataset'    : the dataset code (the code of None for overall project results)
+    - 'metric'     : the metric code
+    - 'value'      : the float64 value
+   The names are dictionary-encoded into integer codes by a Vocabulary.
+   Rows are appended in amortized constant time. A later result for the same
+   (experiment, dataset, metric) replaces the earlier one, which is resolved
+   in one vectorized pass the next time the rows are read.
+
+   Values that are not floats are also kept as they were recorded in a side
+   dictionary of cells, so that they are written back unchanged: integers, and
+   the non-numeric values that earlier versions of projit accepted. The latter
+   are not part of the arrays, so they are left out of the results tables.
+"""
+
+initial_capacity = 64
+
+##########################################################################################
+class Vocabulary:
+    """
+    Dictionary encoding of names as consecutive integer codes.
+    """
+
+    def __init__(self):
+        self.codes = {}
+        self.names = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def encode(self, name):
+        """
+        :return: The code of a name, assigning a new code to unseen names
+        :rtype: int
+        """
+        code = self.codes.get(name)
+        if code is None:
+            code = len(self.names)
+            self.codes[name] = code
+            self.names.append(name)
+        return code
+
+    def lookup(self, names):
+        """
+        :return: The codes of the known names, in the given order
+        :rtype: numpy.ndarray
+        """
+        return np.array([self.codes[n] for n in names if n in self.codes], dtype=np.int64)
+
+    def decode(self, codes):
+        """
+        :return: The names of an array of codes
+        :rtype: numpy.ndarray
+        """
+        return np.array(self.names, dtype=object)[codes]
+
+
+##########################################################################################
+class ResultStore:
+    """
+    The experimental results of a project held as dictionary-encoded columnar arrays.
+    The nested dictionaries of the project file, the results tables and the
+    long-format table are all views computed from the arrays.
+    """
+    columns = {"experiment":np.int32, "dataset":np.int32, "metric":np.int32, "value":np.float64}
+
+    def __init__(self):
+        self.experiments = Vocabulary()
+        self.datasets = Vocabulary()
+        self.metrics = Vocabulary()
+        self.arrays = {c:np.empty(initial_capacity, dtype=t) for c, t in self.columns.items()}
+        self.size = 0
+        self.unique = True
+        self.cells = {}
+
+    def __len__(self):
+        return len(self.rows()["value"])
+
+    def add_rows(self, rows):
+        """
+        Append results.
+
+        :param rows: List of (experiment, dataset, metric, value). Dataset is None for overall results.
+        :type rows: list(tuple), required
+
+        :return: None
+        :rtype: None
+        """
+        if len(rows) == 0:
+            return
+        new = {"experiment":[], "dataset":[], "metric":[], "value":[]}
+        for experiment, dataset, metric, value in rows:
+            new["experiment"].append(self.experiments.encode(experiment))
+            new["dataset"].append(self.datasets.encode(dataset))
+            new["metric"].append(self.metrics.encode(metric))
+            new["value"].append(numeric(value, metric))
+            if isinstance(value, float):
+                self.cells.pop((experiment, dataset, metric), None)
+            else:
+                self.cells[(experiment, dataset, metric)] = value
+        end = self.size + len(rows)
+        if end > len(self.arrays["value"]):
+            capacity = max(end, 2 * len(self.arrays["value"]))
+            for c, t in self.columns.items():
+                grown = np.empty(capacity, dtype=t)
+                grown[:self.size] = self.arrays[c][:self.size]
+                self.arrays[c] = grown
+        for c in self.columns:
+            self.arrays[c][self.size:end] = new[c]
+        self.size = end
+        self.unique = False
+
+    def rows(self):
+        """
+        The current results, with at most one row per (experiment, dataset, metric),
+        in the order the results were first added.
+
+        :return: The arrays by column name
+        :rtype: Dictionary(string:numpy.ndarray)
+        """
+        if not self.unique:
+            rows = {c:a[:self.size] for c, a in self.arrays.items()}
+            key = rows["experiment"].astype(np.int64) * len(self.datasets) + rows["dataset"]
+            key = key * len(self.metrics) + rows["metric"]
+            _, first = np.unique(key, return_index=True)
+            _, last = np.unique(key[::-1], return_index=True)
+            last = self.size - 1 - last
+            order = np.argsort(first, kind="stable")
+            first, last = first[order], last[order]
+            for c in self.columns:
+                picked = rows[c][last if c == "value" else first]
+                self.arrays[c][:len(picked)] = picked
+            self.size = len(first)
+            self.unique = True
+        return {c:a[:self.size] for c, a in self.arrays.items()}
+
+    def keep(self, mask):
+        """
+        Keep only the rows selected by a boolean mask over :meth:`rows`.
+        """
+        rows = self.rows()
+        for c in self.columns:
+            kept = rows[c][mask]
+            self.arrays[c][:len(kept)] = kept
+        self.size = int(mask.sum())
+
+    def remove_experiment(self, name):
+        """
+        Remove all results of an experiment.
+        """
+        if name in self.experiments.codes:
+            self.keep(self.rows()["experiment"] != self.experiments.codes[name])
+        self.cells = {key:value for key, value in self.cells.items() if key[0] != name}
+
+    def replace(self, overall, rows):
+        """
+        Replace either the overall project results or all the dataset results.
+
+        :param overall: Whether to replace the overall results (dataset None) or the dataset results
+        :type overall: Boolean, required
+
+        :param rows: The new results (see :meth:`add_rows`)
+        :type rows: list(tuple), required
+        """
+        code = self.datasets.encode(None)
+        is_overall = self.rows()["dataset"] == code
+        self.keep(~is_overall if overall else is_overall)
+        self.cells = {key:value for key, value in self.cells.items() if (key[1] is None) != overall}
+        numbers = []
+        for experiment, dataset, metric, value in rows:
+            try:
+                numeric(value, metric)
+                numbers.append((experiment, dataset, metric, value))
+            except Exception:
+                self.cells[(experiment, dataset, metric)] = value
+        self.add_rows(numbers)
+
+    def set_results(self, results):
+        """
+        Replace the overall results with those of a nested dictionary {experiment:{metric:value}}.
+        Non-numeric values, which earlier versions of projit accepted, are kept as cells.
+        """
+        self.replace(True, [(e, None, m, v) for e, rez in results.items() for m, v in rez.items()])
+
+    def set_dataresults(self, dataresults):
+        """
+        Replace the dataset results with those of a nested dictionary {dataset:{experiment:{metric:value}}}.
+        """
+        self.replace(False, [(e, d, m, v) for d, exps in dataresults.items()
+                             for e, rez in exps.items() for m, v in rez.items()])
+
+    def dataset_names(self):
+        """
+        :return: The datasets that have results, in the order they were first added
+        :rtype: list(string)
+        """
+        codes = pd.unique(self.rows()["dataset"])
+        names = [n for n in self.datasets.decode(codes) if n is not None]
+        names.extend(dict.fromkeys(k[1] for k in self.cells if k[1] is not None and k[1] not in names))
+        return names
+
+    def has_dataset(self, dataset):
+        """
+        :return: Whether there are results for the dataset
+        :rtype: Boolean
+        """
+        if any(key[1] == dataset for key in self.cells):
+            return True
+        if dataset not in self.datasets.codes:
+            return False
+        return bool((self.rows()["dataset"] == self.datasets.codes[dataset]).any())
+
+    def nested(self, dataset=None):
+        """
+        The results on a dataset as nested dictionaries.
+
+        :return: {experiment:{metric:value}}
+        :rtype: Dictionary
+        """
+        rows = self.rows()
+        nested = {}
+        if dataset in self.datasets.codes:
+            selected = rows["dataset"] == self.datasets.codes[dataset]
+            experiments = self.experiments.decode(rows["experiment"][selected]).tolist()
+            metrics = self.metrics.decode(rows["metric"][selected]).tolist()
+            for experiment, metric, value in zip(experiments, metrics, rows["value"][selected].tolist()):
+                nested.setdefault(experiment, {})[metric] = value
+        for (experiment, cell_dataset, metric), value in self.cells.items():
+            if cell_dataset == dataset:
+                nested.setdefault(experiment, {})[metric] = value
+        return nested
+
+    def table(self, dataset, experiments):
+        """
+        The results on a dataset as a table with one row per experiment.
+
+        :param dataset: The dataset, or None for the overall results
+        :type dataset: string, required
+
+        :param experiments: The experiments, in the order of the rows
+        :type experiments: list(string), required
+
+        :return: DataFrame with an experiment column, then one column per metric
+                 in the order the metrics first appear
+        :rtype: pandas.DataFrame
+        """
+        rows = self.rows()
+        rank = np.full(len(self.experiments), -1, dtype=np.int64)
+        rank[self.experiments.lookup(experiments)] = [i for i, n in enumerate(experiments) if n in self.experiments.codes]
+        code = self.datasets.codes.get(dataset, -1)
+        selected = rank[rows["experiment"]] >= 0
+        selected &= rows["dataset"] == code
+        r = rank[rows["experiment"][selected]]
+        order = np.argsort(r, kind="stable")
+        r, m, v = r[order], rows["metric"][selected][order], rows["value"][selected][order]
+        metrics = pd.unique(m)
+        position = np.zeros(len(self.metrics), dtype=np.int64)
+        position[metrics] = np.arange(len(metrics))
+        values = np.full((len(experiments), len(metrics)), np.nan)
+        values[r, position[m]] = v
+        df = pd.DataFrame(values, columns=self.metrics.decode(metrics).tolist())
+        df.insert(0, "experiment", list(experiments))
+        return df
+
+    def long(self, datasets, metrics, experiments):
+        """
+        The results as a long-format table with one row per result.
+
+        :param datasets: The datasets to include, in order
+        :type datasets: list(string), required
+
+        :param metrics: The metrics to include, or None for all metrics
+        :type metrics: list(string), optional
+
+        :param experiments: The experiments to include
+        :type experiments: list(string), required
+
+        :return: DataFrame with columns experiment, dataset, metric, value
+        :rtype: pandas.DataFrame
+        """
+        rows = self.rows()
+        position = np.full(len(self.datasets), -1, dtype=np.int64)
+        position[self.datasets.lookup(datasets)] = [i for i, n in enumerate(datasets) if n in self.datasets.codes]
+        included = np.zeros(len(self.experiments), dtype=bool)
+        included[self.experiments.lookup(experiments)] = True
+        selected = (position[rows["dataset"]] >= 0) & included[rows["experiment"]]
+        if metrics is not None:
+            wanted = np.zeros(len(self.metrics), dtype=bool)
+            wanted[self.metrics.lookup(metrics)] = True
+            selected &= wanted[rows["metric"]]
+        order = np.argsort(position[rows["dataset"][selected]], kind="stable")
+        return pd.DataFrame({
+            "experiment":self.experiments.decode(rows["experiment"][selected][order]),
+            "dataset":self.datasets.decode(rows["dataset"][selected][order]),
+            "metric":self.metrics.decode(rows["metric"][selected][order]),
+            "value":rows["value"][selected][order],
+        })
+
+    def top(self, dataset, metric, experiments, k=10, ascending=False, ties=False):
+        """
+        The best results of a metric by partial selection: the k best values are
+        selected in linear time with numpy.argpartition and only those are sorted.
+
+        :param dataset: The dataset, or None for the overall results
+        :type dataset: string, required
+
+        :param metric: The metric name
+        :type metric: string, required
+
+        :param experiments: The experiments to rank
+        :type experiments: list(string), required
+
+        :param k: The number of results
+        :type k: int, optional
+
+        :param ascending: Rank the lowest values first, for error metrics
+        :type ascending: Boolean, optional
+
+        :param ties: Also return the results tied with the k-th result
+        :type ties: Boolean, optional
+
+        :return: The experiment names and values, best first. Ties keep the order
+                 in which the results were first added.
+        :rtype: tuple(list(string), numpy.ndarray)
+        """
+        rows = self.rows()
+        included = np.zeros(len(self.experiments), dtype=bool)
+        included[self.experiments.lookup(experiments)] = True
+        selected = included[rows["experiment"]]
+        selected &= rows["dataset"] == self.datasets.codes.get(dataset, -1)
+        selected &= rows["metric"] == self.metrics.codes.get(metric, -1)
+        selected &= ~np.isnan(rows["value"])
+        positions = np.flatnonzero(selected)
+        score = rows["value"][positions] if ascending else -rows["value"][positions]
+        if k <= 0:
+            best = np.empty(0, dtype=np.int64)
+        elif k < len(positions):
+            # The partition only finds the k-th best score: every candidate as good
+            # as it is kept, so that ties at the boundary are broken by position.
+            kth = score[np.argpartition(score, k - 1)[k - 1]]
+            best = np.flatnonzero(score <= kth)
+        else:
+            best = np.arange(len(positions))
+        best = best[np.lexsort((best, score[best]))]
+        if not ties:
+            best = best[:k]
+        positions = positions[best]
+        return self.experiments.decode(rows["experiment"][positions]).tolist(), rows["value"][positions]
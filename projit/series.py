@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import struct
+import os
+
+"""
+   projit.series: Append-only binary series of the results recorded by executions.
+
+   Each (experiment, dataset, metric) has its own series file of fixed size records:
+    - 'time'      : float64 epoch seconds at which the result was recorded
+    - 'value'     : float64 value of the metric
+    - 'execution' : the 32 bytes of the SHA-256 execution id
+   Recording a result appends one 48 byte record, so the history never has to be
+   rewritten, and a series is read back as one numpy array.
+   Records are written with the struct module, so writers do not need numpy.
+"""
+
+record_format = struct.Struct("<dd32s")
+id_size = 32
+
+##########################################################################################
+def series_dtype():
+    """
+    :return: The numpy dtype of the series records
+    :rtype: numpy.dtype
+    """
+    import numpy as np
+    return np.dtype([('time', '<f8'), ('value', '<f8'), ('execution', 'S%i' % id_size)])
+
+
+##########################################################################################
+def append_record(path, execution, value, when):
+    """
+    Append a result to a series file.
+
+    :param path: The path to the series file
+    :type path: string, required
+
+    :param execution: The execution id (hexadecimal) returned by start_experiment
+    :type execution: string, required
+
+    :param value: The value of the metric
+    :type value: float, required
+
+    :param when: The epoch time the result was recorded
+    :type when: float, required
+
+    :return: None
+    :rtype: None
+    """
+    try:
+        id = bytes.fromhex(execution)
+    except (TypeError, ValueError):
+        id = b""
+    if len(id) != id_size:
+        raise Exception("Projit Results Exception: Invalid execution id '%s'" % execution)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'ab') as outfile:
+        outfile.write(record_format.pack(when, value, id))
+
+
+##########################################################################################
+def read_records(path):
+    """
+    Read a series file. A trailing partial record (from a writer that
+    crashed mid-append) is ignored.
+
+    :param path: The path to the series file
+    :type path: string, required
+
+    :return: The records, in the order they were appended
+    :rtype: numpy.ndarray(series_dtype)
+    """
+    import numpy as np
+    if not os.path.exists(path):
+        return np.empty(0, dtype=series_dtype())
+    with open(path, 'rb') as f:
+        data = f.read()
+    complete = len(data) - len(data) % record_format.size
+    return np.frombuffer(data[:complete], dtype=series_dtype())
+
+
+##########################################################################################
+def execution_ids(records):
+    """
+    The execution ids of series records, as hexadecimal strings.
+    The raw bytes are used, as numpy strips trailing zero bytes from the values.
+
+    :param records: The series records
+    :type records: numpy.ndarray(series_dtype), required
+
+    :return: execution ids
+    :rtype: list(string)
+    """
+    import numpy as np
+    raw = np.ascontiguousarray(records['execution']).tobytes()
+    return [raw[i:i + id_size].hex() for i in range(0, len(raw), id_size)]
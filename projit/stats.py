@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+import math
+
+"""
+   projit.stats: Running execution statistics of an experiment.
+
+   The statistics are a small dictionary that is updated in constant time
+   as executions start and end, so they never require a scan of the
+   execution history:
+    - 'count'     : executions started
+    - 'completed' : executions ended
+    - 'mean','m2' : running mean and sum of squared deviations of the durations (Welford)
+    - 'min','max','last' : extremes and the most recent duration
+    - 'sketch'    : logarithmic histogram of the durations for approximate quantiles.
+                    Bucket i counts durations in (gamma^(i-1), gamma^i], so quantiles
+                    are accurate to within `relative_accuracy`. Sketches (and whole
+                    statistics) merge by adding counts.
+"""
+
+relative_accuracy = 0.01
+gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+min_duration = 1e-6
+
+##########################################################################################
+def new_stats():
+    """
+    :return: Empty execution statistics
+    :rtype: Dictionary
+    """
+    return {'count':0, 'completed':0, 'mean':0.0, 'm2':0.0,
+            'min':None, 'max':None, 'last':None, 'sketch':{}}
+
+
+##########################################################################################
+def add_start(stats):
+    """
+    Record the start of an execution.
+
+    :param stats: The statistics to update in place
+    :type stats: Dictionary, required
+
+    :return: None
+    :rtype: None
+    """
+    stats['count'] += 1
+
+
+##########################################################################################
+def add_duration(stats, duration):
+    """
+    Record the duration of an execution that ended.
+
+    :param stats: The statistics to update in place
+    :type stats: Dictionary, required
+
+    :param duration: The execution time in seconds
+    :type duration: float, required
+
+    :return: None
+    :rtype: None
+    """
+    stats['completed'] += 1
+    delta = duration - stats['mean']
+    stats['mean'] += delta / stats['completed']
+    stats['m2'] += delta * (duration - stats['mean'])
+    stats['min'] = duration if stats['min'] is None else min(stats['min'], duration)
+    stats['max'] = duration if stats['max'] is None else max(stats['max'], duration)
+    stats['last'] = duration
+    key = str(bucket(duration))
+    stats['sketch'][key] = stats['sketch'].get(key, 0) + 1
+
+
+##########################################################################################
+def merge_stats(a, b):
+    """
+    Combine the statistics of two sets of executions (Chan et al.).
+    The 'last' duration is taken from b.
+
+    :return: The combined statistics
+    :rtype: Dictionary
+    """
+    merged = new_stats()
+    merged['count'] = a['count'] + b['count']
+    n = a['completed'] + b['completed']
+    merged['completed'] = n
+    if n > 0:
+        delta = b['mean'] - a['mean']
+        merged['mean'] = a['mean'] + delta * b['completed'] / n
+        merged['m2'] = a['m2'] + b['m2'] + delta * delta * a['completed'] * b['completed'] / n
+    extremes = [s for s in (a, b) if s['completed'] > 0]
+    if len(extremes) > 0:
+        merged['min'] = min(s['min'] for s in extremes)
+        merged['max'] = max(s['max'] for s in extremes)
+        merged['last'] = extremes[-1]['last']
+    for sketch in (a['sketch'], b['sketch']):
+        for key, count in sketch.items():
+            merged['sketch'][key] = merged['sketch'].get(key, 0) + count
+    return merged
+
+
+##########################################################################################
+def bucket(duration):
+    """
+    :return: The sketch bucket of a duration
+    :rtype: int
+    """
+    return math.ceil(math.log(max(duration, min_duration), gamma))
+
+
+##########################################################################################
+def quantile(stats, q):
+    """
+    Approximate quantile of the durations from the sketch.
+
+    :param stats: The statistics
+    :type stats: Dictionary, required
+
+    :param q: The quantile, between 0 and 1
+    :type q: float, required
+
+    :return: The duration at the quantile, or None without completed executions
+    :rtype: float
+    """
+    total = sum(stats['sketch'].values())
+    if total == 0:
+        return None
+    rank = q * (total - 1)
+    seen = 0
+    for key in sorted(stats['sketch'], key=int):
+        seen += stats['sketch'][key]
+        if seen > rank:
+            value = 2 * gamma ** int(key) / (gamma + 1)
+            return min(max(value, stats['min']), stats['max'])
+    return stats['max']
+
+
+##########################################################################################
+def summarize(stats):
+    """
+    Summary of execution statistics for reporting.
+
+    :return: count, completed, mean, std, min, max, last, p50, p95
+    :rtype: Dictionary
+    """
+    std = math.sqrt(stats['m2'] / (stats['completed'] - 1)) if stats['completed'] > 1 else 0.0
+    return {'count':stats['count'], 'completed':stats['completed'], 'mean':stats['mean'],
+            'std':std, 'min':stats['min'], 'max':stats['max'], 'last':stats['last'],
+            'p50':quantile(stats, 0.5), 'p95':quantile(stats, 0.95)}
+
+
+##########################################################################################
+def epoch(value):
+    """
+    Convert an execution timestamp to seconds since the epoch.
+    Accepts epoch floats and the local datetime strings written by earlier versions.
+
+    :return: epoch, or None for a missing timestamp
+    :rtype: float
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return float(value)
+
+
+##########################################################################################
+def stats_from_records(records):
+    """
+    Build the statistics of an experiment from its execution records.
+    Used for histories recorded before statistics were maintained.
+
+    :param records: The execution records {'ID':{...}}
+    :type records: Dictionary, required
+
+    :return: statistics
+    :rtype: Dictionary
+    """
+    stats = new_stats()
+    for record in records.values():
+        add_start(stats)
+        end = epoch(record.get('end'))
+        if end is not None:
+            add_duration(stats, end - epoch(record['start']))
+    return stats
+
+
+##########################################################################################
+def apply_stats_event(stats, event):
+    """
+    Update the statistics with an execution journal event.
+    End events only count when they carry the 'duration' of an execution
+    that had not ended before.
+
+    :return: None
+    :rtype: None
+    """
+    if event['event'] == 'start':
+        add_start(stats)
+    elif event.get('duration') is not None:
+        add_duration(stats, event['duration'])
@@ -0,0 +1,1177 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+from .config import lock_file
+from .config import config_file
+from .config import execution_file
+from .config import journal_file
+from .config import execution_folder
+from .config import series_folder
+from .config import journal_compact_threshold
+from .config import tag_file
+from .config import database_file
+from .lock import FileLock
+from .lock import read_owner
+from .lock import describe_owner
+from .lock import get_logger
+from .stats import stats_from_records
+from .stats import apply_stats_event
+from .stats import epoch
+
+"""
+   projit.storage: Storage backends for the projit meta-data.
+
+   A backend reads and writes the three sections of a project:
+    - 'project'    : the core properties (name, datasets, experiments, results ...)
+    - 'executions' : the experiment execution records
+    - 'tags'       : the tags attached to project assets
+
+   Alongside the executions, backends maintain the running execution statistics
+   of each experiment (see projit.stats), updated with every execution event.
+
+   The history of the results recorded by executions is kept in binary series
+   files (see projit.series) in the series folder, shared by all backends.
+"""
+
+sections = ["project", "executions", "tags"]
+busy_timeout = 60
+
+##########################################################################################
+class Storage:
+    """
+    Base class for projit storage backends.
+
+    Backends that set `row_level` to True can persist single results, tags and
+    execution events as individual transactional writes. For those backends
+    the Projit class does not take the project lock or reload the project
+    before recording them.
+
+    Backends that set `sharded` to True store the execution records of each
+    experiment separately. When reading only changed sections, their
+    'executions' section holds just the experiments whose records changed,
+    with None for experiments whose records were removed.
+    """
+    name = ""
+    row_level = False
+    sharded = False
+
+    def __init__(self, path):
+        """
+        :param path: The path to the projit config folder
+        :type path: string, required
+        """
+        self.path = path
+
+    def read(self, only_changed=False, sections=sections):
+        """
+        Read the project meta-data.
+
+        :param only_changed: Only read sections that changed on disk since they were
+                             last read or written through this backend object
+        :type only_changed: Boolean, optional
+
+        :param sections: The sections to read, all sections by default
+        :type sections: list(string), optional
+
+        :return: Dictionary of sections. Sections that do not exist, or are unchanged, are omitted.
+        :rtype: Dictionary
+        """
+        raise NotImplementedError
+
+    def write(self, props, executions, tags, sections=sections):
+        """
+        Write sections of the project meta-data.
+
+        :param props: The core project properties
+        :type props: Dictionary, required
+
+        :param executions: The executions dictionary
+        :type executions: Dictionary, required
+
+        :param tags: The tags dictionary
+        :type tags: Dictionary, required
+
+        :param sections: The sections to write, all sections by default
+        :type sections: list(string), optional
+
+        :return: None
+        :rtype: None
+        """
+        raise NotImplementedError
+
+    def read_shard(self, name, only_changed=False):
+        """
+        Read the execution records of a single experiment.
+
+        :param name: The experiment name
+        :type name: string, required
+
+        :param only_changed: Return None if the records did not change since they
+                             were last read or written through this backend object
+        :type only_changed: Boolean, optional
+
+        :return: The execution records {'ID':{...}} of the experiment
+        :rtype: Dictionary
+        """
+        return self.read().get('executions', {}).get(name, {})
+
+    def has_execution(self, name, id):
+        """
+        Check that an experiment has an execution, to validate the execution of a result.
+
+        :param name: The experiment name
+        :type name: string, required
+
+        :param id: The execution ID
+        :type id: string, required
+
+        :return: True if the execution was started or ended
+        :rtype: Boolean
+        """
+        return id in self.read_shard(name)
+
+    def record_execution(self, event, executions):
+        """
+        Persist a single execution event (see :func:`apply_journal_event`).
+        The event has already been applied to the in-memory executions.
+
+        The running statistics of the experiment are updated with the event.
+        End events carry the 'duration' of the execution if it had not ended before.
+
+        :param event: The execution event
+        :type event: Dictionary, required
+
+        :param executions: The in-memory executions dictionary
+        :type executions: Dictionary, required
+
+        :return: None
+        :rtype: None
+        """
+        raise NotImplementedError
+
+    def read_stats(self, names=None):
+        """
+        Read the running execution statistics of experiments.
+        Statistics that are missing, for histories recorded by earlier versions
+        of projit, are built from the execution records.
+
+        :param names: The experiment names, by default all experiments with executions
+        :type names: list(string), optional
+
+        :return: Dictionary of experiment name to statistics
+        :rtype: Dictionary
+        """
+        executions = self.read(sections=["executions"]).get('executions', {})
+        names = list(executions) if names is None else names
+        return {name:stats_from_records(executions.get(name, {})) for name in names}
+
+    def series_path(self, experiment, metric, dataset=None):
+        """
+        The path of the result series of an experiment metric.
+        Names are percent-encoded, which also encodes the '@' separating
+        the dataset from the metric.
+
+        :param experiment: The experiment name
+        :type experiment: string, required
+
+        :param metric: The metric name
+        :type metric: string, required
+
+        :param dataset: The dataset, None for overall results
+        :type dataset: string, optional
+
+        :return: path
+        :rtype: string
+        """
+        from urllib.parse import quote
+        key = quote(metric, safe="")
+        if dataset is not None:
+            key = quote(dataset, safe="") + "@" + key
+        return self.path + "/" + series_folder + "/" + quote(experiment, safe="") + "/" + key + ".series"
+
+    def append_series(self, rows, execution, when):
+        """
+        Append results recorded by an execution to their series.
+        Appends need no lock: each record is a single small write to a file opened for appending.
+
+        :param rows: List of (experiment, dataset, metric, value)
+        :type rows: list(tuple), required
+
+        :param execution: The execution id
+        :type execution: string, required
+
+        :param when: The epoch time the results were recorded
+        :type when: float, required
+
+        :return: None
+        :rtype: None
+        """
+        from .series import append_record
+        for experiment, dataset, metric, value in rows:
+            append_record(self.series_path(experiment, metric, dataset), execution, value, when)
+
+    def read_series(self, experiment, metric, dataset=None):
+        """
+        :return: The recorded history of an experiment metric (see :func:`projit.series.read_records`)
+        :rtype: numpy.ndarray
+        """
+        from .series import read_records
+        return read_records(self.series_path(experiment, metric, dataset))
+
+    def remove_series(self, experiment):
+        """
+        Remove the result history of an experiment.
+
+        :return: None
+        :rtype: None
+        """
+        from urllib.parse import quote
+        import shutil
+        shutil.rmtree(self.path + "/" + series_folder + "/" + quote(experiment, safe=""), ignore_errors=True)
+
+    def compact(self, executions):
+        """
+        Compact the stored execution records.
+
+        :return: None
+        :rtype: None
+        """
+        pass
+
+    def lock(self, timeout=None):
+        """
+        Take exclusive write access to the project meta-data.
+
+        :param timeout: Optional number of seconds to wait for access
+        :type timeout: float, optional
+        """
+        raise NotImplementedError
+
+    def unlock(self):
+        """
+        Release exclusive write access to the project meta-data.
+        """
+        raise NotImplementedError
+
+    def discard(self):
+        """
+        Discard writes made since the lock was taken, where the backend supports it.
+
+        :return: None
+        :rtype: None
+        """
+        pass
+
+    def lock_status(self):
+        """
+        Information about the current holder of the project lock.
+
+        :return: owner info (see :func:`projit.lock.read_owner`) or None when unlocked
+        :rtype: Dictionary
+        """
+        return None
+
+    def break_lock(self):
+        """
+        Forcibly remove the project lock, regardless of its holder.
+
+        :return: owner info of the broken lock, or None when unlocked
+        :rtype: Dictionary
+        """
+        return None
+
+    def destroy(self):
+        """
+        Remove the files of this backend. Used after migrating to another backend.
+
+        :return: None
+        :rtype: None
+        """
+        raise NotImplementedError
+
+
+##########################################################################################
+class JSONStorage(Storage):
+    """
+    The default storage backend: JSON files in the projit config folder, guarded by a LOCK file.
+    The execution records are sharded by experiment into the executions folder: each
+    experiment has a snapshot, an append-only journal and its own lock file, so runs of
+    different experiments do not rewrite or wait for each other's execution history.
+    """
+    name = "json"
+    sharded = True
+
+    section_files = {
+        "project": [config_file],
+        "tags": [tag_file],
+    }
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.journal_entries = {}
+        self.file_lock = FileLock(path + "/" + lock_file)
+        self.shard_locks = {}
+        self.signatures = {}
+        self.shard_signatures = {}
+        self.legacy_signature = None
+        self.execution_ids = {}
+
+    def signature(self, section):
+        """
+        The stat signature (mtime_ns, size, inode) of each file of a section.
+        Files are always replaced rather than rewritten in place, and journals
+        only grow between compactions, so an unchanged signature means unchanged content.
+
+        :param section: The section name
+        :type section: string, required
+
+        :return: signature
+        :rtype: tuple
+        """
+        return tuple(file_signature(self.path + "/" + f) for f in self.section_files[section])
+
+    def shard_path(self, name):
+        """
+        The path (without extension) of the execution shard of an experiment.
+        The experiment name is percent-encoded to make a valid file name.
+
+        :param name: The experiment name
+        :type name: string, required
+
+        :return: path
+        :rtype: string
+        """
+        from urllib.parse import quote
+        return self.path + "/" + execution_folder + "/" + quote(name, safe="")
+
+    def shard_names(self):
+        """
+        :return: The names of the experiments that have an execution shard
+        :rtype: list(string)
+        """
+        try:
+            files = os.listdir(self.path + "/" + execution_folder)
+        except FileNotFoundError:
+            return []
+        from urllib.parse import unquote
+        return sorted({unquote(f.rsplit(".", 1)[0]) for f in files if f.endswith((".json", ".journal"))})
+
+    def shard_signature(self, name):
+        """
+        :return: The stat signature of the snapshot and journal of an execution shard
+        :rtype: tuple
+        """
+        path_to_shard = self.shard_path(name)
+        return (file_signature(path_to_shard + ".json"), file_signature(path_to_shard + ".journal"))
+
+    def shard_lock(self, name):
+        """
+        :return: The lock guarding the execution shard of an experiment
+        :rtype: projit.lock.FileLock
+        """
+        if name not in self.shard_locks:
+            self.shard_locks[name] = FileLock(self.shard_path(name) + ".lock")
+        return self.shard_locks[name]
+
+    def read_legacy(self):
+        """
+        Read the single executions snapshot and journal written by earlier
+        versions of projit. They are folded into the shards by :meth:`compact`.
+
+        :return: executions
+        :rtype: Dictionary
+        """
+        executions = {}
+        path_to_execs = self.path + "/" + execution_file
+        if os.path.exists(path_to_execs):
+            with open(path_to_execs) as f:
+                executions = json.load(f)
+        replay_journal(self.path + "/" + journal_file, executions)
+        return executions
+
+    def load_shard(self, name, executions, track=True):
+        """
+        Apply the snapshot and journal of an execution shard to the executions dictionary.
+
+        :param name: The experiment name
+        :type name: string, required
+
+        :param executions: The executions dictionary to update in place
+        :type executions: Dictionary, required
+
+        :param track: Record the signature of the shard as read. Reads for internal use
+                      must not, as the project did not receive the records.
+        :type track: Boolean, optional
+
+        :return: None
+        :rtype: None
+        """
+        if track:
+            self.shard_signatures[name] = self.shard_signature(name)
+        path_to_shard = self.shard_path(name)
+        if os.path.exists(path_to_shard + ".json"):
+            with open(path_to_shard + ".json") as f:
+                executions.setdefault(name, {}).update(json.load(f))
+        self.journal_entries[name] = replay_journal(path_to_shard + ".journal", executions)
+
+    def read(self, only_changed=False, sections=sections):
+        data = {}
+        for section in self.section_files:
+            if section not in sections:
+                continue
+            signature = self.signature(section)
+            if only_changed and self.signatures.get(section) == signature:
+                continue
+            self.signatures[section] = signature
+            if section == "project":
+                path_to_config = self.path + "/" + config_file
+                if os.path.exists(path_to_config):
+                    with open(path_to_config) as f:
+                        data['project'] = json.load(f)
+                else:
+                    data['project'] = {}
+            elif signature[0] is not None:
+                with open(self.path + "/" + tag_file) as f:
+                    data['tags'] = json.load(f)
+
+        if "executions" not in sections:
+            return data
+        names = self.shard_names()
+        legacy_signature = (file_signature(self.path + "/" + execution_file),
+                            file_signature(self.path + "/" + journal_file))
+        if not only_changed or legacy_signature != self.legacy_signature or any(legacy_signature):
+            self.legacy_signature = legacy_signature
+            self.shard_signatures = {}
+            executions = self.read_legacy()
+            for name in names:
+                self.load_shard(name, executions)
+            if any(legacy_signature) or len(names) > 0:
+                data['executions'] = executions
+            return data
+
+        changed = {}
+        for name in names:
+            if self.shard_signature(name) != self.shard_signatures.get(name):
+                executions = {}
+                self.load_shard(name, executions)
+                changed[name] = executions.get(name, {})
+        for name in set(self.shard_signatures).difference(names):
+            del self.shard_signatures[name]
+            changed[name] = None
+        if len(changed) > 0:
+            data['executions'] = changed
+        return data
+
+    def read_shard(self, name, only_changed=False):
+        if only_changed and self.legacy_signature == (None, None) and \
+                self.shard_signature(name) == self.shard_signatures.get(name):
+            return None
+        executions = self.read_legacy()
+        self.load_shard(name, executions)
+        return executions.get(name, {})
+
+    def has_execution(self, name, id):
+        """
+        The execution IDs of each shard are cached with the signatures of the files
+        they were read from. While the snapshot is unchanged only the journal entries
+        appended since the last check are read, so validating the execution of each
+        result does not parse the whole history of the experiment.
+        """
+        path_to_shard = self.shard_path(name)
+        legacy = (file_signature(self.path + "/" + execution_file),
+                  file_signature(self.path + "/" + journal_file))
+        snapshot = file_signature(path_to_shard + ".json")
+        journal = file_signature(path_to_shard + ".journal")
+        cached = self.execution_ids.get(name)
+        if cached is None or cached['legacy'] != legacy or cached['snapshot'] != snapshot or \
+                journal is None or cached['journal'] is None or journal[2] != cached['journal'][2] or \
+                journal[1] < cached['offset']:
+            ids = set(self.read_legacy().get(name, {}))
+            if snapshot is not None:
+                with open(path_to_shard + ".json") as f:
+                    ids.update(json.load(f))
+            cached = {'legacy':legacy, 'snapshot':snapshot, 'journal':journal, 'offset':0, 'ids':ids}
+            self.execution_ids[name] = cached
+        if journal is not None and journal[1] > cached['offset']:
+            with open(path_to_shard + ".journal", 'rb') as f:
+                f.seek(cached['offset'])
+                tail = f.read()
+            # A trailing partial line is read again once its writer completes it
+            complete = tail.rfind(b"\n") + 1
+            for line in tail[:complete].splitlines():
+                try:
+                    cached['ids'].add(json.loads(line)['id'])
+                except (ValueError, KeyError, TypeError):
+                    continue
+            cached['offset'] += complete
+            cached['journal'] = journal
+        return id in cached['ids']
+
+    def write(self, props, executions, tags, sections=sections):
+        if "project" in sections:
+            write_json(self.path + "/" + config_file, props)
+            self.signatures["project"] = self.signature("project")
+
+        if "executions" in sections:
+            self.write_executions(executions)
+
+        if "tags" in sections:
+            write_json(self.path + "/" + tag_file, tags)
+            self.signatures["tags"] = self.signature("tags")
+
+    def write_executions(self, executions):
+        """
+        Rewrite every execution shard from the executions dictionary, removing the
+        shards of experiments it does not contain, and the legacy executions files.
+
+        :param executions: The executions dictionary
+        :type executions: Dictionary, required
+
+        :return: None
+        :rtype: None
+        """
+        os.makedirs(self.path + "/" + execution_folder, exist_ok=True)
+        for name in set(self.shard_names()).union(executions):
+            path_to_shard = self.shard_path(name)
+            with self.shard_lock(name):
+                if name in executions:
+                    write_json(path_to_shard + ".json", executions[name])
+                    truncate(path_to_shard + ".journal")
+                    write_json(path_to_shard + ".stats", stats_from_records(executions[name]))
+                    self.shard_signatures[name] = self.shard_signature(name)
+                else:
+                    for ext in [".json", ".journal", ".stats"]:
+                        if os.path.exists(path_to_shard + ext):
+                            os.remove(path_to_shard + ext)
+                    self.shard_signatures.pop(name, None)
+            self.journal_entries[name] = 0
+        self.remove_legacy()
+
+    def remove_legacy(self):
+        """
+        Remove the executions files written by earlier versions of projit.
+        """
+        for filename in [execution_file, journal_file]:
+            if os.path.exists(self.path + "/" + filename):
+                os.remove(self.path + "/" + filename)
+        self.legacy_signature = (None, None)
+
+    def record_execution(self, event, executions):
+        """
+        Append a single execution event to the journal of the experiment's shard.
+        This is an O(1) write, in contrast to rewriting the executions snapshot,
+        and only takes the lock of that shard, not the project lock.
+        Once the journal grows beyond the configured threshold it is folded
+        back into the shard snapshot.
+        """
+        name = event['experiment']
+        path_to_shard = self.shard_path(name)
+        os.makedirs(self.path + "/" + execution_folder, exist_ok=True)
+        with self.shard_lock(name):
+            # Only advance the signature if nobody else changed the shard since we read it.
+            in_sync = self.shard_signatures.get(name, (None, None)) == self.shard_signature(name)
+            stats = self.load_stats(name)
+            with open(path_to_shard + ".journal", 'a') as outfile:
+                outfile.write(json.dumps(event) + "\n")
+            apply_stats_event(stats, event)
+            write_json(path_to_shard + ".stats", stats)
+            self.journal_entries[name] = self.journal_entries.get(name, 0) + 1
+            if self.journal_entries[name] >= journal_compact_threshold:
+                self.compact_shard(name, self.read_legacy())
+            if in_sync:
+                self.shard_signatures[name] = self.shard_signature(name)
+
+    def load_stats(self, name):
+        """
+        Read the running statistics of an experiment, building them from its
+        execution records if they are missing. Must be called while holding the shard lock.
+
+        :param name: The experiment name
+        :type name: string, required
+
+        :return: statistics
+        :rtype: Dictionary
+        """
+        path_to_stats = self.shard_path(name) + ".stats"
+        if os.path.exists(path_to_stats):
+            with open(path_to_stats) as f:
+                return json.load(f)
+        executions = self.read_legacy()
+        self.load_shard(name, executions, track=False)
+        return stats_from_records(executions.get(name, {}))
+
+    def read_stats(self, names=None):
+        if names is None:
+            names = set(self.shard_names())
+            names.update(self.read_legacy())
+            names = sorted(names)
+        shards = set(self.shard_names())
+        legacy = None
+        stats = {}
+        for name in names:
+            path_to_stats = self.shard_path(name) + ".stats"
+            if os.path.exists(path_to_stats):
+                with open(path_to_stats) as f:
+                    stats[name] = json.load(f)
+                continue
+            if name not in shards:
+                # Only recorded in the executions files of earlier versions of projit,
+                # which have no shard folder to lock or cache the statistics in.
+                if legacy is None:
+                    legacy = self.read_legacy()
+                stats[name] = stats_from_records(legacy.get(name, {}))
+                continue
+            with self.shard_lock(name):
+                stats[name] = self.load_stats(name)
+                if stats[name]['count'] > 0:
+                    write_json(path_to_stats, stats[name])
+        return stats
+
+    def compact_shard(self, name, legacy):
+        """
+        Fold the journal of an execution shard back into its snapshot.
+        Replaying the journal over the snapshot is idempotent, so a crash
+        before the journal is truncated is safe.
+
+        :param name: The experiment name
+        :type name: string, required
+
+        :param legacy: The legacy executions (see :meth:`read_legacy`)
+        :type legacy: Dictionary, required
+
+        :return: None
+        :rtype: None
+        """
+        path_to_shard = self.shard_path(name)
+        with self.shard_lock(name):
+            executions = {name:dict(legacy.get(name, {}))}
+            self.load_shard(name, executions)
+            write_json(path_to_shard + ".json", executions[name])
+            truncate(path_to_shard + ".journal")
+            self.journal_entries[name] = 0
+
+    def compact(self, executions):
+        """
+        Fold every shard journal, and the executions files of earlier versions
+        of projit, into the shard snapshots. The records are read from disk
+        under each shard lock, so concurrent runs are never lost.
+        """
+        legacy = self.read_legacy()
+        if len(legacy) > 0:
+            os.makedirs(self.path + "/" + execution_folder, exist_ok=True)
+        for name in set(self.shard_names()).union(legacy):
+            self.compact_shard(name, legacy)
+        self.remove_legacy()
+
+    def lock(self, timeout=None):
+        """
+        Lock files are used during processes that modify the project
+        so that we get consistent state across parallel executions.
+        """
+        self.file_lock.acquire(timeout)
+
+    def unlock(self):
+        """
+        Release the lock, which deletes the lock file
+        """
+        self.file_lock.release()
+
+    def lock_status(self):
+        return read_owner(self.file_lock.path)
+
+    def break_lock(self):
+        owner = read_owner(self.file_lock.path)
+        if owner is not None:
+            get_logger().warning("Projit: breaking lock %s: %s", self.file_lock.path, describe_owner(owner))
+            try:
+                os.remove(self.file_lock.path)
+            except FileNotFoundError:
+                pass
+        return owner
+
+    def destroy(self):
+        for filename in [config_file, execution_file, journal_file, tag_file]:
+            path_to_file = self.path + "/" + filename
+            if os.path.exists(path_to_file):
+                os.remove(path_to_file)
+        import shutil
+        shutil.rmtree(self.path + "/" + execution_folder, ignore_errors=True)
+
+
+##########################################################################################
+class SQLiteStorage(Storage):
+    """
+    Storage backend that keeps the project meta-data in a single SQLite
+    database (WAL mode) in the projit config folder.
+    Results, tags and execution events are written as single-row upserts
+    inside their own transactions, so they need neither the project lock
+    nor a reload of the project.
+    """
+    name = "sqlite"
+    row_level = True
+
+    schema = [
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS experiments (name TEXT PRIMARY KEY, path TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS results (experiment TEXT NOT NULL, dataset TEXT NOT NULL, "
+        "metric TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (experiment, dataset, metric))",
+        "CREATE TABLE IF NOT EXISTS executions (experiment TEXT NOT NULL, id TEXT NOT NULL, "
+        "payload TEXT NOT NULL, PRIMARY KEY (experiment, id))",
+        "CREATE TABLE IF NOT EXISTS tags (asset TEXT NOT NULL, name TEXT NOT NULL, "
+        "tag TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (asset, name, tag))",
+        "CREATE TABLE IF NOT EXISTS stats (experiment TEXT PRIMARY KEY, payload TEXT NOT NULL)",
+    ]
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._conn = None
+        self.data_versions = {}
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            import sqlite3
+            self._conn = sqlite3.connect(self.path + "/" + database_file, timeout=busy_timeout, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            for statement in self.schema:
+                self._conn.execute(statement)
+        return self._conn
+
+    def begin(self):
+        """
+        Begin a write transaction unless one is already open.
+
+        :return: True if this call opened the transaction
+        :rtype: Boolean
+        """
+        if self.conn.in_transaction:
+            return False
+        self.conn.execute("BEGIN IMMEDIATE")
+        return True
+
+    def commit(self, opened):
+        if opened:
+            self.conn.execute("COMMIT")
+
+    def rollback(self, opened):
+        if opened:
+            self.conn.execute("ROLLBACK")
+
+    def read(self, only_changed=False, sections=sections):
+        conn = self.conn
+        # data_version changes whenever another connection commits to the database.
+        # It is recorded per section, as sections are read separately.
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if only_changed:
+            sections = [s for s in sections if self.data_versions.get(s) != version]
+        for section in sections:
+            self.data_versions[section] = version
+        data = {}
+        if "project" in sections:
+            data['project'] = self.read_project()
+        if "executions" in sections:
+            executions = {}
+            for exp, id, payload in conn.execute("SELECT experiment, id, payload FROM executions ORDER BY rowid"):
+                executions.setdefault(exp, {})[id] = json.loads(payload)
+            data['executions'] = executions
+        if "tags" in sections:
+            tags = {}
+            for asset, name, tag, value in conn.execute("SELECT asset, name, tag, value FROM tags ORDER BY rowid"):
+                tags.setdefault(asset, {}).setdefault(name, {})[tag] = json.loads(value)
+            data['tags'] = tags
+        return data
+
+    def read_project(self):
+        """
+        Read the core project properties, including experiments and results.
+
+        :return: props
+        :rtype: Dictionary
+        """
+        conn = self.conn
+        props = {}
+        for key, value in conn.execute("SELECT key, value FROM meta"):
+            props[key] = json.loads(value)
+        props['experiments'] = [(n, p) for n, p in conn.execute("SELECT name, path FROM experiments ORDER BY rowid")]
+        results = {}
+        dataresults = {}
+        for exp, dataset, metric, value in conn.execute("SELECT experiment, dataset, metric, value FROM results"):
+            if dataset == "":
+                results.setdefault(exp, {})[metric] = json.loads(value)
+            else:
+                dataresults.setdefault(dataset, {}).setdefault(exp, {})[metric] = json.loads(value)
+        props['results'] = results
+        props['dataresults'] = dataresults
+        return props
+
+    def read_shard(self, name, only_changed=False):
+        executions = {}
+        for id, payload in self.conn.execute("SELECT id, payload FROM executions WHERE experiment=? ORDER BY rowid", (name,)):
+            executions[id] = json.loads(payload)
+        return executions
+
+    def has_execution(self, name, id):
+        row = self.conn.execute("SELECT 1 FROM executions WHERE experiment=? AND id=?", (name, id)).fetchone()
+        return row is not None
+
+    def write(self, props, executions, tags, sections=sections):
+        opened = self.begin()
+        try:
+            conn = self.conn
+            if "project" in sections:
+                conn.execute("DELETE FROM meta")
+                for key, value in props.items():
+                    if key not in ['experiments', 'results', 'dataresults']:
+                        conn.execute("INSERT INTO meta VALUES (?, ?)", (key, json.dumps(value)))
+                conn.execute("DELETE FROM experiments")
+                conn.executemany("INSERT INTO experiments VALUES (?, ?)", [tuple(e) for e in props.get('experiments', [])])
+                conn.execute("DELETE FROM results")
+                rows = []
+                for exp, rez in props.get('results', {}).items():
+                    rows.extend((exp, "", metric, json.dumps(value)) for metric, value in rez.items())
+                for dataset, exps in props.get('dataresults', {}).items():
+                    for exp, rez in exps.items():
+                        rows.extend((exp, dataset, metric, json.dumps(value)) for metric, value in rez.items())
+                conn.executemany("INSERT INTO results VALUES (?, ?, ?, ?)", rows)
+            if "executions" in sections:
+                conn.execute("DELETE FROM executions")
+                rows = []
+                for exp, execs in executions.items():
+                    rows.extend((exp, id, json.dumps(payload)) for id, payload in execs.items())
+                conn.executemany("INSERT INTO executions VALUES (?, ?, ?)", rows)
+                conn.execute("DELETE FROM stats")
+                conn.executemany("INSERT INTO stats VALUES (?, ?)",
+                                 [(exp, json.dumps(stats_from_records(execs))) for exp, execs in executions.items()])
+            if "tags" in sections:
+                conn.execute("DELETE FROM tags")
+                rows = []
+                for asset, names in tags.items():
+                    for name, values in names.items():
+                        rows.extend((asset, name, tag, json.dumps(value)) for tag, value in values.items())
+                conn.executemany("INSERT INTO tags VALUES (?, ?, ?, ?)", rows)
+        except Exception:
+            self.rollback(opened)
+            raise
+        self.commit(opened)
+
+    def put_results(self, rows):
+        """
+        Upsert result values, given as (experiment, dataset, metric, value) rows.
+
+        :return: The new generation counter
+        :rtype: int
+        """
+        rows = [(experiment, dataset or "", metric, json.dumps(value)) for experiment, dataset, metric, value in rows]
+        opened = self.begin()
+        try:
+            self.conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", rows)
+            generation = self.bump_generation()
+        except Exception:
+            self.rollback(opened)
+            raise
+        self.commit(opened)
+        return generation
+
+    def put_tags(self, asset, name, tags):
+        """
+        Upsert the given tags of a single asset.
+        """
+        opened = self.begin()
+        try:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO tags VALUES (?, ?, ?, ?)",
+                [(asset, name, tag, json.dumps(value)) for tag, value in tags.items()]
+            )
+        except Exception:
+            self.rollback(opened)
+            raise
+        self.commit(opened)
+
+    def put_experiment(self, name, path):
+        """
+        Register an experiment if it is not already registered.
+
+        :return: The new generation counter, or None if the experiment was registered
+        :rtype: int
+        """
+        opened = self.begin()
+        generation = None
+        try:
+            if self.conn.execute("INSERT OR IGNORE INTO experiments VALUES (?, ?)", (name, path)).rowcount > 0:
+                generation = self.bump_generation()
+        except Exception:
+            self.rollback(opened)
+            raise
+        self.commit(opened)
+        return generation
+
+    def bump_generation(self):
+        """
+        Increment the generation counter of the project, inside the open transaction.
+
+        :return: The new generation counter
+        :rtype: int
+        """
+        self.conn.execute("INSERT INTO meta VALUES ('generation', '1') "
+                          "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+        return json.loads(self.conn.execute("SELECT value FROM meta WHERE key='generation'").fetchone()[0])
+
+    def record_execution(self, event, executions):
+        """
+        Apply a single execution event to the stored execution record.
+        """
+        opened = self.begin()
+        try:
+            key = (event['experiment'], event['id'])
+            row = self.conn.execute("SELECT payload FROM executions WHERE experiment=? AND id=?", key).fetchone()
+            if event['event'] == 'end' and row is None:
+                raise Exception(f"Projit Experiment Exception: Cannot end experiment: '{event['experiment']}' -- Executions not started")
+            stats = self.load_stats(event['experiment'])
+            stored = {event['experiment']:{event['id']:json.loads(row[0])}} if row else {}
+            if event['event'] == 'start' and row is None:
+                apply_stats_event(stats, event)
+            elif event['event'] == 'end' and epoch(stored[event['experiment']][event['id']].get('end')) is None:
+                start = epoch(stored[event['experiment']][event['id']]['start'])
+                apply_stats_event(stats, dict(event, duration=event['end'] - start))
+            apply_journal_event(stored, event)
+            payload = stored[event['experiment']][event['id']]
+            self.conn.execute("INSERT OR REPLACE INTO executions VALUES (?, ?, ?)", key + (json.dumps(payload),))
+            self.conn.execute("INSERT OR REPLACE INTO stats VALUES (?, ?)", (event['experiment'], json.dumps(stats)))
+        except Exception:
+            self.rollback(opened)
+            raise
+        self.commit(opened)
+
+    def load_stats(self, name):
+        """
+        Read the running statistics of an experiment, building them from its
+        execution records if they are missing.
+
+        :param name: The experiment name
+        :type name: string, required
+
+        :return: statistics
+        :rtype: Dictionary
+        """
+        row = self.conn.execute("SELECT payload FROM stats WHERE experiment=?", (name,)).fetchone()
+        if row is not None:
+            return json.loads(row[0])
+        return stats_from_records(self.read_shard(name))
+
+    def read_stats(self, names=None):
+        if names is None:
+            names = [n for (n,) in self.conn.execute("SELECT DISTINCT experiment FROM executions ORDER BY experiment")]
+        return {name:self.load_stats(name) for name in names}
+
+    def lock(self, timeout=None):
+        import sqlite3
+        if timeout is not None:
+            self.conn.execute("PRAGMA busy_timeout = %i" % int(timeout * 1000))
+        try:
+            self.begin()
+        except sqlite3.OperationalError:
+            raise Exception("Projit Lock Exception: Timed out after %s seconds waiting for database: %s" % (timeout, self.path))
+        finally:
+            if timeout is not None:
+                self.conn.execute("PRAGMA busy_timeout = %i" % (busy_timeout * 1000))
+
+    def unlock(self):
+        if self._conn is not None and self._conn.in_transaction:
+            self._conn.execute("COMMIT")
+
+    def discard(self):
+        if self._conn is not None and self._conn.in_transaction:
+            self._conn.execute("ROLLBACK")
+
+    def lock_status(self):
+        """
+        SQLite does not record who holds the write lock, so it is probed with a
+        BEGIN IMMEDIATE that does not wait on a separate connection. A held lock
+        is reported with an unknown owner and the last modification of the database.
+        The lock is released when its holder exits, so it is never stale.
+        """
+        import sqlite3
+        path_to_db = self.path + "/" + database_file
+        if not os.path.exists(path_to_db):
+            return None
+        probe = sqlite3.connect(path_to_db, timeout=0, isolation_level=None)
+        try:
+            probe.execute("BEGIN IMMEDIATE")
+            probe.execute("ROLLBACK")
+            return None
+        except sqlite3.OperationalError:
+            modified = [os.path.getmtime(path_to_db + suffix) for suffix in ["", "-wal"]
+                        if os.path.exists(path_to_db + suffix)]
+            return {'heartbeat':max(modified), 'lease':float("inf")}
+        finally:
+            probe.close()
+
+    def destroy(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        for suffix in ["", "-wal", "-shm"]:
+            path_to_file = self.path + "/" + database_file + suffix
+            if os.path.exists(path_to_file):
+                os.remove(path_to_file)
+
+
+backends = {JSONStorage.name:JSONStorage, SQLiteStorage.name:SQLiteStorage}
+
+##########################################################################################
+def open_storage(config_path):
+    """
+    Open the storage backend used by the project in the given config folder.
+    Projects with a database file use SQLite, otherwise the JSON layout is used.
+
+    :param config_path: The path to the projit configuration
+    :type config_path: string, required
+
+    :return: The storage backend
+    :rtype: Storage
+    """
+    if os.path.exists(config_path + "/" + database_file):
+        return SQLiteStorage(config_path)
+    return JSONStorage(config_path)
+
+
+##########################################################################################
+def migrate(config_path, backend):
+    """
+    Convert the project in the given config folder to another storage backend.
+
+    :param config_path: The path to the projit configuration
+    :type config_path: string, required
+
+    :param backend: The name of the target backend (json|sqlite)
+    :type backend: string, required
+
+    :return: The new storage backend
+    :rtype: Storage
+    """
+    if backend not in backends:
+        raise Exception("Projit Storage Exception: Unknown storage backend '%s' -- Valid options [%s]" % (backend, ",".join(backends)))
+    source = open_storage(config_path)
+    if source.name == backend:
+        return source
+    source.lock()
+    try:
+        sections = source.read()
+        target = backends[backend](config_path)
+        target.write(sections['project'], sections.get('executions', {}), sections.get('tags', {}))
+        source.destroy()
+    finally:
+        source.unlock()
+    return target
+
+
+##########################################################################################
+def file_signature(path):
+    """
+    The stat signature of a file, used to detect changes without reading it.
+
+    :param path: The path to the file
+    :type path: string, required
+
+    :return: (mtime_ns, size, inode) or None when the file does not exist
+    :rtype: tuple
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+##########################################################################################
+def write_json(path, data):
+    """
+    Write a JSON file atomically: the data is written to a temporary file
+    that is then moved into place, so that readers that do not hold the
+    project lock (and crashed writers) never see a partially written file.
+
+    :param path: The path to the JSON file
+    :type path: string, required
+
+    :param data: The data to serialise
+    :type data: Any, required
+
+    :return: None
+    :rtype: None
+    """
+    with open(path + ".tmp", 'w') as outfile:
+        json.dump(data, outfile, indent=0)
+    os.replace(path + ".tmp", path)
+
+
+##########################################################################################
+def apply_journal_event(executions, event):
+    """
+    Apply an execution journal event to the executions dictionary.
+    Events are idempotent, so replaying a journal over a snapshot that
+    already contains some of its events produces the same state.
+
+    :param executions: The executions dictionary to update in place
+    :type executions: Dictionary, required
+
+    :param event: The event. Either {'event':'start', 'experiment', 'id', 'payload'}
+                  or {'event':'end', 'experiment', 'id', 'end', 'hyperparams'}
+    :type event: Dictionary, required
+
+    :return: None
+    :rtype: None
+    """
+    exper_execs = executions.setdefault(event['experiment'], {})
+    if event['event'] == 'start':
+        exper_execs.setdefault(event['id'], event['payload'])
+    elif event['event'] == 'end':
+        payload = exper_execs.setdefault(event['id'], {'start':event['end'], 'githash':"", 'params':{}})
+        payload['end'] = event['end']
+        payload['hyperparams'] = event['hyperparams']
+
+
+##########################################################################################
+def replay_journal(path_to_journal, executions):
+    """
+    Replay an execution journal over the executions dictionary.
+    A trailing partial line (from a writer that crashed mid-append) is ignored.
+
+    :param path_to_journal: The path to the journal file
+    :type path_to_journal: string, required
+
+    :param executions: The executions dictionary to update in place
+    :type executions: Dictionary, required
+
+    :return: The number of journal entries
+    :rtype: int
+    """
+    journal_entries = 0
+    if os.path.exists(path_to_journal):
+        with open(path_to_journal) as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                apply_journal_event(executions, event)
+                journal_entries += 1
+    return journal_entries
+
+
+##########################################################################################
+def truncate(path):
+    """
+    Empty a file by replacing it, so that its stat signature changes even
+    when it is emptied twice within the timestamp resolution.
+
+    :param path: The path to the file
+    :type path: string, required
+
+    :return: None
+    :rtype: None
+    """
+    if os.path.exists(path):
+        open(path + ".tmp", 'w').close()
+        os.replace(path + ".tmp", path)
+
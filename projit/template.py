@@ -2,14 +2,14 @@
 from __future__ import print_function
 from io import StringIO
 import datetime as dt
-import pkg_resources
+from importlib import resources
 import codecs
 import json
 import sys
 import os
 
 ################################################################################
-resource_package = __name__
+resource_package = __package__
 
 def load_template(filename):
     """
@@ -17,8 +17,7 @@ def load_template(filename):
 
 
     """
-    _path = '/'.join(('templates', filename))
-    rawd = pkg_resources.resource_string(resource_package, _path).decode("utf-8")
+    rawd = resources.files(resource_package).joinpath('templates').joinpath(filename).read_text(encoding="utf-8")
     temp = json.loads(rawd)
     return temp
 
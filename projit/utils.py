@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 import os
-import yaml
 from os import path
 
 from .config import config_folder
@@ -12,24 +11,59 @@ from .config import experiments_file
     projit.utils: Core utility functions of the projit package.
 """
 
+# The project config folder located from each working directory in this process
+located_configs = {}
+
 ############################################################################
 def locate_projit_config():
     """
     Find a path to a projit project config, or return empty string.
     Required so that commands run against a project can quickly locate
     the configuration.
-     
+
+    The environment variable PROJIT_ROOT, when set, names the project folder.
+    Otherwise each directory from the working directory upwards is checked
+    for a config folder. The result is cached for the working directory,
+    and re-checked with a single lookup on later calls.
+
     :return: path : The Path to the projit Project folder
     :rtype: String
     """
-    projit_folder = ""
+    root = os.environ.get("PROJIT_ROOT")
+    if root:
+        root = path.realpath(root)
+        if path.basename(root) == config_folder:
+            root = path.dirname(root)
+        if not path.isdir(path.join(root, config_folder)):
+            raise Exception("Projit Config Exception: PROJIT_ROOT '%s' does not contain a projit project" % root)
+        return root + "/" + config_folder
+
     current_dir = os.getcwd()
-    generator = walk_up(current_dir)
-    for pa, dirs, files in generator:
-        if config_folder in dirs:
-            projit_folder = pa + "/" + config_folder 
-            break
-    return projit_folder
+    projit_folder = located_configs.get(current_dir)
+    if projit_folder is not None and path.isdir(projit_folder):
+        return projit_folder
+    folder = path.realpath(current_dir)
+    while True:
+        if path.isdir(path.join(folder, config_folder)):
+            projit_folder = folder.rstrip("/") + "/" + config_folder
+            located_configs[current_dir] = projit_folder
+            return projit_folder
+        parent = path.dirname(folder)
+        if parent == folder:
+            return ""
+        folder = parent
+
+
+###############################################################################
+def forget_projit_config():
+    """
+    Clear the cache of located project config folders, as required when
+    a new project is created inside the tree of an existing one.
+
+    :return: None
+    :rtype: None
+    """
+    located_configs.clear()
 
 
 ###############################################################################
@@ -97,6 +131,7 @@ def initialise_project(name, descrip):
     :rtype: None 
     """
     os.mkdir(config_folder)
+    forget_projit_config()
     props = create_properties(name, descrip)
     write_properties(config_folder, props)
 
@@ -163,6 +198,7 @@ def open_config(filename):
     :return: config
     :rtype: Dictionary
     """
+    import yaml
     with open(filename) as file:
         config = yaml.load(file, Loader=yaml.FullLoader)
     return config
@@ -182,6 +218,46 @@ def write_config(config, filename):
     :return: None
     :rtype: None
     """
+    import yaml
     with open(filename, 'w') as outfile:
         yaml.dump(config, outfile, default_flow_style=False, allow_unicode=True)
 
+############################################################################
+def numeric(value, metric=None):
+    """
+    Convert a result value to the float stored in the results arrays.
+
+    :param value: The value of the metric
+    :type value: float, required
+
+    :param metric: The metric name, for the error message
+    :type metric: string, optional
+
+    :return: value
+    :rtype: float
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise Exception("Projit Results Exception: Result values must be numeric, got %r for metric '%s'" % (value, metric))
+
+
+################################################################################
+def result_value(value, metric=None):
+    """
+    Validate a new result value. Integers are recorded as they are, other
+    numeric values as floats, see :func:`numeric`.
+
+    :param value: The value of the metric
+    :type value: float, required
+
+    :param metric: The metric name, for the error message
+    :type metric: string, optional
+
+    :return: value
+    :rtype: int or float
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    return numeric(value, metric)
+
@@ -18,7 +18,8 @@ setup(
     name = "projit",
     packages = ["projit"],
     license = "MIT",
-    install_requires = ['numpy', 'pyyaml', 'pandas', 'fpdf', 'gitpython', 'setuptools'],
+    install_requires = ['numpy', 'pyyaml', 'pandas', 'fpdf', 'gitpython'],
+    python_requires = '>=3.9',
     entry_points = {
         "console_scripts": ['projit = projit.cli:main']
     },
@@ -1,11 +1,20 @@
 import os
+import sys
+import subprocess
+import multiprocessing
+import socket
+import fcntl
+import json
 import pytest
 import shutil
 import time
+from datetime import datetime
 from os import path
 import pandas as pd
+import numpy as np
 import datatest as dt
 import projit.projit as proj
+import projit.lite as pit_lite
 from projit.utils import walk_up
 from projit.config import config_folder
 from projit.utils import locate_projit_config
@@ -13,6 +22,7 @@ from projit.utils import initialise_project
 from projit.utils import get_properties
 from projit.utils import write_properties
 from projit.projit import projit_load
+from projit.results import ResultStore
 
 #################################################################
 def test_walk():
@@ -36,6 +46,37 @@ def test_locate_projit_config():
     """
     assert locate_projit_config() == ""
 
+#################################################################
+def test_locate_projit_root(monkeypatch):
+    """
+    Test that the config is located from sub-folders and the PROJIT_ROOT
+     environment variable, and that the cached location follows new projects.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    proj.init("default", "test", "test")
+    expected = path.realpath(".") + "/" + config_folder
+    os.makedirs("nested/deeper")
+    os.chdir("nested/deeper")
+    assert locate_projit_config() == expected
+    assert locate_projit_config() == expected
+    proj.init("default", "inner", "inner")
+    assert locate_projit_config() == path.realpath(".") + "/" + config_folder
+    shutil.rmtree(config_folder)
+    assert locate_projit_config() == expected
+    os.chdir("/")
+    monkeypatch.setenv("PROJIT_ROOT", path.dirname(expected))
+    assert locate_projit_config() == expected
+    monkeypatch.setenv("PROJIT_ROOT", expected)
+    assert locate_projit_config() == expected
+    monkeypatch.setenv("PROJIT_ROOT", path.dirname(expected) + "/nested")
+    with pytest.raises(Exception):
+        locate_projit_config()
+    monkeypatch.delenv("PROJIT_ROOT")
+    os.chdir(path.dirname(path.dirname(expected)))
+    shutil.rmtree(testdir)
+
 #################################################################
 def test_projit_init():
     """
@@ -219,6 +260,227 @@ def test_experiment_results():
     os.chdir("../")
     shutil.rmtree(testdir)
 
+#################################################################
+def test_experiment_results_table():
+    """
+    Test that the results table has one row per experiment in registration order,
+     with the experiment column first, and leaves the stored results untouched.
+    """
+    project = proj.Projit("temp_test_dir_xyz", "test")
+    assert list(project.get_results().columns) == ["experiment"]
+    project.experiments = [("a", "p"), ("b", "p"), ("c", "p")]
+    project.results = {"b":{"rmse":0.5, "mae":0.2}, "a":{"rmse":0.3, "r2":0.9}}
+    results = project.get_results()
+    assert list(results.columns) == ["experiment", "rmse", "r2", "mae"]
+    assert list(results.experiment) == ["a", "b", "c"]
+    assert results.rmse.tolist()[:2] == [0.3, 0.5]
+    assert results.isna().sum().sum() == 5
+    assert project.results == {"b":{"rmse":0.5, "mae":0.2}, "a":{"rmse":0.3, "r2":0.9}}
+
+#################################################################
+def test_result_store():
+    """
+    Test that results are held as columnar arrays, where later results
+     replace earlier ones and the nested dictionaries are views.
+    """
+    store = ResultStore()
+    store.add_rows([("a", None, "rmse", 0.5), ("a", "test", "rmse", 0.4), ("b", None, "rmse", 1)])
+    store.add_rows([("a", None, "mae", 0.2), ("a", None, "rmse", 0.3)])
+    assert len(store) == 4
+    assert store.nested(None) == {"a":{"rmse":0.3, "mae":0.2}, "b":{"rmse":1.0}}
+    assert store.rows()["value"].dtype == np.float64
+    assert store.dataset_names() == ["test"]
+    table = store.table(None, ["b", "a", "c"])
+    assert list(table.columns) == ["experiment", "rmse", "mae"]
+    assert table.rmse.tolist()[:2] == [1.0, 0.3]
+    store.remove_experiment("a")
+    assert store.nested(None) == {"b":{"rmse":1.0}}
+    assert not store.has_dataset("test")
+    store.replace(False, [("b", "test", "auc", 0.9)])
+    assert store.nested("test") == {"b":{"auc":0.9}}
+    assert store.nested(None) == {"b":{"rmse":1.0}}
+    with pytest.raises(Exception):
+        store.add_rows([("b", None, "model", "xgboost")])
+
+#################################################################
+def test_compare_results():
+    """
+    Test that results are compared across datasets and metrics in one table,
+     keeping experiments with missing results.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "test", "test")
+    for name in ["exp1", "exp2", "exp3"]:
+        project.add_experiment(name, "pathtofile")
+    project.add_results("exp1", {"rmse":0.5, "mae":0.3}, "fold1")
+    project.add_results("exp1", {"rmse":0.6}, "fold2")
+    project.add_results("exp2", {"rmse":0.7, "mae":0.2}, "fold2")
+    long = project.get_results_long()
+    assert list(long.columns) == ["experiment", "dataset", "metric", "value"]
+    assert len(long) == 5
+    assert len(project.get_results_long(["fold2"], ["rmse"])) == 2
+    table = project.compare_results(["fold1", "fold2"], ["rmse"])
+    assert list(table.columns) == ["experiment", "fold1", "fold2"]
+    assert list(table.experiment) == ["exp1", "exp2", "exp3"]
+    assert table.fold2.tolist()[:2] == [0.6, 0.7]
+    assert pd.isna(table.fold1[1]) and pd.isna(table.fold2[2])
+    table = project.compare_results(["fold1", "fold2"], ["rmse", "mae", "auc"])
+    assert list(table.columns)[1:4] == ["rmse:fold1", "rmse:fold2", "mae:fold1"]
+    assert table["mae:fold2"][1] == 0.2
+    assert table["auc:fold1"].isna().all()
+    with pytest.raises(Exception):
+        project.compare_results(["fold3"], ["rmse"])
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
+#################################################################
+def test_leaderboard():
+    """
+    Test that the best experiments by a metric are selected with ties,
+     tag filters and tag columns.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "test", "test")
+    scores = {"exp1":0.7, "exp2":0.9, "exp3":0.8, "exp4":0.8, "exp5":0.6}
+    for name, auc in scores.items():
+        project.add_experiment(name, "pathtofile")
+        project.add_result(name, "auc", auc, "test")
+        project.add_tags("experiment", name, {"model":"xgb" if name in ["exp2", "exp4", "exp5"] else "glm"})
+    project.add_result("exp1", "auc", 0.95)
+    top = project.leaderboard("auc", "test", k=2)
+    assert top.experiment.tolist() == ["exp2", "exp3"]
+    assert top.auc.tolist() == [0.9, 0.8]
+    assert project.leaderboard("auc", "test", k=2, ties=True).experiment.tolist() == ["exp2", "exp3", "exp4"]
+    assert project.leaderboard("auc", "test", k=2, ascending=True).experiment.tolist() == ["exp5", "exp1"]
+    top = project.leaderboard("auc", "test", k=10, where={"model":"xgb"}, tags=["model"])
+    assert top.experiment.tolist() == ["exp2", "exp4", "exp5"]
+    assert top.model.tolist() == ["xgb", "xgb", "xgb"]
+    assert project.leaderboard("auc").experiment.tolist() == ["exp1"]
+    assert len(project.leaderboard("rmse", "test")) == 0
+    with pytest.raises(Exception):
+        project.leaderboard("auc", "holdout")
+    # Ties at the k-th place keep the order in which the results were added
+    store = ResultStore()
+    names = ["e%i" % i for i in range(400)]
+    values = np.random.default_rng(0).integers(0, 5, len(names)).astype(float)
+    store.add_rows([(n, "test", "auc", v) for n, v in zip(names, values)])
+    expected = pd.Series(values, index=names).sort_values(ascending=False, kind="stable")
+    for k in [1, 2, 10, 150]:
+        assert store.top("test", "auc", names, k=k)[0] == expected.index[:k].tolist()
+        tied = store.top("test", "auc", names, k=k, ties=True)[0]
+        assert tied == expected.index[expected >= expected.iloc[k - 1]].tolist()
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
+#################################################################
+def test_results_cache():
+    """
+    Test that results tables are cached until the results change,
+     in this or another process.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "exp", "exp test")
+    project.add_experiment("test",  "pathtofiles")
+    project.add_result("test",  "rmse", 0.5)
+    results = project.get_results()
+    results["extra"] = 1
+    assert project._results_cache[None][1] is not results
+    assert "extra" not in project.get_results().columns
+    results.loc[0, "rmse"] = 99
+    results["rmse"] *= 2
+    assert project.get_results().rmse[0] == 0.5
+    again = project.get_results()
+    again.loc[0, "rmse"] = 99
+    assert project.get_results().rmse[0] == 0.5
+    cached = project._results_cache[None][1]
+    project.get_results()
+    assert project._results_cache[None][1] is cached
+    generation = project.generation
+    project.add_result("test",  "rmse", 0.4)
+    assert project.generation > generation
+    assert project.get_results().rmse[0] == 0.4
+    other = projit_load()
+    assert other.generation == project.generation
+    other.add_result("test",  "mae", 0.1)
+    project.reload()
+    assert project.get_results().mae[0] == 0.1
+    other.rm_experiment("test")
+    project.reload()
+    assert len(project.get_results()) == 0
+    project.migrate_storage("sqlite")
+    project.add_experiment("test",  "pathtofiles")
+    assert len(project.get_results()) == 1
+    generation = project.generation
+    project.add_result("test",  "rmse", 0.3)
+    assert project.generation == generation + 1
+    assert project.get_results().rmse[0] == 0.3
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
+#################################################################
+def test_experiment_registry():
+    """
+    Test that experiments keep their registration order and that the
+     project file keeps the list of [name, path] pairs.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "exp", "exp test")
+    with project.batch():
+        for name in ["a", "b", "c"]:
+            project.add_experiment(name, name + ".py")
+    project.add_result("a", "rmse", 0.5)
+    project.add_experiment("a", "a2.py")
+    assert project.experiments == [("b", "b.py"), ("c", "c.py"), ("a", "a2.py")]
+    assert "a" not in project.results
+    project.rm_experiment("c")
+    project.rm_experiment("missing")
+    assert project.experiment_exists("b") and not project.experiment_exists("c")
+    with open(path.join(config_folder, "project.json")) as f:
+        assert json.load(f)["experiments"] == [["b", "b.py"], ["a", "a2.py"]]
+    assert projit_load().experiments == [("b", "b.py"), ("a", "a2.py")]
+    with pytest.raises(Exception, match="read-only"):
+        project.experiments.append(["d", "d.py"])
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
+#################################################################
+def test_find_tags():
+    """
+    Test that assets are found by tag values through the inverted tag index.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "test", "test")
+    for name in ["exp1", "exp2", "exp3"]:
+        project.add_experiment(name, "pathtofile")
+    project.add_tags("experiment", "exp1", {"model":"xgboost", "stage":"prod", "depth":6})
+    project.add_tags("experiment", "exp2", {"model":"xgboost", "stage":"dev"})
+    assert project.find("experiment", model="xgboost") == ["exp1", "exp2"]
+    assert project.find("experiment", model="xgboost", stage="prod") == ["exp1"]
+    assert project.find("experiment", depth="6") == ["exp1"]
+    assert project.find("experiment", model="lightgbm") == []
+    assert project.find("dataset", model="xgboost") == []
+    project.add_tags("experiment", "exp2", {"stage":"prod"})
+    project.add_tags("experiment", "exp3", {"model":"xgboost", "stage":"prod"})
+    assert project.find("experiment", model="xgboost", stage="prod") == ["exp1", "exp2", "exp3"]
+    assert project.find("experiment", stage="dev") == []
+    reloaded = proj.load(config_folder)
+    assert reloaded.find("experiment", stage="prod", model="xgboost") == ["exp1", "exp2", "exp3"]
+    assert reloaded.get_experiment_path("exp1") == "pathtofile"
+    with pytest.raises(Exception):
+        reloaded.get_experiment_path("exp4")
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
 #################################################################
 def test_experiment_remove():
     """
@@ -363,6 +625,167 @@ def test_experiment_executions_incomplete():
     shutil.rmtree(testdir)
 
 
+#################################################################
+def test_execution_durations():
+    """
+    Test that execution times are computed from epoch timestamps and the
+     datetime strings of earlier versions, including runs longer than a day.
+    """
+    project = proj.Projit("temp_test_dir_xyz", "test")
+    project.executions = {
+        "old":{"a":{"start":"2022-01-01 10:00:00.000000", "end":"2022-01-03 10:00:01.500000"},
+               "b":{"start":"2022-01-01 10:00:00", "end":""}},
+        "new":{"c":{"start":1000.0, "end":1090.25}, "d":{"start":2000.0, "end":None}},
+        "none":{},
+        "mixed":{"e":{"start":"2022-01-01 10:00:00.000000", "end":datetime(2022, 1, 1, 10, 0, 30).timestamp()}},
+    }
+    assert project.get_execution_times("old") == [2 * 86400 + 1.5]
+    assert project.get_execution_times("new") == [90.25]
+    assert project.get_execution_times("mixed") == [30.0]
+    all_times = project.get_all_execution_times()
+    assert list(all_times) == ["old", "new", "none", "mixed"]
+    assert all_times["old"].tolist() == [2 * 86400 + 1.5]
+    assert all_times["none"].tolist() == []
+
+#################################################################
+def test_execution_stats():
+    """
+    Test that the running execution statistics match the execution history,
+     and are built for histories recorded without them.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "test", "test")
+    for i in range(4):
+        exec_id = project.start_experiment("test", "pathtofile", params={})
+        project.end_experiment("test", exec_id, hyperparams={})
+    project.start_experiment("test", "pathtofile", params={})
+    stats = project.get_experiment_stats("test")
+    times = project.get_execution_times("test")
+    assert stats["count"] == 5 and stats["completed"] == 4
+    project.end_experiment("test", exec_id, hyperparams={})
+    assert project.get_experiment_stats("test")["completed"] == 4
+    assert stats["mean"] == pytest.approx(sum(times) / 4)
+    assert stats["max"] == pytest.approx(max(times))
+    assert min(times) <= stats["p50"] <= stats["p95"] <= max(times)
+    assert project.get_total_executions() == 5
+    assert projit_load().get_execution_stats()["test"] == (4, pytest.approx(stats["mean"]))
+
+    legacy = {"start":"2022-01-01 10:00:00.000000", "end":"2022-01-01 10:00:05.000000"}
+    other = {"start":1000.0, "end":1015.0}
+    project.executions = {"old":{"a":legacy, "b":other}}
+    project.save()
+    for stats_file in os.listdir(path.join(config_folder, "executions")):
+        if stats_file.endswith(".stats"):
+            os.remove(path.join(config_folder, "executions", stats_file))
+    project = projit_load()
+    stats = project.get_experiment_stats("old")
+    assert (stats["count"], stats["mean"], stats["min"], stats["max"]) == (2, 10, 5, 15)
+    assert stats["std"] == pytest.approx(7.0710678)
+    assert path.exists(path.join(config_folder, "executions", "old.stats"))
+    project.migrate_storage("sqlite")
+    exec_id = project.start_experiment("old", "pathtofile", params={})
+    project.end_experiment("old", exec_id, hyperparams={})
+    stats = project.get_experiment_stats()["old"]
+    assert (stats["count"], stats["completed"], stats["max"]) == (3, 3, 15)
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
+#################################################################
+def test_stats_sketch():
+    """
+    Test the quantile sketch and the merging of execution statistics.
+    """
+    from projit.stats import new_stats, add_duration, merge_stats, quantile
+    a, b, both = new_stats(), new_stats(), new_stats()
+    for i in range(1, 1001):
+        add_duration(a if i % 3 else b, float(i))
+        add_duration(both, float(i))
+    merged = merge_stats(a, b)
+    assert merged["completed"] == 1000
+    assert merged["mean"] == pytest.approx(both["mean"])
+    assert merged["m2"] == pytest.approx(both["m2"])
+    assert merged["sketch"] == both["sketch"]
+    assert quantile(merged, 0.5) == pytest.approx(500, rel=0.02)
+    assert quantile(merged, 0.95) == pytest.approx(950, rel=0.02)
+    assert quantile(new_stats(), 0.5) is None
+
+#################################################################
+def test_legacy_string_results():
+    """
+    Test that a project file holding non-numeric results, which earlier versions
+     of projit accepted, can still be listed and extended without losing them.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "test", "test")
+    project.add_experiment("exp", "pathtofile")
+    project.add_result("exp", "rmse", 0.5)
+    with open(path.join(config_folder, "project.json")) as f:
+        props = json.load(f)
+    props["results"]["exp"]["model"] = "xgboost"
+    props["dataresults"] = {"test":{"exp":{"auc":"n/a", "mae":0.2}}}
+    with open(path.join(config_folder, "project.json"), "w") as f:
+        json.dump(props, f)
+    env = dict(os.environ, PYTHONPATH=path.abspath(".."))
+    out = subprocess.run([sys.executable, "-m", "projit.cli", "list", "results"],
+                         capture_output=True, text=True, env=env)
+    assert "Error" not in out.stdout
+    assert "0.5" in out.stdout
+    project = projit_load()
+    project.add_result("exp", "mae", 0.3)
+    project.add_result("exp", "folds", 5)
+    assert project.results == {"exp":{"rmse":0.5, "mae":0.3, "folds":5, "model":"xgboost"}}
+    assert project.dataresults == {"test":{"exp":{"mae":0.2, "auc":"n/a"}}}
+    assert list(project.get_results().columns) == ["experiment", "rmse", "mae", "folds"]
+    with pytest.raises(Exception, match="must be numeric"):
+        project.add_result("exp", "model", "lightgbm")
+    with open(path.join(config_folder, "project.json")) as f:
+        props = json.load(f)
+    assert props["results"]["exp"]["model"] == "xgboost"
+    assert props["results"]["exp"]["folds"] == 5
+    assert type(props["results"]["exp"]["folds"]) == int
+    assert props["dataresults"]["test"]["exp"]["auc"] == "n/a"
+    project.add_result("exp", "model", 0.9)
+    assert projit_load().results["exp"]["model"] == 0.9
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
+#################################################################
+def test_result_history():
+    """
+    Test that results added with an execution ID are kept in the
+     result history while the current result is overwritten.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "test", "test")
+    ids = []
+    for i in range(3):
+        id = project.start_experiment("exp", "pathtofile")
+        project.add_result("exp", "rmse", 1.0 / (i + 1), execution=id)
+        project.add_results("exp", {"rmse":2.0 * i}, "test", execution=id)
+        project.end_experiment("exp", id, hyperparams={"alpha":i, "solver":"adam"})
+        ids.append(id)
+    project.add_result("exp", "rmse", 0.1)
+    assert project.results["exp"]["rmse"] == 0.1
+    history = projit_load().get_result_history("exp", "rmse")
+    assert history.execution.tolist() == ids
+    assert history.value.tolist() == [1.0, 0.5, 1.0 / 3]
+    assert (history.time.diff().dropna() >= 0).all()
+    assert project.get_result_history("exp", "rmse", "test").value.tolist() == [0.0, 2.0, 4.0]
+    assert len(project.get_result_history("exp", "mae")) == 0
+    assert project.get_hyperparam_history("exp", "alpha") == [0, 1, 2]
+    with pytest.raises(Exception):
+        project.add_result("exp", "rmse", 0.2, execution="0" * 64)
+    project.add_experiment("exp", "otherfile")
+    assert len(project.get_result_history("exp", "rmse")) == 0
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
 #################################################################
 def test_project_params():
     """
@@ -435,3 +858,707 @@ def test_project_experiment_results():
     os.chdir("../")
     shutil.rmtree(testdir)
 
+
+#################################################################
+def test_execution_journal():
+    """
+    Test that execution events are appended to the journal of the experiment
+     shard rather than rewriting a snapshot, and that compaction folds them back.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "test", "test")
+    project.add_experiment("test", "pathtofile")
+    exec_id = project.start_experiment("other exp/1", "pathtofile", params={})
+    snapshot = path.join(config_folder, "executions", "test.json")
+    journal = path.join(config_folder, "executions", "test.journal")
+    other = path.join(config_folder, "executions", "other%20exp%2F1.journal")
+    other_size = os.stat(other).st_size
+    exec_id = project.start_experiment("test", "pathtofile", params={})
+    project.end_experiment("test", exec_id, hyperparams={"alpha":1})
+    assert not path.exists(snapshot)
+    assert os.stat(other).st_size == other_size
+    with open(journal) as f:
+        assert len(f.readlines()) == 2
+    reloaded = proj.load(config_folder)
+    assert reloaded.executions["test"][exec_id]["hyperparams"] == {"alpha":1}
+    assert reloaded.get_experiment_execution_stats("test")[0] == 1
+    assert reloaded.get_experiment_execution_stats("other exp/1")[0] == 0
+    project.compact_executions()
+    assert os.path.getsize(journal) == 0
+    reloaded = proj.load(config_folder)
+    assert reloaded.get_experiment_execution_stats("test")[0] == 1
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
+#################################################################
+def test_execution_shards():
+    """
+    Test that executions recorded by another process are picked up per experiment,
+     and that the executions files of earlier versions are converted to shards.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "test", "test")
+    project.add_experiment("test", "pathtofile")
+    other = projit_load()
+    exec_id = other.start_experiment("test", "pathtofile", params={})
+    project.end_experiment("test", exec_id, hyperparams={})
+    assert project.get_experiment_execution_stats("test")[0] == 1
+    assert other.get_experiment_execution_stats("test")[0] == 1
+    assert other.reload() == []
+
+    legacy = {"old":{"abc":{"start":"2022-01-01 10:00:00.000000", "end":"2022-01-01 10:00:05.000000",
+                            "githash":"", "params":{}, "hyperparams":{}}}}
+    with open(path.join(config_folder, "executions.json"), "w") as f:
+        json.dump(legacy, f)
+    reloaded = projit_load()
+    assert reloaded.get_experiment_execution_stats("old") == (1, 5)
+    assert reloaded.get_experiment_execution_stats("test")[0] == 1
+    reloaded.compact_executions()
+    assert not path.exists(path.join(config_folder, "executions.json"))
+    reloaded = projit_load()
+    assert reloaded.get_experiment_execution_stats("old") == (1, 5)
+    assert reloaded.get_total_executions() == 2
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
+#################################################################
+def test_result_execution_check():
+    """
+    Test that the execution of a result is checked against the journal entries
+     appended since the last check, without reading the whole shard again.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "test", "test")
+    project.add_experiment("test", "pathtofile")
+    other = projit_load()
+    first = other.start_experiment("test", "pathtofile", params={})
+    project = projit_load()
+    project.add_result("test", "rmse", 1.0, execution=first)
+    def full_read(*args, **kwargs):
+        raise AssertionError("the whole shard was read")
+    project.storage.read_shard = full_read
+    project.storage.read_legacy = full_read
+    second = other.start_experiment("test", "pathtofile", params={})
+    project.add_result("test", "rmse", 2.0, execution=second)
+    project.add_result("test", "mae", 3.0, execution=first)
+    try:
+        project.add_result("test", "rmse", 4.0, execution="unknown")
+        assert False
+    except Exception as e:
+        assert "No execution 'unknown'" in str(e)
+    del project.storage.read_shard, project.storage.read_legacy
+    other.compact_executions()
+    project.add_result("test", "rmse", 5.0, execution=second)
+    assert project.get_results().loc[0, "rmse"] == 5.0
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
+#################################################################
+def test_legacy_execution_stats():
+    """
+    Test that the execution statistics of a project written by earlier versions
+     of projit, with a single executions file, are read without changing it.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "test", "test")
+    project.add_experiment("old", "pathtofile")
+    legacy = {"old":{"abc":{"start":"2022-01-01 10:00:00.000000", "end":"2022-01-01 10:00:05.000000",
+                            "githash":"", "params":{}, "hyperparams":{}}}}
+    if path.exists(path.join(config_folder, "executions")):
+        shutil.rmtree(path.join(config_folder, "executions"))
+    with open(path.join(config_folder, "executions.json"), "w") as f:
+        json.dump(legacy, f)
+    assert projit_load().get_experiment_execution_stats("old") == (1, 5)
+    env = dict(os.environ, PYTHONPATH=path.abspath(".."))
+    for command in [["status"], ["list", "experiments"]]:
+        out = subprocess.run([sys.executable, "-m", "projit.cli"] + command,
+                             capture_output=True, text=True, env=env)
+        assert "Error" not in out.stdout
+        assert "Traceback" not in out.stderr
+    out = subprocess.run([sys.executable, "-m", "projit.cli", "list", "experiments"],
+                         capture_output=True, text=True, env=env)
+    assert "old" in out.stdout
+    assert not path.exists(path.join(config_folder, "executions"))
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
+#################################################################
+def test_sqlite_storage():
+    """
+    Test that a project can be migrated to the SQLite backend and that
+     results, tags and executions are recorded there.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "test", "test")
+    project.add_dataset("mydata", "datapath")
+    project.add_experiment("myexp", "mypath")
+    project.add_result("myexp", "RMSE", 0.4, "mydata")
+    project.migrate_storage("sqlite")
+    assert path.isfile(path.join(config_folder, "project.db"))
+    assert not path.isfile(path.join(config_folder, "project.json"))
+    project.add_result("myexp", "MAE", 0.2)
+    project.add_tags("experiment", "myexp", {"model":"xgboost"})
+    exec_id = project.start_experiment("newexp", "newpath", params={})
+    project.end_experiment("newexp", exec_id, hyperparams={"depth":3})
+    reloaded = proj.load(config_folder)
+    assert reloaded.storage.name == "sqlite"
+    assert reloaded.get_dataset("mydata") == "datapath"
+    assert reloaded.dataresults["mydata"]["myexp"]["RMSE"] == 0.4
+    assert reloaded.results["myexp"]["MAE"] == 0.2
+    assert reloaded.get_tags("experiment", "myexp", ["model"]) == ["xgboost"]
+    assert reloaded.experiment_exists("newexp")
+    assert reloaded.get_experiment_execution_stats("newexp")[0] == 1
+    with pytest.raises(TypeError):
+        reloaded.storage.put_tags("dataset", "mydata", {"bad":object()})
+    assert not reloaded.storage.conn.in_transaction
+    first = proj.load(config_folder)
+    second = proj.load(config_folder)
+    second.add_experiment("from_b", "b.py")
+    second.add_result("from_b", "RMSE", 0.3)
+    assert first.tags is not None
+    assert "project" in first.reload()
+    first.add_dataset("other", "otherpath")
+    assert proj.load(config_folder).experiment_exists("from_b")
+    assert proj.load(config_folder).results["from_b"] == {"RMSE":0.3}
+    assert second.lock_status() is None
+    first.storage.lock()
+    owner = second.lock_status()
+    assert owner is not None and owner['stale'] is None
+    env = dict(os.environ, PYTHONPATH=path.abspath(".."))
+    out = subprocess.run([sys.executable, "-m", "projit.cli", "lock", "status"],
+                         capture_output=True, text=True, env=env)
+    assert "Project is locked" in out.stdout
+    first.storage.unlock()
+    assert second.lock_status() is None
+    reloaded.migrate_storage("json")
+    reloaded = proj.load(config_folder)
+    assert reloaded.storage.name == "json"
+    assert reloaded.results["myexp"]["MAE"] == 0.2
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
+#################################################################
+def test_save_dirty_sections(monkeypatch):
+    """
+    Test that saving only writes the meta-data files whose sections
+     were changed by the operation, by counting the bytes written to each file.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "test", "test")
+    project.add_experiment("test", "pathtofile")
+    with project.batch():
+        for i in range(200):
+            exec_id = project.start_experiment("test", "pathtofile", params={"run":i})
+            project.end_experiment("test", exec_id, hyperparams={"alpha":i})
+    project.compact_executions()
+
+    written = {}
+    real_open = open
+    class CountingFile:
+        def __init__(self, f, name):
+            self.f = f
+            self.name = name
+        def write(self, data):
+            written[self.name] = written.get(self.name, 0) + len(data)
+            return self.f.write(data)
+        def __getattr__(self, attr):
+            return getattr(self.f, attr)
+        def __enter__(self):
+            return self
+        def __exit__(self, *args):
+            return self.f.__exit__(*args)
+    def counting_open(file, mode="r", *args, **kwargs):
+        f = real_open(file, mode, *args, **kwargs)
+        if "w" in mode or "a" in mode:
+            # JSON files are written to a temporary file and moved into place
+            name = path.basename(file[:-len(".tmp")] if file.endswith(".tmp") else file)
+            if name != "LOCK":
+                written.setdefault(name, 0)
+                return CountingFile(f, name)
+        return f
+    monkeypatch.setattr("builtins.open", counting_open)
+
+    def bytes_written(operation):
+        written.clear()
+        operation()
+        return dict(written)
+
+    # Writing every section, as save() did before sections were tracked
+    full_bytes = bytes_written(lambda: project.save(sections=["project", "executions", "tags"]))
+    assert full_bytes["test.json"] > 20000
+    tag_bytes = bytes_written(lambda: project.add_tags("experiment", "test", {"model":"xgb"}))
+    assert list(tag_bytes) == ["tags.json"]
+    assert tag_bytes["tags.json"] == path.getsize(path.join(config_folder, "tags.json"))
+    param_bytes = bytes_written(lambda: project.add_param("target", "y"))
+    assert list(param_bytes) == ["project.json"]
+    assert param_bytes["project.json"] == path.getsize(path.join(config_folder, "project.json"))
+    result_bytes = bytes_written(lambda: project.add_result("test", "rmse", 0.5))
+    assert list(result_bytes) == ["project.json"]
+    start_bytes = bytes_written(lambda: project.start_experiment("test", "pathtofile"))
+    assert list(start_bytes) == ["test.journal", "test.stats"]
+    assert start_bytes["test.journal"] < 500
+    for operation in [tag_bytes, param_bytes, result_bytes, start_bytes]:
+        assert sum(operation.values()) * 20 < sum(full_bytes.values())
+    assert bytes_written(lambda: project.save()) == {}
+    monkeypatch.undo()
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
+#################################################################
+def test_reload_changed_sections():
+    """
+    Test that reload only re-reads the meta-data files that changed on disk
+     and reports which sections were refreshed.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "test", "test")
+    project.add_experiment("test", "pathtofile")
+    assert project.reload() == []
+    other = projit_load()
+    other.add_tags("experiment", "test", {"model":"xgb"})
+    assert project.reload() == ["tags"]
+    assert project.tags["experiment"]["test"] == {"model":"xgb"}
+    assert project.reload() == []
+    exec_id = other.start_experiment("test", "pathtofile", params={})
+    assert project.reload() == ["executions"]
+    assert exec_id in project.executions["test"]
+    assert sorted(project.reload(force=True)) == ["executions", "project", "tags"]
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
+#################################################################
+def test_lazy_sections():
+    """
+    Test that loading a project does not read the executions and tags
+     until they are used.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "test", "test")
+    project.add_dataset("train", "data/train.csv")
+    exec_id = project.start_experiment("test", "pathtofile", params={}, tags={"model":"xgb"})
+    project = projit_load()
+    assert project.get_dataset("train") == "data/train.csv"
+    project.add_result("test", "rmse", 0.5)
+    project.end_experiment("test", exec_id, hyperparams={})
+    assert project.get_experiment_execution_stats("test")[0] == 1
+    assert project.loaded_sections() == ["project"]
+    assert project.get_tags("experiment", "test", ["model"]) == ["xgb"]
+    assert project.executions["test"][exec_id]["hyperparams"] == {}
+    assert project.loaded_sections() == ["project", "executions", "tags"]
+    project = projit_load()
+    project.save(sections=["executions", "tags"])
+    assert projit_load().get_tags("experiment", "test", ["model"]) == ["xgb"]
+    assert projit_load().get_total_executions() == 1
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
+#################################################################
+def test_daemon():
+    """
+    Test that updates are applied by the project daemon while it is running,
+     and directly to the files once it has stopped.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    proj.init("default", "test", "test")
+    env = dict(os.environ, PYTHONPATH=path.abspath(".."))
+    daemon = subprocess.Popen([sys.executable, "-m", "projit.cli", "serve"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env)
+    try:
+        for i in range(200):
+            if path.exists(config_folder + "/projit.sock"):
+                break
+            time.sleep(0.05)
+        project = projit_load()
+        id = project.start_experiment("exp", "pathtofile", params={"seed":1}, tags={"model":"xgb"})
+        project.add_result("exp", "rmse", 0.5, execution=id)
+        project.add_results("exp", {"rmse":0.4}, "test")
+        project.add_tags("experiment", "exp", {"stage":"dev"})
+        project.end_experiment("exp", id, hyperparams={"alpha":0.1})
+        assert project._daemon is not None
+        assert project.experiment_exists("exp")
+        assert project.get_results().rmse[0] == 0.5
+        project.add_result("exp", "rmse", 0.6)
+        assert project.get_results().rmse[0] == 0.6
+        project.add_result("exp", "rmse", 0.5)
+        assert project.get_tags("experiment", "exp", ["model", "stage"]) == ["xgb", "dev"]
+        assert project.find("experiment", stage="dev") == ["exp"]
+        assert project.executions["exp"][id]["hyperparams"] == {"alpha":0.1}
+        project.add_hyperparam("exp", {"alpha":0.1})
+        raw = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        raw.connect(config_folder + "/projit.sock")
+        raw.sendall(b"not json\n")
+        stream = raw.makefile("rb")
+        assert "Invalid request" in json.loads(stream.readline())["error"]
+        raw.sendall(b'{"method":"rm_experiment", "args":["exp"]}\n')
+        assert "Unknown request" in json.loads(stream.readline())["error"]
+        raw.close()
+        with pytest.raises(Exception, match="Projit Experiment Exception"):
+            project.end_experiment("missing", id)
+        lite = pit_lite.projit_load()
+        lite_id = lite.start_experiment("lite", "pathtofile")
+        lite.add_result("lite", "rmse", 0.3, execution=lite_id)
+        assert lite.daemon is not None
+        project.reload()
+        assert project.experiments == [("exp", "pathtofile"), ("lite", "pathtofile")]
+        assert project.results == {"exp":{"rmse":0.5}, "lite":{"rmse":0.3}}
+        assert project.dataresults == {"test":{"exp":{"rmse":0.4}}}
+        assert project.get_tags("experiment", "exp", ["model", "stage"]) == ["xgb", "dev"]
+        assert project.executions["exp"][id]["hyperparams"] == {"alpha":0.1}
+        assert project.get_result_history("exp", "rmse").execution.tolist() == [id]
+    finally:
+        daemon.terminate()
+        daemon.wait(10)
+    assert not path.exists(config_folder + "/projit.sock")
+    project.add_result("exp", "mae", 0.1)
+    assert project._daemon is None
+    assert projit_load().results["exp"] == {"rmse":0.5, "mae":0.1}
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
+#################################################################
+def test_cli_batch():
+    """
+    Test that the batch command runs every command in a single update,
+     reports failed lines, and saves nothing in strict mode when a line fails.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "test", "test")
+    project.add_dataset("old", "data/old.csv")
+    env = dict(os.environ, PYTHONPATH=path.abspath(".."))
+    commands = ["# Register the datasets"]
+    commands += ["add dataset ds_%i data/ds_%i.csv" % (i, i) for i in range(50)]
+    commands += ["projit tag dataset ds_0 split=train", "tag dataset missing split=test",
+                 "add dataset", "rm dataset old", "init other"]
+    with open("commands.txt", "w") as f:
+        f.write("\n".join(commands))
+    out = subprocess.run([sys.executable, "-m", "projit.cli", "batch", "commands.txt"],
+                         capture_output=True, text=True, env=env)
+    assert "ERROR: line 53: tag dataset missing split=test" in out.stdout
+    assert "ERROR: line 54: add dataset" in out.stdout
+    assert "ERROR: line 56: init other -- Command not available in a batch" in out.stdout
+    assert "3 commands failed" in out.stdout
+    assert out.returncode == 1
+    project = projit_load()
+    assert len(project.datasets) == 50
+    assert "old" not in project.datasets
+    assert project.get_tags("dataset", "ds_0", ["split"]) == ["train"]
+    out = subprocess.run([sys.executable, "-m", "projit.cli", "batch", "-", "--strict"],
+                         input="add dataset new data/new.csv\nadd model m m.pkl\n",
+                         capture_output=True, text=True, env=env)
+    assert "Batch stopped at line 2" in out.stdout
+    assert out.returncode == 1
+    assert not projit_load().dataset_exists("new")
+    exec_id = project.start_experiment("exp", "pathtofile")
+    project.add_result("exp", "rmse", 0.5, execution=exec_id)
+    series = path.join(config_folder, "series", "exp")
+    assert path.isdir(series)
+    out = subprocess.run([sys.executable, "-m", "projit.cli", "batch", "-", "--strict"],
+                         input="rm experiment exp\nadd model m m.pkl\n",
+                         capture_output=True, text=True, env=env)
+    assert out.returncode == 1
+    assert path.isdir(series)
+    assert projit_load().experiment_exists("exp")
+    out = subprocess.run([sys.executable, "-m", "projit.cli", "batch", "-"],
+                         input="rm experiment exp\n", capture_output=True, text=True, env=env)
+    assert out.returncode == 0
+    assert not path.isdir(series)
+    assert not projit_load().experiment_exists("exp")
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
+#################################################################
+def test_cli_import_time():
+    """
+    Test that 'projit status' does not import the heavy dependencies
+     and stays within its import time budget.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "test", "test")
+    project.add_experiment("exp", "pathtofile")
+    project.add_result("exp", "rmse", 0.5)
+    env = dict(os.environ, PYTHONPATH=path.abspath(".."))
+    out = subprocess.run([sys.executable, "-X", "importtime", "-m", "projit.cli", "status"],
+                         capture_output=True, text=True, env=env)
+    assert "Experiments: 1" in out.stdout
+    imports = {}
+    for line in out.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                imports[name.strip()] = int(cumulative)
+    for heavy in ["pandas", "numpy", "git", "fpdf", "yaml", "pkg_resources"]:
+        assert heavy not in imports
+    assert imports["projit"] < 300000
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
+#################################################################
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_lite_client(backend):
+    """
+    Test that the lightweight client records experiments, executions, results
+     and tags that the full package reads back.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "test", "test")
+    project.add_dataset("train", "data/train.csv")
+    if backend == "sqlite":
+        project.migrate_storage("sqlite")
+    lite = pit_lite.projit_load()
+    assert lite.get_path_to_dataset("train").endswith("temp_test_dir_xyz/data/train.csv")
+    id = lite.start_experiment("exp", "pathtofile", params={"seed":1}, tags={"model":"xgb"})
+    lite.add_result("exp", "rmse", 0.5, execution=id)
+    lite.add_results("exp", {"rmse":0.4, "mae":0.2}, "test")
+    lite.end_experiment("exp", id, hyperparams={"alpha":0.1})
+    with pytest.raises(Exception):
+        lite.end_experiment("exp", "0" * 64)
+    with pytest.raises(Exception):
+        lite.add_result("exp", "model", "xgb")
+    reloaded = proj.load(config_folder)
+    assert reloaded.experiments == [("exp", "pathtofile")]
+    assert reloaded.results == {"exp":{"rmse":0.5}}
+    assert reloaded.dataresults == {"test":{"exp":{"rmse":0.4, "mae":0.2}}}
+    assert reloaded.get_tags("experiment", "exp", ["model"]) == ["xgb"]
+    assert reloaded.executions["exp"][id]["params"] == {"seed":1}
+    assert reloaded.get_experiment_execution_stats("exp")[0] == 1
+    assert reloaded.get_hyperparam_history("exp", "alpha") == [0.1]
+    assert reloaded.get_result_history("exp", "rmse").execution.tolist() == [id]
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
+#################################################################
+def test_lite_import():
+    """
+    Test that the lightweight client only imports the standard library.
+    """
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import projit.lite"],
+                         capture_output=True, text=True)
+    imports = {}
+    for line in out.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                imports[name.strip()] = int(cumulative)
+    for heavy in ["pandas", "numpy", "git", "fpdf", "yaml", "projit.projit", "projit.storage",
+                  "projit.daemon", "sqlite3", "logging", "socket", "urllib.parse", "threading"]:
+        assert heavy not in imports
+    assert imports["projit.lite"] < 30000
+    code = "import projit; projit.projit.Projit; projit.utils.walk_up; projit.storage.open_storage; projit.projit_load"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert out.returncode == 0, out.stderr
+
+#################################################################
+def test_lock_timeout():
+    """
+    Test that a second process waiting on the project lock can
+     time out, and acquires it once the lock is released.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "test", "test")
+    other = proj.load(config_folder)
+    project.initiate_lock()
+    with pytest.raises(Exception) as e_info:
+        other.initiate_lock(timeout=0.1)
+    project.release_lock()
+    other.initiate_lock(timeout=1)
+    assert path.isfile(path.join(config_folder, "LOCK"))
+    other.release_lock()
+    assert not path.isfile(path.join(config_folder, "LOCK"))
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
+#################################################################
+def add_results_worker(worker):
+    project = proj.load(config_folder)
+    for i in range(10):
+        project.add_result("test", f"metric_{worker}_{i}", i)
+
+def test_concurrent_writers():
+    """
+    Test that concurrent writer processes do not lose results.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "test", "test")
+    project.add_experiment("test", "pathtofile")
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=add_results_worker, args=(w,)) for w in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    project = proj.load(config_folder)
+    assert len(project.results["test"]) == 40
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
+#################################################################
+def test_stale_lock_recovery():
+    """
+    Test that a lock left behind by a crashed process, or held past
+     its lease, is detected and broken by the next writer.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "test", "test")
+    lock_path = path.join(config_folder, "LOCK")
+
+    # A writer that dies while holding the lock
+    pid = os.fork()
+    if pid == 0:
+        proj.load(config_folder).initiate_lock()
+        os._exit(0)
+    os.waitpid(pid, 0)
+    status = project.lock_status()
+    assert status["pid"] == pid
+    assert "no longer running" in status["stale"]
+    project.add_param("after_crash", 1)
+    assert project.lock_status() is None
+
+    # A live holder whose lease has expired
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    owner = {"pid":os.getpid(), "host":socket.gethostname(), "heartbeat":time.time() - 600, "lease":300}
+    os.write(fd, json.dumps(owner).encode())
+    assert "lease" in project.lock_status()["stale"]
+    project.initiate_lock(timeout=1)
+    project.release_lock()
+    os.close(fd)
+
+    # A live holder that has not yet replaced the record of a dead previous holder
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0)
+    os.waitpid(pid, 0)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    owner = {"pid":pid, "host":socket.gethostname(), "acquired":time.time(), "heartbeat":time.time(), "lease":300}
+    os.write(fd, json.dumps(owner).encode())
+    with pytest.raises(Exception, match="Timed out"):
+        project.initiate_lock(timeout=0.3)
+    assert path.exists(lock_path)
+    fcntl.flock(fd, fcntl.LOCK_UN)
+    os.close(fd)
+    os.remove(lock_path)
+
+    # Operators can break a lock explicitly
+    project.initiate_lock()
+    other = proj.load(config_folder)
+    assert other.break_lock()["pid"] == os.getpid()
+    assert other.lock_status() is None
+    project.release_lock()
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
+#################################################################
+def test_batch_updates():
+    """
+    Test that modifications inside a batch are loaded and saved once,
+     and that a failing batch saves nothing.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "test", "test")
+    project.add_experiment("test", "pathtofile")
+    calls = {"read":0, "write":0}
+    storage = project.storage
+    read, write = storage.read, storage.write
+    def counted_read(**kwargs):
+        calls["read"] += 1
+        return read(**kwargs)
+    def counted_write(*args):
+        calls["write"] += 1
+        return write(*args)
+    storage.read, storage.write = counted_read, counted_write
+
+    with project.batch():
+        exec_id = project.start_experiment("test", "pathtofile", params={})
+        for ds in ["train", "test"]:
+            for i in range(20):
+                project.add_result("test", f"metric_{i}", i, ds)
+        project.add_tags("experiment", "test", {"model":"xgb"})
+        project.end_experiment("test", exec_id, hyperparams={})
+    assert calls == {"read":1, "write":1}
+    assert not path.isfile(path.join(config_folder, "LOCK"))
+
+    with pytest.raises(ValueError):
+        with project.batch():
+            project.add_param("lost", 1)
+            raise ValueError("abort")
+    assert "lost" not in project.params
+
+    reloaded = proj.load(config_folder)
+    assert len(reloaded.dataresults["train"]["test"]) == 20
+    assert reloaded.get_experiment_execution_stats("test")[0] == 1
+    assert reloaded.get_tags("experiment", "test", ["model"]) == ["xgb"]
+    assert "lost" not in reloaded.params
+    os.chdir("../")
+    shutil.rmtree(testdir)
+
+#################################################################
+def test_bulk_results():
+    """
+    Test that results can be added from a dictionary or a DataFrame
+     in wide or long format.
+    """
+    testdir = "temp_test_dir_xyz"
+    os.mkdir(testdir)
+    os.chdir(testdir)
+    project = proj.init("default", "test", "test")
+    project.add_experiment("exp1", "pathtofile")
+    project.add_experiment("exp2", "pathtofile")
+    project.add_results("exp1", {"rmse":0.5, "mae":0.3})
+    project.add_results("exp1", {"rmse":0.6}, "holdout")
+
+    wide = pd.DataFrame({"experiment":["exp1", "exp2", "exp2"],
+                         "dataset":["test", "test", "holdout"],
+                         "rmse":[0.1, 0.2, 0.3],
+                         "mae":[0.4, None, 0.6]})
+    project.add_results_frame(wide, dataset_col="dataset")
+    long = pd.DataFrame({"exp":["exp2", "exp2"], "metric":["rmse", "auc"], "score":[0.7, 0.9]})
+    project.add_results_frame(long, experiment_col="exp", metric_col="metric", value_col="score")
+    try:
+        project.add_results_frame(wide, dataset_col="dataset", value_col="rmse")
+        assert False
+    except Exception as e:
+        assert "value_col" in str(e)
+    named = pd.DataFrame({"experiment":["exp1"], "value":[1.5], "metric":[2.5]})
+    project.add_results_frame(named)
+
+    reloaded = proj.load(config_folder)
+    assert reloaded.results["exp1"] == {"rmse":0.5, "mae":0.3, "value":1.5, "metric":2.5}
+    assert reloaded.results["exp2"] == {"rmse":0.7, "auc":0.9}
+    assert reloaded.dataresults["test"]["exp2"] == {"rmse":0.2}
+    assert reloaded.dataresults["holdout"]["exp1"] == {"rmse":0.6}
+    assert reloaded.dataresults["holdout"]["exp2"] == {"rmse":0.3, "mae":0.6}
+    os.chdir("../")
+    shutil.rmtree(testdir)